@@ -0,0 +1,73 @@
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from cleaning_loading_app.transformations import (
+    remove_rows_with_empty_or_spaces_only_string_fields,
+)
+
+
+def _build_clinical_trials_like_frame(rows: int, dirty_ratio: float) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    titles = np.array([f"Scientific title {i}" for i in range(10_000)], dtype=object)
+    journals = np.array([f"Journal {i}" for i in range(100)], dtype=object)
+
+    df = pd.DataFrame(
+        {
+            "id": [f"NCT{i:08d}" for i in range(rows)],
+            "scientific_title": titles[rng.integers(0, len(titles), rows)],
+            "date": pd.Timestamp("2020-01-01")
+            + pd.to_timedelta(rng.integers(0, 1000, rows), unit="D"),
+            "journal": journals[rng.integers(0, len(journals), rows)],
+        }
+    )
+    dirty_rows = rng.random(rows) < dirty_ratio
+    df.loc[dirty_rows, "scientific_title"] = "  "
+    return df
+
+
+def _legacy_remove_rows_with_empty_or_spaces_only_string_fields(
+    df: pd.DataFrame,
+) -> pd.Series:
+    condition: pd.Series = df.apply(
+        lambda x: x.astype(str).str.contains(r"^\s*$").any(), axis=1
+    )
+    return condition
+
+
+def _timed(label: str, rows: int, func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:>9.3f} s  {rows / elapsed:>14,.0f} rows/s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dirty-ratio", type=float, default=0.01)
+    parser.add_argument(
+        "--skip-legacy",
+        action="store_true",
+        help="Do not time the row by row implementation (several minutes at 1M rows).",
+    )
+    args = parser.parse_args()
+
+    df = _build_clinical_trials_like_frame(args.rows, args.dirty_ratio)
+
+    vectorized = _timed(
+        "vectorized",
+        args.rows,
+        lambda: remove_rows_with_empty_or_spaces_only_string_fields(df, pd.DataFrame()),
+    )
+    if not args.skip_legacy:
+        legacy = _timed(
+            "row by row",
+            args.rows,
+            lambda: _legacy_remove_rows_with_empty_or_spaces_only_string_fields(df),
+        )
+        print(f"speedup      {legacy / vectorized:>9.1f}x")
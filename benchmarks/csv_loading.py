@@ -0,0 +1,133 @@
+import argparse
+import tempfile
+import time
+from functools import partial
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from cleaning_loading_app.const import CsvEngine
+from cleaning_loading_app.csv_io import (
+    iter_cvs_chunks_with_date_parsing,
+    load_cvs_with_date_parsing,
+    split_csv_into_byte_ranges,
+)
+from cleaning_loading_app.pipelines import find_pipeline
+
+
+def _write_pubmed_like_file(file_path: Path, rows: int) -> None:
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp("2019-01-01") + pd.to_timedelta(
+        rng.integers(0, 1000, rows), unit="D"
+    )
+    # Mostly dd/mm/yyyy dates, with some iso ones as in the samples
+    formatted_dates = np.where(
+        rng.random(rows) < 0.9,
+        dates.strftime("%d/%m/%Y"),
+        dates.strftime("%Y-%m-%d"),
+    )
+    journals = np.array([f"Journal {i}" for i in range(100)], dtype=object)
+
+    pd.DataFrame(
+        {
+            "id": np.arange(rows),
+            "title": [f"Title of article {i}" for i in range(rows)],
+            "date": formatted_dates,
+            "journal": journals[rng.integers(0, len(journals), rows)],
+        }
+    ).to_csv(file_path, index=False)
+
+
+def _consume(chunks: Iterator[pd.DataFrame]) -> None:
+    for _ in chunks:
+        pass
+
+
+def _timed(label: str, rows: int, func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<30} {elapsed:>9.3f} s  {rows / elapsed:>14,.0f} rows/s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--parts", type=int, default=8)
+    args = parser.parse_args()
+
+    pipeline = find_pipeline("pubmed.csv")
+    assert pipeline is not None
+    csv_dtypes, date_formats = pipeline.csv_dtypes, pipeline.date_formats
+    engines: List[CsvEngine] = ["c", "pyarrow"] if find_spec("pyarrow") else ["c"]
+
+    with tempfile.TemporaryDirectory() as temp_path:
+        file_path = Path(temp_path) / "pubmed.csv"
+        _write_pubmed_like_file(file_path, args.rows)
+
+        inferred = _timed(
+            "inferred types, mixed dates",
+            args.rows,
+            lambda: load_cvs_with_date_parsing(file_path, ["date"]),
+        )
+        for engine in engines:
+            with_schema = _timed(
+                f"schema, known formats ({engine})",
+                args.rows,
+                partial(
+                    load_cvs_with_date_parsing,
+                    file_path,
+                    ["date"],
+                    csv_dtypes,
+                    date_formats,
+                    engine,
+                ),
+            )
+            print(f"{'speedup':<30} {inferred / with_schema:>9.1f}x")
+
+        memory_mapped = _timed(
+            "schema, memory mapped (c)",
+            args.rows,
+            partial(
+                load_cvs_with_date_parsing,
+                file_path,
+                ["date"],
+                csv_dtypes,
+                date_formats,
+                memory_map=True,
+            ),
+        )
+        print(f"{'speedup':<30} {inferred / memory_mapped:>9.1f}x")
+        _timed(
+            f"split in {args.parts} byte ranges",
+            args.rows,
+            partial(split_csv_into_byte_ranges, file_path, args.parts),
+        )
+
+        print(f"By chunks of {args.chunk_size:,} rows:")
+        inferred = _timed(
+            "inferred types, mixed dates",
+            args.rows,
+            lambda: _consume(
+                iter_cvs_chunks_with_date_parsing(file_path, args.chunk_size, ["date"])
+            ),
+        )
+        with_schema = _timed(
+            "schema, known formats",
+            args.rows,
+            lambda: _consume(
+                iter_cvs_chunks_with_date_parsing(
+                    file_path,
+                    args.chunk_size,
+                    ["date"],
+                    csv_dtypes,
+                    date_formats,
+                )
+            ),
+        )
+        print(f"{'speedup':<30} {inferred / with_schema:>9.1f}x")
@@ -0,0 +1,56 @@
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from cleaning_loading_app.transformations import convert_string_to_date
+
+
+def _build_pubmed_like_frame(rows: int, bad_date_ratio: float) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp("2019-01-01") + pd.to_timedelta(
+        rng.integers(0, 1000, rows), unit="D"
+    )
+    # Mostly dd/mm/yyyy dates, with some iso and long ones as in the samples
+    kind = rng.random(rows)
+    formatted_dates = np.where(
+        kind < 0.8,
+        dates.strftime("%d/%m/%Y"),
+        np.where(kind < 0.9, dates.strftime("%Y-%m-%d"), dates.strftime("%d %B %Y")),
+    ).astype(object)
+    formatted_dates[rng.random(rows) < bad_date_ratio] = "32/13/2020"
+    return pd.DataFrame({"id": np.arange(rows), "date": formatted_dates})
+
+
+def _legacy_convert_string_to_date(df: pd.DataFrame) -> pd.Series:
+    # Previous implementation, without its failure on the first invalid date
+    return pd.to_datetime(df["date"], format="mixed", dayfirst=True, errors="coerce")
+
+
+def _timed(label: str, rows: int, func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {elapsed:>9.3f} s  {rows / elapsed:>14,.0f} rows/s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--bad-date-ratio", type=float, default=0.01)
+    args = parser.parse_args()
+
+    df = _build_pubmed_like_frame(args.rows, args.bad_date_ratio)
+
+    mixed = _timed(
+        "mixed formats", args.rows, lambda: _legacy_convert_string_to_date(df)
+    )
+    known = _timed(
+        "known formats",
+        args.rows,
+        lambda: convert_string_to_date(df.copy(), "date", pd.DataFrame()),
+    )
+    print(f"{'speedup':<14} {mixed / known:>9.1f}x")
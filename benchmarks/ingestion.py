@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, TypeVar
+
+import pandas as pd
+from synthetic_data import (
+    DirtRatios,
+    write_clinical_trials_file,
+    write_drugs_file,
+    write_pubmed_file,
+)
+
+from cleaning_loading_app.cleaner_loader import ingest_files
+from cleaning_loading_app.const import (
+    DATALAKE_PATH,
+    INCOMING_FILES_PATH,
+    INGESTED_DATA_PATH,
+    REJECTED_DATA_PATH,
+)
+from cleaning_loading_app.file_loader import clean_data, load_data_file
+from cleaning_loading_app.filesystem import (
+    list_files,
+    move_processed_file,
+    preliminary_checks_and_cleaning,
+)
+from cleaning_loading_app.loading import LoadingOptions
+from cleaning_loading_app.metrics import MetricsRecorder
+from cleaning_loading_app.pipelines import Pipeline, find_pipeline
+from cleaning_loading_app.writers import CsvDataWriter
+
+T = TypeVar("T")
+
+
+@dataclass
+class StageResult:
+    stage: str
+    seconds: float = 0.0
+    rows: int = 0
+    peak_rss_mib: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.results: Dict[str, StageResult] = {}
+
+    def run(self, stage: str, func: Callable[[], T], rows: int | None = None) -> T:
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+
+        if rows is None:
+            rows = len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else 0
+        self.add(stage, elapsed, rows)
+        return value
+
+    def add(self, stage: str, seconds: float, rows: int) -> None:
+        result = self.results.setdefault(stage, StageResult(stage))
+        result.seconds += seconds
+        result.rows += rows
+        result.peak_rss_mib = max(result.peak_rss_mib, _peak_rss_mib())
+
+
+def _peak_rss_mib() -> float:
+    # ru_maxrss is a high-water mark, in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _write_synthetic_files(
+    path: Path, rows: int, dirt_ratios: DirtRatios, json_input: bool
+) -> None:
+    path.mkdir(parents=True)
+    write_clinical_trials_file(path / "clinical_trials.csv", rows, dirt_ratios)
+    write_pubmed_file(
+        path / ("pubmed.json" if json_input else "pubmed.csv"), rows, dirt_ratios
+    )
+    write_drugs_file(path / "drugs.csv", rows, dirt_ratios)
+
+
+def _run_stages(
+    timer: StageTimer,
+    incoming_file_path: Path,
+    pipeline: Pipeline,
+    loading_options: LoadingOptions,
+) -> None:
+    name = pipeline.name
+    ingested_data_writer = CsvDataWriter(
+        INGESTED_DATA_PATH / pipeline.target_data_file_name
+    )
+    rejected_data_writer = CsvDataWriter(
+        REJECTED_DATA_PATH / pipeline.target_data_file_name
+    )
+    # Whole files are read by this call, chunks are read when iterated
+    chunks = timer.run(
+        f"{name} load",
+        lambda: iter(load_data_file(incoming_file_path, pipeline, loading_options)),
+        0,
+    )
+    # The cleaning is timed as a whole, and stage by stage (each rule mask on its
+    # own) by the metrics it records
+    metrics = MetricsRecorder(incoming_file_path.name, name)
+    file_rows = 0
+
+    while (df := timer.run(f"{name} load", lambda: next(chunks, None))) is not None:
+        file_rows += len(df)
+        clean_df, dirty_df = timer.run(
+            f"{name} clean", partial(clean_data, df, pipeline, metrics), len(df)
+        )
+        timer.run(
+            f"{name} write",
+            partial(
+                _write_both,
+                ingested_data_writer,
+                clean_df,
+                rejected_data_writer,
+                dirty_df,
+            ),
+            len(df),
+        )
+
+    for stage_metrics in metrics.stages.values():
+        timer.add(
+            f"{name} clean {stage_metrics.stage}",
+            stage_metrics.wall_seconds,
+            stage_metrics.rows_in,
+        )
+    timer.run(
+        f"{name} commit",
+        partial(_commit_both, ingested_data_writer, rejected_data_writer),
+        file_rows,
+    )
+    timer.run(
+        f"{name} move", lambda: move_processed_file(incoming_file_path), file_rows
+    )
+
+
+def _write_both(
+    ingested_data_writer: CsvDataWriter,
+    clean_df: pd.DataFrame,
+    rejected_data_writer: CsvDataWriter,
+    dirty_df: pd.DataFrame,
+) -> None:
+    ingested_data_writer.write(clean_df)
+    rejected_data_writer.write(dirty_df)
+
+
+def _commit_both(
+    ingested_data_writer: CsvDataWriter, rejected_data_writer: CsvDataWriter
+) -> None:
+    ingested_data_writer.commit()
+    rejected_data_writer.commit()
+
+
+def _print_results(results: List[StageResult]) -> None:
+    print(f"{'stage':<62} {'seconds':>9} {'rows/s':>14} {'peak RSS':>12}")
+    for result in results:
+        print(
+            f"{result.stage:<62} {result.seconds:>9.3f}"
+            f" {result.rows_per_second:>14,.0f} {result.peak_rss_mib:>8.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--blank-ratio", type=float, default=0.01)
+    parser.add_argument("--nan-ratio", type=float, default=0.01)
+    parser.add_argument("--bad-date-ratio", type=float, default=0.01)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Write pubmed as json.")
+    parser.add_argument(
+        "--results-file",
+        type=Path,
+        default=None,
+        help="Append the results of the run as a json line to this file.",
+    )
+    args = parser.parse_args()
+
+    dirt_ratios = DirtRatios(args.blank_ratio, args.nan_ratio, args.bad_date_ratio)
+    loading_options = LoadingOptions(chunk_size=args.chunk_size)
+    results_file = args.results_file.absolute() if args.results_file else None
+    timer = StageTimer()
+
+    with tempfile.TemporaryDirectory() as temp_path:
+        os.chdir(temp_path)
+        synthetic_files_path = Path("synthetic")
+        _write_synthetic_files(synthetic_files_path, args.rows, dirt_ratios, args.json)
+
+        # Stage by stage
+        INCOMING_FILES_PATH.mkdir(parents=True)
+        DATALAKE_PATH.mkdir()
+        shutil.copytree(synthetic_files_path, INCOMING_FILES_PATH, dirs_exist_ok=True)
+        preliminary_checks_and_cleaning()
+        for incoming_file_path in list_files(INCOMING_FILES_PATH):
+            pipeline = find_pipeline(incoming_file_path.name)
+            assert pipeline is not None
+            _run_stages(timer, incoming_file_path, pipeline, loading_options)
+
+        # End to end, as run by the command line
+        shutil.copytree(synthetic_files_path, INCOMING_FILES_PATH, dirs_exist_ok=True)
+        timer.run(
+            "end to end ingest_files",
+            lambda: ingest_files(chunk_size=args.chunk_size),
+            3 * args.rows,
+        )
+
+    results = list(timer.results.values())
+    _print_results(results)
+    if results_file is not None:
+        with results_file.open("a", encoding="utf-8") as file:
+            run = {
+                "parameters": vars(args),
+                "stages": [
+                    asdict(result) | {"rows_per_second": result.rows_per_second}
+                    for result in results
+                ],
+            }
+            file.write(json.dumps(run, default=str) + "\n")
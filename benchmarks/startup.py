@@ -0,0 +1,85 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+REPOSITORY_PATH = Path(__file__).parents[1]
+MAIN_PATH = REPOSITORY_PATH / "src" / "main.py"
+SAMPLES_PATH = REPOSITORY_PATH / "data" / "samples"
+
+
+def _timed_runs(
+    label: str,
+    command: List[str],
+    run_path: Path,
+    runs: int,
+    before_run: Callable[[], object] = lambda: None,
+) -> float:
+    # Every run is a new interpreter: imports are paid again, as when an
+    # orchestrator launches one run per file
+    env = {**os.environ, "PYTHONPATH": str(REPOSITORY_PATH / "src")}
+    durations = []
+    for _ in range(runs):
+        before_run()
+        start = time.perf_counter()
+        subprocess.run(command, cwd=run_path, env=env, check=True, capture_output=True)
+        durations.append(time.perf_counter() - start)
+    median = statistics.median(durations)
+    print(f"{label:<30} {median * 1000:>9.1f} ms  (min {min(durations) * 1000:.1f})")
+    return median
+
+
+def _imports_pandas(run_path: Path) -> bool:
+    # Whether a run with nothing to ingest imports pandas
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", str(MAIN_PATH), "--incremental"],
+        cwd=run_path,
+        env={**os.environ, "PYTHONPATH": str(REPOSITORY_PATH / "src")},
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return any(
+        line.rstrip().endswith(" pandas") for line in completed.stderr.splitlines()
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--file-name", default="pubmed.csv")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_path:
+        run_path = Path(temp_path)
+        incoming_path = run_path / "data" / "data_files" / "incoming"
+        incoming_path.mkdir(parents=True)
+        (run_path / "data" / "datalake").mkdir()
+
+        interpreter = _timed_runs(
+            "interpreter only", [sys.executable, "-c", "pass"], run_path, args.runs
+        )
+        no_op = _timed_runs(
+            "no file to ingest",
+            [sys.executable, str(MAIN_PATH), "--incremental"],
+            run_path,
+            args.runs,
+        )
+        single_file = _timed_runs(
+            f"single file ({args.file_name})",
+            [sys.executable, str(MAIN_PATH)],
+            run_path,
+            args.runs,
+            lambda: shutil.copy(SAMPLES_PATH / args.file_name, incoming_path),
+        )
+        print(f"{'no-op overhead':<30} {(no_op - interpreter) * 1000:>9.1f} ms")
+        print(
+            f"{'single file overhead':<30} {(single_file - interpreter) * 1000:>9.1f} ms"
+        )
+        print(f"{'no-op imports pandas':<30} {_imports_pandas(run_path)!s:>9}")
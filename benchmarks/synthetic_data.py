@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_JOURNALS = np.array([f"Journal {i}" for i in range(100)], dtype=object)
+_DRUGS = np.array([f"DRUG{i}" for i in range(1_000)], dtype=object)
+_BAD_DATES = np.array(["32/13/2020", "not a date", "2020-02-30"], dtype=object)
+
+
+@dataclass(frozen=True)
+class DirtRatios:
+    blank: float = 0.01
+    nan: float = 0.01
+    bad_date: float = 0.01
+
+
+def write_clinical_trials_file(
+    file_path: Path, rows: int, dirt_ratios: DirtRatios, seed: int = 0
+) -> None:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "id": [f"NCT{i:08d}" for i in range(rows)],
+            "scientific_title": [f"Scientific title {i}" for i in range(rows)],
+            "date": _random_dates(rng, rows).strftime("%d %B %Y"),
+            "journal": _JOURNALS[rng.integers(0, len(_JOURNALS), rows)],
+        }
+    )
+    _add_dirt(df, rng, dirt_ratios, "scientific_title", "journal")
+    df.to_csv(file_path, index=False)
+
+
+def write_pubmed_file(
+    file_path: Path, rows: int, dirt_ratios: DirtRatios, seed: int = 0
+) -> None:
+    rng = np.random.default_rng(seed)
+    dates = _random_dates(rng, rows)
+    # Mostly dd/mm/yyyy dates, with some iso ones as in the samples
+    formatted_dates = np.where(
+        rng.random(rows) < 0.9, dates.strftime("%d/%m/%Y"), dates.strftime("%Y-%m-%d")
+    )
+    df = pd.DataFrame(
+        {
+            "id": np.arange(rows),
+            "title": [f"Title of article {i}" for i in range(rows)],
+            "date": formatted_dates,
+            "journal": _JOURNALS[rng.integers(0, len(_JOURNALS), rows)],
+        }
+    )
+    _add_dirt(df, rng, dirt_ratios, "title", "journal")
+    if file_path.suffix == ".json":
+        df.to_json(file_path, orient="records", indent=2)
+    else:
+        df.to_csv(file_path, index=False)
+
+
+def write_drugs_file(
+    file_path: Path, rows: int, dirt_ratios: DirtRatios, seed: int = 0
+) -> None:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "atccode": [f"A{i:06d}" for i in range(rows)],
+            "drug": _DRUGS[rng.integers(0, len(_DRUGS), rows)],
+        }
+    )
+    df.loc[rng.random(rows) < dirt_ratios.nan, "drug"] = np.nan
+    df.to_csv(file_path, index=False)
+
+
+def _random_dates(rng: np.random.Generator, rows: int) -> pd.DatetimeIndex:
+    return pd.Timestamp("2019-01-01") + pd.to_timedelta(
+        rng.integers(0, 1000, rows), unit="D"
+    )
+
+
+def _add_dirt(
+    df: pd.DataFrame,
+    rng: np.random.Generator,
+    dirt_ratios: DirtRatios,
+    text_column: str,
+    nullable_column: str,
+) -> None:
+    rows = len(df)
+    df.loc[rng.random(rows) < dirt_ratios.blank, text_column] = "  "
+    df.loc[rng.random(rows) < dirt_ratios.nan, nullable_column] = np.nan
+    bad_dates = rng.random(rows) < dirt_ratios.bad_date
+    df.loc[bad_dates, "date"] = _BAD_DATES[
+        rng.integers(0, len(_BAD_DATES), int(bad_dates.sum()))
+    ]
@@ -0,0 +1,218 @@
+import json
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from cleaning_loading_app.const import AGGREGATES_PATH
+from cleaning_loading_app.drug_mentions import (
+    load_drug_mentions_state,
+    load_new_drug_mentions,
+)
+from cleaning_loading_app.filesystem import (
+    replace_file_atomically,
+    write_file_atomically,
+)
+
+JOURNAL_DRUG_COUNTS_FILE_PATH = AGGREGATES_PATH / "journal_drug_counts.csv"
+DATE_MENTION_COUNTS_FILE_PATH = AGGREGATES_PATH / "date_mention_counts.csv"
+DRUG_COOCCURRENCES_FILE_PATH = AGGREGATES_PATH / "drug_cooccurrences.csv"
+AGGREGATES_STATE_PATH = AGGREGATES_PATH / "state.json"
+
+
+# Mentions of each drug by each journal and at each date, and number of journals
+# mentioning each pair of drugs (stored once, the first drug before the other)
+@dataclass(frozen=True)
+class Aggregates:
+    journal_drug_counts: pd.DataFrame
+    date_mention_counts: pd.DataFrame
+    drug_cooccurrences: pd.DataFrame
+
+    @classmethod
+    def empty(cls) -> "Aggregates":
+        return cls(
+            _empty_counts(["journal", "drug"], "mentions"),
+            _empty_counts(["date", "drug"], "mentions"),
+            _empty_counts(["drug", "other_drug"], "journals"),
+        )
+
+    def add(self, mentions: pd.DataFrame) -> "Aggregates":
+        journal_mentions = mentions.dropna(subset=["journal"])
+        journal_drug_counts = _count(journal_mentions, ["journal", "drug"], "mentions")
+        date_mention_counts = _count(
+            mentions.dropna(subset=["date"]), ["date", "drug"], "mentions"
+        )
+
+        # A pair of drugs shares one more journal when it is the first mention of
+        # either one by this journal
+        known_journal_drugs = pd.MultiIndex.from_frame(
+            self.journal_drug_counts[["journal", "drug"]]
+        )
+        new_journal_drugs = journal_drug_counts[
+            ~pd.MultiIndex.from_frame(journal_drug_counts[["journal", "drug"]]).isin(
+                known_journal_drugs
+            )
+        ]
+        journal_drug_counts = _add_counts(
+            self.journal_drug_counts, journal_drug_counts, ["journal", "drug"]
+        )
+        pairs = new_journal_drugs[["journal", "drug"]].merge(
+            journal_drug_counts[["journal", "drug"]].rename(
+                columns={"drug": "other_drug"}
+            ),
+            on="journal",
+        )
+        pairs = pairs[pairs["drug"] != pairs["other_drug"]]
+        drug_first = (pairs["drug"] < pairs["other_drug"]).to_numpy()
+        pairs = pd.DataFrame(
+            {
+                "journal": pairs["journal"],
+                "drug": np.where(drug_first, pairs["drug"], pairs["other_drug"]),
+                "other_drug": np.where(drug_first, pairs["other_drug"], pairs["drug"]),
+            }
+        ).drop_duplicates()
+
+        return Aggregates(
+            journal_drug_counts,
+            _add_counts(
+                self.date_mention_counts, date_mention_counts, ["date", "drug"]
+            ),
+            _add_counts(
+                self.drug_cooccurrences,
+                _count(pairs, ["drug", "other_drug"], "journals"),
+                ["drug", "other_drug"],
+            ),
+        )
+
+    def journals_by_distinct_drugs(self) -> pd.DataFrame:
+        # Journals mentioning the most distinct drugs first
+        return (
+            self.journal_drug_counts.groupby("journal")
+            .size()
+            .rename("drugs")
+            .reset_index()
+            .sort_values(["drugs", "journal"], ascending=[False, True])
+            .reset_index(drop=True)
+        )
+
+    def drugs_sharing_journals(self, drug: str) -> pd.DataFrame:
+        # Drugs mentioned by the same journals as `drug`, most shared journals first
+        cooccurrences = self.drug_cooccurrences
+        return (
+            pd.concat(
+                [
+                    cooccurrences.loc[
+                        cooccurrences["drug"] == drug, ["other_drug", "journals"]
+                    ],
+                    cooccurrences.loc[
+                        cooccurrences["other_drug"] == drug, ["drug", "journals"]
+                    ].rename(columns={"drug": "other_drug"}),
+                ]
+            )
+            .rename(columns={"other_drug": "drug"})
+            .sort_values(["journals", "drug"], ascending=[False, True])
+            .reset_index(drop=True)
+        )
+
+
+# Size of the mentions file aggregated so far, and whether an update was
+# interrupted while replacing the tables
+@dataclass
+class AggregatesState:
+    mentions_generation: str = ""
+    mentions_file_size: int = 0
+    updating: bool = False
+
+
+def update_aggregates() -> int:
+    # Adds the drug mentions indexed since the last update to the aggregate
+    # tables, and returns their number. Every mention is aggregated again when the
+    # mentions were indexed again from scratch, or when an update was interrupted.
+    AGGREGATES_PATH.mkdir(exist_ok=True)
+    mentions_state = load_drug_mentions_state()
+    state = _load_state()
+    aggregates = load_aggregates()
+    if state.updating or state.mentions_generation != mentions_state.generation:
+        logging.info("Aggregating every drug mention.")
+        state = AggregatesState(mentions_generation=mentions_state.generation)
+        aggregates = Aggregates.empty()
+
+    mentions = load_new_drug_mentions(mentions_state, state.mentions_file_size)
+    if mentions.empty and state.mentions_file_size > 0:
+        return 0
+    aggregates = aggregates.add(mentions)
+
+    state.updating = True
+    write_file_atomically(AGGREGATES_STATE_PATH, json.dumps(asdict(state)))
+    for table, file_path in (
+        (aggregates.journal_drug_counts, JOURNAL_DRUG_COUNTS_FILE_PATH),
+        (aggregates.date_mention_counts, DATE_MENTION_COUNTS_FILE_PATH),
+        (aggregates.drug_cooccurrences, DRUG_COOCCURRENCES_FILE_PATH),
+    ):
+        _save_table(table, file_path)
+    state.mentions_file_size = mentions_state.mentions_file_size
+    state.updating = False
+    write_file_atomically(AGGREGATES_STATE_PATH, json.dumps(asdict(state)))
+    return len(mentions)
+
+
+def load_aggregates() -> Aggregates:
+    empty = Aggregates.empty()
+    return Aggregates(
+        _load_table(JOURNAL_DRUG_COUNTS_FILE_PATH, empty.journal_drug_counts),
+        _load_table(DATE_MENTION_COUNTS_FILE_PATH, empty.date_mention_counts),
+        _load_table(DRUG_COOCCURRENCES_FILE_PATH, empty.drug_cooccurrences),
+    )
+
+
+def _empty_counts(key_columns: List[str], count_column: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            **{column: pd.Series(dtype=object) for column in key_columns},
+            count_column: pd.Series(dtype="int64"),
+        }
+    )
+
+
+def _count(df: pd.DataFrame, key_columns: List[str], count_column: str) -> pd.DataFrame:
+    if df.empty:
+        return _empty_counts(key_columns, count_column)
+    return df.groupby(key_columns).size().rename(count_column).reset_index()
+
+
+def _add_counts(
+    counts: pd.DataFrame, new_counts: pd.DataFrame, key_columns: List[str]
+) -> pd.DataFrame:
+    if new_counts.empty:
+        return counts
+    return (
+        pd.concat([counts, new_counts], ignore_index=True)
+        .groupby(key_columns)
+        .sum()
+        .reset_index()
+    )
+
+
+def _load_table(file_path: Path, empty_table: pd.DataFrame) -> pd.DataFrame:
+    if not file_path.exists():
+        return empty_table
+    return pd.read_csv(
+        file_path,
+        dtype={column: str for column in empty_table.columns[:-1]},
+        keep_default_na=False,
+    )
+
+
+def _save_table(table: pd.DataFrame, file_path: Path) -> None:
+    temporary_file_path = file_path.with_name(f".{file_path.name}.tmp")
+    table.to_csv(temporary_file_path, index=False)
+    replace_file_atomically(temporary_file_path, file_path)
+
+
+def _load_state() -> AggregatesState:
+    if not AGGREGATES_STATE_PATH.exists():
+        return AggregatesState()
+    return AggregatesState(**json.loads(AGGREGATES_STATE_PATH.read_text()))
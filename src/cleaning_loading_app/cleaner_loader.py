@@ -1,87 +1,386 @@
 import logging
+import os
+from contextlib import ExitStack
+from dataclasses import replace
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
-import pandas as pd
-
+from cleaning_loading_app.compression import OutputCompression
 from cleaning_loading_app.const import (
     INCOMING_FILES_PATH,
     INGESTED_DATA_PATH,
+    KEY_INDEXES_PATH,
+    MANIFEST_PATH,
     REJECTED_DATA_PATH,
-)
-from cleaning_loading_app.csv_io import (
-    load_cvs_with_date_parsing,
-    load_json_without_date_parsing,
-    save_cvs_in_proper_format,
+    CsvEngine,
 )
 from cleaning_loading_app.filesystem import (
+    commit_part_file,
+    list_files,
+    lock_part_files,
     move_processed_file,
     preliminary_checks_and_cleaning,
 )
-from cleaning_loading_app.transformations import (
-    convert_string_to_date,
-    ensure_column_is_int,
-    remove_rows_with_empty_or_spaces_only_string_fields,
-    remove_rows_with_nan_fields,
+from cleaning_loading_app.loading import FileIngestionResult, LoadingOptions
+from cleaning_loading_app.manifest import (
+    FileFingerprint,
+    ManifestEntry,
+    fingerprint_file,
+    is_already_ingested,
+    load_manifest,
+    record_ingested_file,
+)
+from cleaning_loading_app.metrics import (
+    MetricsRecorder,
+    merge_stage_metrics,
+    save_metrics,
 )
+from cleaning_loading_app.pipelines import PIPELINES, Pipeline, find_pipeline
 
+if TYPE_CHECKING:
+    from cleaning_loading_app.deduplication import KeyIndex
 
-def ingest_files() -> None:
-    preliminary_checks_and_cleaning()
+# Key indexes of the files ingested one at a time by this process (e.g. by a worker
+# of the watcher), kept in memory from one file to the next
+_loaded_key_indexes: Dict[Path, "KeyIndex"] = {}
 
-    _clean_and_load_data_file(INCOMING_FILES_PATH / "clinical_trials.csv")
-    _clean_and_load_data_file(INCOMING_FILES_PATH / "pubmed.csv")
-    _clean_and_load_data_file(INCOMING_FILES_PATH / "pubmed.json")
-    _clean_and_load_data_file(INCOMING_FILES_PATH / "drugs.csv")
 
+def ingest_files(
+    chunk_size: int | None = None,
+    workers: int | None = None,
+    incremental: bool = False,
+    output_format: str = "csv",
+    csv_engine: CsvEngine = "c",
+    metrics_file: Path | None = None,
+    memory_map: bool = False,
+    partitions: int = 1,
+    output_compression: OutputCompression | None = None,
+    deduplicate: bool = False,
+    partition_by_date: bool = False,
+) -> None:
+    loading_options = LoadingOptions(
+        chunk_size=chunk_size,
+        csv_engine=csv_engine,
+        memory_map=memory_map,
+        partitions=partitions,
+        deduplicate=deduplicate,
+        collect_metrics=metrics_file is not None,
+    )
+    if workers is None:
+        # Row partitions are cleaned in parallel, on up to one process per CPU
+        workers = min(partitions, os.cpu_count() or 1)
+    preliminary_checks_and_cleaning(incremental)
+    run_id = new_run_id()
 
-def _clean_and_load_data_file(incoming_file_path: Path) -> None:
-    if not incoming_file_path.exists():
+    incoming_files = _discover_incoming_files()
+    # Full runs have just wiped the manifest: their files are recorded without
+    # being read to be hashed
+    manifest = load_manifest(MANIFEST_PATH) if incremental else {}
+    fingerprints = _fingerprint_files(incoming_files, manifest, incremental)
+    if incremental:
+        incoming_files = _skip_already_ingested_files(
+            incoming_files, manifest, fingerprints
+        )
+
+    if not incoming_files:
         logging.warning(
-            f"No file to import: '{incoming_file_path}' not found. Doing nothing..."
+            f"No file to import in '{INCOMING_FILES_PATH}'. Doing nothing..."
         )
         return
 
-    pipeline_type = incoming_file_path.stem
+    # pandas is only imported once there is a file to process
+    from cleaning_loading_app import file_loader
 
-    logging.info(f"Cleaning and loading file '{incoming_file_path}'.")
-    if incoming_file_path.suffix == ".csv":
-        date_columns = None if pipeline_type == "drugs" else ["date"]
-        df = load_cvs_with_date_parsing(incoming_file_path, date_columns)
-    elif incoming_file_path.suffix == ".json":
-        df = load_json_without_date_parsing(incoming_file_path)
+    if workers > 1 or partitions > 1:
+        results = _clean_and_load_data_files_in_parallel(
+            incoming_files,
+            loading_options,
+            workers,
+            output_format,
+            output_compression,
+            run_id,
+            partition_by_date,
+        )
     else:
-        logging.warning(
-            f"Unsupported file suffix {incoming_file_path.suffix!r}. "
-            "Aborting processing..."
+        # The key index of a pipeline is loaded once and shared by its files
+        key_indexes = {
+            pipeline.name: file_loader.build_key_index(pipeline, loading_options)
+            for _, pipeline in incoming_files
+        }
+        results = [
+            _move_ingested_file(
+                incoming_file_path,
+                pipeline,
+                file_loader.clean_and_load_data_file(
+                    incoming_file_path,
+                    pipeline,
+                    *file_loader.build_data_writers(
+                        pipeline,
+                        output_format,
+                        output_compression,
+                        run_id,
+                        file_index,
+                        partition_by_date=partition_by_date,
+                    ),
+                    loading_options,
+                    key_index=key_indexes[pipeline.name],
+                ),
+                loading_options,
+            )
+            for file_index, (incoming_file_path, pipeline) in enumerate(incoming_files)
+        ]
+
+    for (incoming_file_path, _), result in zip(incoming_files, results, strict=True):
+        record_ingested_file(
+            MANIFEST_PATH,
+            fingerprints[incoming_file_path],
+            result.ingested_rows,
+            result.rejected_rows,
         )
-        exit(1)
 
-    all_dirty_elements = pd.DataFrame()
+    if metrics_file is not None:
+        save_metrics(
+            metrics_file, run_id, (stage for r in results for stage in r.stages)
+        )
+
+
+def new_run_id() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def ingest_incoming_file(
+    incoming_file_path: Path,
+    pipeline: Pipeline,
+    known_entry: ManifestEntry | None,
+    loading_options: LoadingOptions,
+    output_format: str,
+    output_compression: OutputCompression | None,
+    run_id: str,
+    file_index: int,
+    partition_by_date: bool = False,
+) -> Tuple[FileFingerprint, FileIngestionResult | None]:
+    # Ingests a single file end to end, e.g. as soon as it lands (see `watcher`).
+    # No result is returned for a file already ingested with the same content.
+    fingerprint = fingerprint_file(incoming_file_path, known_entry)
+    if known_entry is not None and is_already_ingested(
+        {fingerprint.file_name: known_entry}, fingerprint
+    ):
+        logging.info(
+            f"File '{incoming_file_path}' already ingested with the same "
+            "content. Skipping..."
+        )
+        move_processed_file(incoming_file_path)
+        return fingerprint, None
+
+    from cleaning_loading_app import file_loader
+
+    key_index = _load_key_index(pipeline, loading_options)
+    try:
+        result = file_loader.clean_and_load_data_file(
+            incoming_file_path,
+            pipeline,
+            *file_loader.build_data_writers(
+                pipeline,
+                output_format,
+                output_compression,
+                run_id,
+                file_index,
+                partition_by_date=partition_by_date,
+            ),
+            loading_options,
+            key_index=key_index,
+        )
+    except Exception:
+        # The index may hold keys of rows that were never committed
+        if key_index is not None:
+            _loaded_key_indexes.pop(key_index.index_file_path.absolute(), None)
+        raise
+    return fingerprint, _move_ingested_file(
+        incoming_file_path, pipeline, result, loading_options
+    )
 
-    if pipeline_type != "drugs":
-        if incoming_file_path.suffix == ".json":
-            df, all_dirty_elements = convert_string_to_date(
-                df, "date", all_dirty_elements
+
+def _load_key_index(
+    pipeline: Pipeline, loading_options: LoadingOptions
+) -> "KeyIndex | None":
+    # Only the keys committed since the previous file of the pipeline are read
+    from cleaning_loading_app import file_loader
+
+    key_index = file_loader.build_key_index(pipeline, loading_options)
+    if key_index is None:
+        return None
+    key_index = _loaded_key_indexes.setdefault(
+        key_index.index_file_path.absolute(), key_index
+    )
+    key_index.read_appended_keys()
+    return key_index
+
+
+def _discover_incoming_files() -> List[Tuple[Path, Pipeline]]:
+    # The landing zone is scanned once. Files are then ordered by pipeline, and by
+    # name within a pipeline, so that they are always loaded in the same order.
+    incoming_files = []
+    for incoming_file_path in list_files(INCOMING_FILES_PATH):
+        pipeline = find_pipeline(incoming_file_path.name)
+        if pipeline is None:
+            logging.warning(
+                f"No pipeline matches file '{incoming_file_path}'. Leaving it..."
             )
+            continue
+        incoming_files.append((incoming_file_path, pipeline))
+
+    return sorted(incoming_files, key=lambda file: PIPELINES.index(file[1]))
 
-        df, all_dirty_elements = remove_rows_with_empty_or_spaces_only_string_fields(
-            df, all_dirty_elements
+
+def _fingerprint_files(
+    incoming_files: List[Tuple[Path, Pipeline]],
+    manifest: Dict[str, ManifestEntry],
+    hash_content: bool,
+) -> Dict[Path, FileFingerprint]:
+    # Only files whose size or modification time changed since they were
+    # recorded in the manifest, or not recorded yet, are hashed
+    return {
+        incoming_file_path: fingerprint_file(
+            incoming_file_path, manifest.get(incoming_file_path.name), hash_content
         )
+        for incoming_file_path, _ in incoming_files
+    }
+
+
+def _skip_already_ingested_files(
+    incoming_files: List[Tuple[Path, Pipeline]],
+    manifest: Dict[str, ManifestEntry],
+    fingerprints: Dict[Path, FileFingerprint],
+) -> List[Tuple[Path, Pipeline]]:
+    new_incoming_files = []
+    for incoming_file_path, pipeline in incoming_files:
+        if is_already_ingested(manifest, fingerprints[incoming_file_path]):
+            logging.info(
+                f"File '{incoming_file_path}' already ingested with the same "
+                "content. Skipping..."
+            )
+            move_processed_file(incoming_file_path)
+            continue
+        new_incoming_files.append((incoming_file_path, pipeline))
+    return new_incoming_files
 
-        df, all_dirty_elements = remove_rows_with_nan_fields(df, all_dirty_elements)
 
-        if pipeline_type == "pubmed":
-            df, all_dirty_elements = ensure_column_is_int(df, "id", all_dirty_elements)
+def _clean_and_load_data_files_in_parallel(
+    incoming_files: List[Tuple[Path, Pipeline]],
+    loading_options: LoadingOptions,
+    workers: int,
+    output_format: str,
+    output_compression: OutputCompression | None,
+    run_id: str,
+    partition_by_date: bool,
+) -> List[FileIngestionResult]:
+    # Every file, or every row partition of a file, is a unit of work. Csv data
+    # files are appended to: each unit is saved to its own part files, which are
+    # then appended to the target data files in the order of the units. Files
+    # sharing a target (e.g. pubmed.csv and pubmed.json) and partitions of a file
+    # are thus merged as they would be when processed one after the other.
+    from concurrent.futures import ProcessPoolExecutor
 
-    target_data_file_name = _build_target_data_file_name(incoming_file_path)
-    ingested_data_file_path = INGESTED_DATA_PATH / target_data_file_name
-    rejected_data_file_path = REJECTED_DATA_PATH / target_data_file_name
+    from cleaning_loading_app import file_loader
 
-    save_cvs_in_proper_format(ingested_data_file_path, df)
-    save_cvs_in_proper_format(rejected_data_file_path, all_dirty_elements)
+    write_csv_parts = output_format == "csv"
+    units = file_loader.split_incoming_files(incoming_files, loading_options.partitions)
+    key_indexes = file_loader.build_unit_key_indexes(units, loading_options)
 
-    move_processed_file(incoming_file_path)
+    # Part files of the units are only committed once every unit is done
+    with ExitStack() as part_files_locks:
+        for data_path in (INGESTED_DATA_PATH, REJECTED_DATA_PATH, KEY_INDEXES_PATH):
+            part_files_locks.enter_context(lock_part_files(data_path))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    file_loader.clean_and_load_data_file_unit,
+                    path,
+                    pipeline,
+                    *file_loader.build_data_writers(
+                        pipeline,
+                        output_format,
+                        output_compression,
+                        run_id,
+                        unit_index,
+                        write_csv_parts,
+                        partition_by_date,
+                    ),
+                    loading_options,
+                    byte_range,
+                    key_indexes[unit_index],
+                )
+                for unit_index, (_, path, pipeline, byte_range) in enumerate(units)
+            ]
+            unit_results = [future.result() for future in futures]
+
+        if write_csv_parts:
+            for unit_index, (_, _, pipeline, _) in enumerate(units):
+                target_data_file_name = file_loader.build_target_data_file_name(
+                    pipeline, compression=output_compression
+                )
+                part_file_name = file_loader.build_target_data_file_name(
+                    pipeline, unit_index
+                )
+                for data_path in (INGESTED_DATA_PATH, REJECTED_DATA_PATH):
+                    commit_part_file(
+                        data_path / part_file_name,
+                        data_path / target_data_file_name,
+                        output_compression,
+                    )
+
+        # Keys kept by a unit are indexed once its rows are committed
+        for key_index in key_indexes:
+            if key_index is not None and key_index.part_file_path is not None:
+                commit_part_file(
+                    key_index.part_file_path,
+                    key_index.index_file_path,
+                    has_header=False,
+                )
+
+    # Incoming files are moved once all their units are committed
+    return [
+        _move_ingested_file(
+            path,
+            pipeline,
+            _merge_results(
+                [
+                    result
+                    for (unit_file_index, *_), result in zip(
+                        units, unit_results, strict=True
+                    )
+                    if unit_file_index == file_index
+                ]
+            ),
+            loading_options,
+        )
+        for file_index, (path, pipeline) in enumerate(incoming_files)
+    ]
+
+
+def _merge_results(results: List[FileIngestionResult]) -> FileIngestionResult:
+    return FileIngestionResult(
+        sum(result.ingested_rows for result in results),
+        sum(result.rejected_rows for result in results),
+        merge_stage_metrics(stage for result in results for stage in result.stages),
+    )
+
+
+def _move_ingested_file(
+    incoming_file_path: Path,
+    pipeline: Pipeline,
+    result: FileIngestionResult,
+    loading_options: LoadingOptions,
+) -> FileIngestionResult:
+    if not incoming_file_path.exists():
+        return result
 
+    metrics = MetricsRecorder(
+        incoming_file_path.name, pipeline.name, loading_options.collect_metrics
+    )
+    with metrics.measure("move") as rows:
+        move_processed_file(incoming_file_path)
+        rows.rows_in = rows.rows_out = result.ingested_rows + result.rejected_rows
 
-def _build_target_data_file_name(incoming_file_path: Path) -> str:
-    return incoming_file_path.with_suffix(".csv").name
+    return replace(result, stages=[*result.stages, *metrics.stages.values()])
@@ -0,0 +1,81 @@
+import bz2
+import gzip
+import lzma
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, Literal, TextIO, Tuple, cast
+
+# Compressed files are recognized by their last suffix (e.g. pubmed.csv.gz)
+COMPRESSIONS_BY_SUFFIX = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zstd",
+}
+OutputCompression = Literal["gzip", "zstd"]
+OUTPUT_COMPRESSIONS = ("gzip", "zstd")
+OUTPUT_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def split_compression_suffix(file_name: str) -> Tuple[str, str | None]:
+    # "pubmed.csv.gz" gives ("pubmed.csv", "gzip")
+    path = Path(file_name)
+    compression = COMPRESSIONS_BY_SUFFIX.get(path.suffix)
+    if compression is None:
+        return file_name, None
+    return file_name[: -len(path.suffix)], compression
+
+
+def open_text(file_path: Path) -> TextIO:
+    # Compressed files are decompressed on the fly, while being read
+    _, compression = split_compression_suffix(file_path.name)
+    if compression == "gzip":
+        return gzip.open(file_path, "rt", encoding="utf-8")
+    if compression == "bz2":
+        return bz2.open(file_path, "rt", encoding="utf-8")
+    if compression == "xz":
+        return lzma.open(file_path, "rt", encoding="utf-8")
+    if compression == "zstd":
+        return cast(TextIO, _zstandard().open(file_path, "rt", encoding="utf-8"))
+    return file_path.open(encoding="utf-8")
+
+
+def open_binary(file_path: Path) -> BinaryIO:
+    # Same as `open_text`, for readers of bytes (e.g. pyarrow)
+    _, compression = split_compression_suffix(file_path.name)
+    if compression == "gzip":
+        return cast(BinaryIO, gzip.open(file_path, "rb"))
+    if compression == "bz2":
+        return cast(BinaryIO, bz2.open(file_path, "rb"))
+    if compression == "xz":
+        return cast(BinaryIO, lzma.open(file_path, "rb"))
+    if compression == "zstd":
+        return cast(BinaryIO, _zstandard().open(file_path, "rb"))
+    return file_path.open("rb")
+
+
+@contextmanager
+def compressed_writer(
+    binary_file: BinaryIO, compression: OutputCompression
+) -> Iterator[Any]:
+    # Data written is compressed as a new gzip member or zstd frame, so that it can
+    # be appended to a file holding previous ones
+    if compression == "gzip":
+        with gzip.GzipFile(fileobj=binary_file, mode="wb") as gzip_file:
+            yield gzip_file
+    elif compression == "zstd":
+        zstd_compressor = _zstandard().ZstdCompressor()
+        with zstd_compressor.stream_writer(binary_file, closefd=False) as zstd_file:
+            yield zstd_file
+    else:
+        raise ValueError(f"Unsupported output compression {compression!r}")
+
+
+def _zstandard() -> Any:
+    try:
+        import zstandard
+    except ImportError as error:
+        raise ImportError(
+            "zstd compressed files require zstandard: `poetry install --extras zstd`"
+        ) from error
+    return zstandard
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 DATA_PATH = Path("data")
 DATAFILES_PATH = DATA_PATH / "data_files"
@@ -7,3 +8,17 @@ INCOMING_FILES_PATH = DATAFILES_PATH / "incoming"
 PROCESSED_FILES_PATH = DATAFILES_PATH / "processed"
 INGESTED_DATA_PATH = DATALAKE_PATH / "ingested"
 REJECTED_DATA_PATH = DATALAKE_PATH / "rejected"
+KEY_INDEXES_PATH = DATALAKE_PATH / "keys"
+DRUG_MENTIONS_PATH = DATALAKE_PATH / "drug_mentions"
+AGGREGATES_PATH = DATALAKE_PATH / "aggregates"
+MANIFEST_PATH = DATALAKE_PATH / "manifest.jsonl"
+
+# Constants used before any file is processed (e.g. to parse the command line) are
+# kept here, in a module that does not import pandas
+CsvEngine = Literal["c", "pyarrow"]
+CSV_ENGINES = ("c", "pyarrow")
+OUTPUT_FORMATS = ("csv", "parquet")
+
+# Formats found in the incoming files, tried in this order when a pipeline does not
+# give its own
+KNOWN_DATE_FORMATS = ("%d/%m/%Y", "%d %B %Y", "%Y-%m-%d")
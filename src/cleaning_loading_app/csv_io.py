@@ -1,30 +1,425 @@
 import csv
+import io
+import json
+import mmap
+import re
+from itertools import islice, pairwise
 from pathlib import Path
-from typing import List, TextIO
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Mapping,
+    Sequence,
+    TextIO,
+    Tuple,
+)
 
+import numpy as np
 import pandas as pd
 
+from cleaning_loading_app.compression import (
+    OutputCompression,
+    open_binary,
+    open_text,
+    split_compression_suffix,
+)
+from cleaning_loading_app.const import CsvEngine
+from cleaning_loading_app.dates import parse_dates
+
+JSON_READ_BLOCK_SIZE = 1024 * 1024
+CSV_SCAN_BLOCK_SIZE = 16 * 1024 * 1024
+_JSON_SEPARATORS = re.compile(r"[\s,]*")
+
 
 def load_cvs_with_date_parsing(
     file_path: Path | TextIO,
     date_columns: List[str] | None = None,
+    dtypes: Mapping[Hashable, Any] | None = None,
+    date_formats: Sequence[str] | None = None,
+    engine: CsvEngine = "c",
+    memory_map: bool = False,
+) -> pd.DataFrame:
+    # With `memory_map`, the parser reads the file straight from its memory
+    # mapping (i.e. from the page cache) instead of copying it block by block.
+    if date_columns and date_formats is None:
+        # Mixed format dates can only be parsed by the c engine
+        return pd.read_csv(
+            file_path,
+            header=0,
+            dtype=dtypes,  # type: ignore[arg-type]
+            parse_dates=date_columns,  # type: ignore[arg-type]
+            date_format="mixed",
+            dayfirst=True,
+            memory_map=memory_map,
+        )
+
+    dtypes = _with_string_date_columns(dtypes, date_columns)
+    if engine == "pyarrow" and isinstance(file_path, Path):
+        df = _read_csv_with_pyarrow(file_path, dtypes, memory_map)
+    else:
+        df = pd.read_csv(
+            file_path,
+            header=0,
+            dtype=dtypes,  # type: ignore[arg-type]
+            memory_map=memory_map,
+        )
+    return _parse_date_columns(df, date_columns, date_formats or ())
+
+
+def _read_csv_with_pyarrow(
+    file_path: Path,
+    dtypes: Mapping[Hashable, Any],
+    memory_map: bool = False,
 ) -> pd.DataFrame:
-    return pd.read_csv(
+    # pyarrow is called directly, as pandas' pyarrow engine infers the column
+    # types before applying `dtype` (e.g. an id "1" read as str gives "1.0").
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    string_columns = [
+        column for column, dtype in dtypes.items() if dtype in (str, object)
+    ]
+
+    def read_table(source: Any) -> Any:
+        return pa_csv.read_csv(
+            source,
+            parse_options=pa_csv.ParseOptions(invalid_row_handler=_skip_blank_row),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={column: pa.string() for column in string_columns},
+                strings_can_be_null=True,
+            ),
+        )
+
+    _, compression = split_compression_suffix(file_path.name)
+    if compression is not None:
+        # Decompressed here rather than by pyarrow, which only guesses some
+        # compressions from the file suffix (e.g. not xz)
+        with open_binary(file_path) as csv_file:
+            table = read_table(csv_file)
+    else:
+        table = read_table(pa.memory_map(str(file_path)) if memory_map else file_path)
+    df: pd.DataFrame = table.to_pandas()
+    return df.astype(
+        {
+            column: dtype
+            for column, dtype in dtypes.items()
+            if column not in string_columns
+        }
+    )
+
+
+def _skip_blank_row(row: Any) -> str:
+    # Same as the c engine, which ignores lines of blank characters only
+    return "skip" if not row.text.strip() else "error"
+
+
+def iter_cvs_chunks_with_date_parsing(
+    file_path: Path | TextIO,
+    chunk_size: int,
+    date_columns: List[str] | None = None,
+    dtypes: Mapping[Hashable, Any] | None = None,
+    date_formats: Sequence[str] | None = None,
+    memory_map: bool = False,
+) -> Iterator[pd.DataFrame]:
+    if dtypes is None:
+        # Dtypes are inferred on the whole file first so that every chunk gets the
+        # dtypes a whole file load would have given (and is saved the same way).
+        dtypes = _infer_csv_dtypes(file_path, chunk_size, date_columns or [])
+        if not isinstance(file_path, Path):
+            file_path.seek(0)
+
+    if date_columns and date_formats is None:
+        with pd.read_csv(
+            file_path,
+            header=0,
+            dtype=dtypes,  # type: ignore[arg-type]
+            parse_dates=date_columns,  # type: ignore[arg-type]
+            date_format="mixed",
+            dayfirst=True,
+            chunksize=chunk_size,
+            memory_map=memory_map,
+        ) as reader:
+            yield from reader
+        return
+
+    with pd.read_csv(
         file_path,
         header=0,
-        parse_dates=date_columns,  # type: ignore[arg-type]
-        date_format="mixed",
-        dayfirst=True,
+        dtype=_with_string_date_columns(dtypes, date_columns),
+        chunksize=chunk_size,
+        memory_map=memory_map,
+    ) as reader:
+        for chunk in reader:
+            yield _parse_date_columns(chunk, date_columns, date_formats or ())
+
+
+def read_csv_header(file_path: Path) -> List[str]:
+    with file_path.open(encoding="utf-8", newline="") as csv_file:
+        return next(csv.reader(csv_file), [])
+
+
+def split_csv_into_byte_ranges(file_path: Path, parts: int) -> List[Tuple[int, int]]:
+    # Splits the rows of a csv file (after its header) into about `parts` ranges of
+    # bytes of the same size, each one starting at the beginning of a row. Line
+    # breaks inside quoted values are not row boundaries: the quotes before a
+    # boundary are counted, and a row starts only after an even number of them.
+    file_size = file_path.stat().st_size
+    if file_size == 0:
+        return []
+
+    with (
+        file_path.open("rb") as csv_file,
+        mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file,
+    ):
+        boundaries = [_next_row_start(mapped_file, 0, 0)]
+        data_size = file_size - boundaries[0]
+        for part in range(1, parts):
+            target = boundaries[0] + data_size * part // parts
+            if target <= boundaries[-1]:
+                continue
+            boundary = _next_row_start(mapped_file, boundaries[-1], target)
+            if boundary >= file_size:
+                break
+            boundaries.append(boundary)
+
+    boundaries.append(file_size)
+    return [(start, end) for start, end in pairwise(boundaries) if end > start]
+
+
+def _next_row_start(mapped_file: mmap.mmap, row_start: int, target: int) -> int:
+    in_quotes = _count_quotes(mapped_file, row_start, target) % 2 == 1
+    position = target
+    while True:
+        line_end = mapped_file.find(b"\n", position)
+        if line_end == -1:
+            return len(mapped_file)
+        in_quotes ^= _count_quotes(mapped_file, position, line_end) % 2 == 1
+        if not in_quotes:
+            return line_end + 1
+        position = line_end + 1
+
+
+def _count_quotes(mapped_file: mmap.mmap, start: int, end: int) -> int:
+    # Counted block by block on views of the mapping, without copying the file
+    quotes = 0
+    for block_start in range(start, end, CSV_SCAN_BLOCK_SIZE):
+        block = np.frombuffer(
+            mapped_file,
+            dtype=np.uint8,
+            count=min(CSV_SCAN_BLOCK_SIZE, end - block_start),
+            offset=block_start,
+        )
+        quotes += int(np.count_nonzero(block == ord('"')))
+        del block
+    return quotes
+
+
+def load_cvs_byte_range(
+    file_path: Path,
+    byte_range: Tuple[int, int],
+    columns: List[str],
+    date_columns: List[str] | None = None,
+    dtypes: Mapping[Hashable, Any] | None = None,
+    date_formats: Sequence[str] | None = None,
+) -> pd.DataFrame:
+    # Loads the rows of a range given by `split_csv_into_byte_ranges`. Only this
+    # range is copied out of the memory mapping of the file.
+    start, end = byte_range
+    with (
+        file_path.open("rb") as csv_file,
+        mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file,
+    ):
+        rows = mapped_file[start:end]
+
+    df = pd.read_csv(
+        io.BytesIO(rows),
+        header=None,
+        names=columns,
+        dtype=_with_string_date_columns(dtypes, date_columns),
     )
+    return _parse_date_columns(df, date_columns, date_formats or ())
+
+
+def iter_cvs_byte_range_chunks(
+    file_path: Path,
+    byte_range: Tuple[int, int],
+    columns: List[str],
+    chunk_size: int,
+    date_columns: List[str] | None = None,
+    dtypes: Mapping[Hashable, Any] | None = None,
+    date_formats: Sequence[str] | None = None,
+) -> Iterator[pd.DataFrame]:
+    # Same rows as `load_cvs_byte_range`, streamed by chunks of `chunk_size` rows:
+    # only one read buffer and one chunk of the range are held in memory.
+    if dtypes is None:
+        with _open_byte_range(file_path, byte_range) as rows:
+            dtypes = _infer_csv_dtypes(
+                rows, chunk_size, date_columns or [], header=None, names=columns
+            )
+
+    with (
+        _open_byte_range(file_path, byte_range) as rows,
+        pd.read_csv(
+            rows,
+            header=None,
+            names=columns,
+            dtype=_with_string_date_columns(dtypes, date_columns),
+            chunksize=chunk_size,
+        ) as reader,
+    ):
+        for chunk in reader:
+            yield _parse_date_columns(chunk, date_columns, date_formats or ())
+
+
+def _open_byte_range(file_path: Path, byte_range: Tuple[int, int]) -> io.BufferedReader:
+    csv_file = file_path.open("rb")
+    csv_file.seek(byte_range[0])
+    return io.BufferedReader(_ByteRangeReader(csv_file, byte_range[1]))
+
+
+# Reads a file up to a given offset, from wherever it was positioned
+class _ByteRangeReader(io.RawIOBase):
+    def __init__(self, file: io.BufferedReader, end: int) -> None:
+        super().__init__()
+        self._file = file
+        self._end = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        size = min(len(buffer), self._end - self._file.tell())
+        if size <= 0:
+            return 0
+        return self._file.readinto(memoryview(buffer)[:size])
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def _with_string_date_columns(
+    dtypes: Mapping[Hashable, Any] | None,
+    date_columns: List[str] | None,
+) -> Dict[Hashable, Any]:
+    # Date columns are read as is, to be parsed with the known date formats
+    return {**(dtypes or {}), **{column: str for column in date_columns or []}}
+
+
+def _parse_date_columns(
+    df: pd.DataFrame,
+    date_columns: List[str] | None,
+    date_formats: Sequence[str],
+) -> pd.DataFrame:
+    for date_column in date_columns or []:
+        df[date_column] = parse_dates(df[date_column], date_formats)
+    return df
+
+
+def _infer_csv_dtypes(
+    file_path: Path | TextIO | BinaryIO,
+    chunk_size: int,
+    excluded_columns: List[str],
+    header: int | None = 0,
+    names: List[str] | None = None,
+) -> Dict[Hashable, Any]:
+    dtypes: Dict[Hashable, Any] = {}
+    with pd.read_csv(
+        file_path, header=header, names=names, chunksize=chunk_size
+    ) as reader:
+        for chunk in reader:
+            for column, dtype in chunk.dtypes.items():
+                if column in excluded_columns:
+                    continue
+                dtypes[column] = (
+                    np.result_type(dtypes[column], dtype) if column in dtypes else dtype
+                )
+    return dtypes
 
 
 def load_json_without_date_parsing(
     file_path: Path | TextIO,
+    lines: bool = False,
 ) -> pd.DataFrame:
-    return pd.read_json(file_path, convert_dates=False, orient="records")
+    return pd.read_json(file_path, convert_dates=False, orient="records", lines=lines)
+
+
+def iter_json_chunks_without_date_parsing(
+    file_path: Path | TextIO,
+    chunk_size: int,
+) -> Iterator[pd.DataFrame]:
+    if isinstance(file_path, Path):
+        with open_text(file_path) as json_file:
+            yield from iter_json_chunks_without_date_parsing(json_file, chunk_size)
+        return
+
+    records = iter_json_records(file_path)
+    start = 0
+    while chunk_records := list(islice(records, chunk_size)):
+        yield pd.DataFrame.from_records(
+            chunk_records, index=pd.RangeIndex(start, start + len(chunk_records))
+        )
+        start += len(chunk_records)
+
 
+def iter_json_records(
+    json_stream: TextIO,
+    block_size: int = JSON_READ_BLOCK_SIZE,
+) -> Iterator[Any]:
+    # Incremental parser for a json array of records, or for line delimited json
+    # (NDJSON): only one read block and the record being decoded are kept in
+    # memory. Records must be json objects (a number cut by the end of a block
+    # would be decoded as a shorter one).
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    end_of_stream = False
+    is_array: bool | None = None
 
-def save_cvs_in_proper_format(file_path: Path | None, df: pd.DataFrame) -> str | None:
+    while True:
+        position = _JSON_SEPARATORS.match(buffer, position).end()  # type: ignore[union-attr]
+        if position == len(buffer):
+            if end_of_stream:
+                if is_array:
+                    raise ValueError("Unterminated json array")
+                return
+            buffer, position = json_stream.read(block_size), 0
+            end_of_stream = not buffer
+            continue
+
+        if is_array is None:
+            is_array = buffer[position] == "["
+            if is_array:
+                position += 1
+                continue
+
+        if is_array and buffer[position] == "]":
+            return
+
+        try:
+            record, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if end_of_stream:
+                raise
+            # Record cut by the end of the block
+            block = json_stream.read(block_size)
+            end_of_stream = not block
+            buffer, position = buffer[position:] + block, 0
+            continue
+
+        yield record
+
+
+def save_cvs_in_proper_format(
+    file_path: Path | None,
+    df: pd.DataFrame,
+    compression: OutputCompression | None = None,
+) -> str | None:
+    # Compressed data is appended as a new gzip member or zstd frame
     if not df.empty:
         write_header = True
         if file_path is not None and file_path.exists():
@@ -36,5 +431,17 @@ def save_cvs_in_proper_format(file_path: Path | None, df: pd.DataFrame) -> str |
             header=write_header,
             mode="a",
             quoting=csv.QUOTE_NONNUMERIC,
+            compression=compression,
         )
     return None
+
+
+def write_cvs_in_proper_format(
+    csv_stream: TextIO, df: pd.DataFrame, write_header: bool
+) -> None:
+    df.to_csv(
+        csv_stream,
+        index=False,
+        header=write_header,
+        quoting=csv.QUOTE_NONNUMERIC,
+    )
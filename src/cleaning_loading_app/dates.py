@@ -0,0 +1,39 @@
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def parse_dates(values: pd.Series, date_formats: Sequence[str]) -> pd.Series:
+    # Dates repeat a lot, so only the distinct values are parsed. Each known
+    # format is tried, in a vectorized pass, on the distinct values no previous
+    # format could parse. Only the values matching none of them go through the
+    # (element by element) mixed format parser. Unparsable values give NaT.
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    codes, distinct_values = pd.factorize(values.to_numpy(dtype=object))
+    distinct_values = np.asarray(distinct_values, dtype=object)
+
+    distinct_dates = np.full(
+        len(distinct_values), np.datetime64("NaT"), dtype="datetime64[ns]"
+    )
+    remaining = np.ones(len(distinct_values), dtype=bool)
+
+    for date_format in date_formats:
+        if not remaining.any():
+            break
+        distinct_dates[remaining] = pd.to_datetime(
+            distinct_values[remaining], format=date_format, errors="coerce"
+        ).to_numpy(dtype="datetime64[ns]")
+        remaining &= np.isnat(distinct_dates)
+
+    if remaining.any():
+        distinct_dates[remaining] = pd.to_datetime(
+            distinct_values[remaining], format="mixed", dayfirst=True, errors="coerce"
+        ).to_numpy(dtype="datetime64[ns]")
+
+    # Missing values have the code -1, which picks the last, NaT, item
+    dates = np.append(distinct_dates, np.datetime64("NaT", "ns"))[codes]
+
+    return pd.Series(dates, index=values.index, name=values.name)
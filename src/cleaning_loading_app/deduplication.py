@@ -0,0 +1,135 @@
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Set, Tuple
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+
+from cleaning_loading_app.filesystem import commit_part_file, lock_part_files
+from cleaning_loading_app.transformations import REJECTION_REASON_COLUMN
+
+DUPLICATE_KEY_REASON = "duplicate_key"
+KEY_DTYPE = "<u8"
+KEY_SIZE = np.dtype(KEY_DTYPE).itemsize
+KEY_PART_POLL_SECONDS = 0.01
+
+
+# Keys of the records ingested by a pipeline, as 64 bits hashes of their key
+# columns. The index is an append only binary file, loaded once in a hash set so
+# that each row is looked up in constant time without reading the datalake. Keys
+# of the rows kept are appended to the index when their data files are committed.
+# Hashes are not checked against the keys they come from: two distinct keys with
+# the same hash reject the row of the second one as a duplicate. With n keys, the
+# odds of any such collision are about n² / 2^65 (1 in 37 million for a million
+# keys, 1 in 37 for a billion), and a rejected row is kept in the rejected data.
+@dataclass
+class KeyIndex:
+    key_columns: Tuple[str, ...]
+    index_file_path: Path
+    # Set for the units of a parallel run: the keys kept by a unit are committed to
+    # its own part file, and the part files of the previous units of the pipeline
+    # are waited for before looking up any key
+    part_file_path: Path | None = None
+    previous_part_file_paths: Tuple[Path, ...] = ()
+    keys: Set[int] | None = field(default=None, init=False, repr=False)
+    # Bytes of the index file read into `keys`
+    loaded_size: int = field(default=0, init=False, repr=False)
+    new_keys: List[np.ndarray] = field(default_factory=list, init=False, repr=False)
+
+    def drop_duplicated_rows(
+        self, df: pd.DataFrame
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        # The first row of a key is kept, whether within the frame or across runs
+        known_keys = self._load_keys()
+        if df.empty:
+            return df, pd.DataFrame()
+
+        keys = hash_keys(df, self.key_columns)
+        duplicated = pd.Series(keys).duplicated().to_numpy()
+        duplicated |= np.fromiter(
+            (key in known_keys for key in keys.tolist()), dtype=bool, count=len(keys)
+        )
+        kept_keys = keys[~duplicated]
+        known_keys.update(kept_keys.tolist())
+        self.new_keys.append(kept_keys)
+
+        if not duplicated.any():
+            return df, pd.DataFrame()
+        return (
+            df.take(np.flatnonzero(~duplicated)),
+            df.take(np.flatnonzero(duplicated)).assign(
+                **{REJECTION_REASON_COLUMN: DUPLICATE_KEY_REASON}
+            ),
+        )
+
+    def commit(self) -> None:
+        # Written to a hidden part file first, like the csv data files
+        key_file_path = self.part_file_path or self.index_file_path
+        part_file_path = key_file_path.with_name(
+            f".{key_file_path.name}.{uuid4().hex}.part"
+        )
+        with lock_part_files(key_file_path.parent):
+            with part_file_path.open("wb") as part_file:
+                for keys in self.new_keys:
+                    keys.astype(KEY_DTYPE).tofile(part_file)
+                part_file.flush()
+                os.fsync(part_file.fileno())
+            self.new_keys = []
+            commit_part_file(part_file_path, key_file_path, has_header=False)
+
+    def release(self) -> None:
+        # The next units of the pipeline wait for the part file of this one, which
+        # must exist even if the unit failed (the run fails anyway)
+        if self.part_file_path is not None and not self.part_file_path.exists():
+            self.new_keys = []
+            self.commit()
+
+    def read_appended_keys(self) -> None:
+        # Brings an index kept in memory from one incoming file to the next (e.g. by
+        # a worker of the watcher) up to date with the keys committed since then, by
+        # any process, without reading the whole index again
+        if self.keys is None:
+            return
+        if _file_size(self.index_file_path) < self.loaded_size:
+            # Index rolled back since then: loaded again by the next lookup
+            self.keys = None
+            return
+        self.keys.update(self._read_index_keys())
+
+    def _load_keys(self) -> Set[int]:
+        if self.keys is None:
+            for part_file_path in self.previous_part_file_paths:
+                while not part_file_path.exists():
+                    time.sleep(KEY_PART_POLL_SECONDS)
+            self.loaded_size = 0
+            self.keys = set(self._read_index_keys())
+            for part_file_path in self.previous_part_file_paths:
+                self.keys.update(np.fromfile(part_file_path, dtype=KEY_DTYPE).tolist())
+        return self.keys
+
+    def _read_index_keys(self) -> List[int]:
+        # Whole keys appended to the index file since it was last read
+        if not self.index_file_path.exists():
+            return []
+        with self.index_file_path.open("rb") as index_file:
+            index_file.seek(self.loaded_size)
+            appended_bytes = index_file.read()
+        appended_bytes = appended_bytes[: len(appended_bytes) // KEY_SIZE * KEY_SIZE]
+        self.loaded_size += len(appended_bytes)
+        keys: List[int] = np.frombuffer(appended_bytes, dtype=KEY_DTYPE).tolist()
+        return keys
+
+
+def _file_size(file_path: Path) -> int:
+    return file_path.stat().st_size if file_path.exists() else 0
+
+
+def hash_keys(df: pd.DataFrame, key_columns: Tuple[str, ...]) -> np.ndarray:
+    # Keys are hashed once cleaned, when their columns have the same dtype whatever
+    # the incoming file (e.g. pubmed ids are converted to int from csv and json)
+    return pd.util.hash_pandas_object(df[list(key_columns)], index=False).to_numpy(
+        dtype=KEY_DTYPE
+    )
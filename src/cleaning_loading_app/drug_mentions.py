@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+
+from cleaning_loading_app.compression import OUTPUT_SUFFIXES, split_compression_suffix
+from cleaning_loading_app.const import DRUG_MENTIONS_PATH, INGESTED_DATA_PATH
+from cleaning_loading_app.csv_io import (
+    load_cvs_byte_range,
+    read_csv_header,
+    split_csv_into_byte_ranges,
+)
+from cleaning_loading_app.filesystem import write_file_atomically
+from cleaning_loading_app.parquet_io import load_parquet_dataset
+from cleaning_loading_app.partitions import list_dataset_files
+from cleaning_loading_app.pipelines import PIPELINES, Pipeline
+from cleaning_loading_app.writers import CsvDataWriter
+
+DRUGS_PIPELINE_NAME = "drugs"
+DRUG_MENTIONS_FILE_PATH = DRUG_MENTIONS_PATH / "drug_mentions.csv"
+DRUG_MENTIONS_STATE_PATH = DRUG_MENTIONS_PATH / "state.json"
+DRUG_MENTIONS_COLUMNS = ["drug", "atccode", "pipeline", "id", "journal", "date"]
+WORD_PATTERN = r"\w+"
+
+
+# Drug names are matched as whole words, case insensitively, against the words of
+# titles. Words are replaced by integer codes, and single word names are looked up
+# by code in an array: titles are scanned once whatever the number of drugs. Names
+# of several words are then only checked where their first word appears.
+@dataclass(frozen=True)
+class DrugMatcher:
+    drugs: pd.DataFrame
+    drug_indexes_by_words: Dict[Tuple[str, ...], int]
+
+    @classmethod
+    def from_drugs(cls, drugs: pd.DataFrame) -> "DrugMatcher":
+        drugs = drugs.reset_index(drop=True)
+        drug_indexes_by_words: Dict[Tuple[str, ...], int] = {}
+        for drug_index, words in enumerate(_split_words(drugs["drug"])):
+            if words:
+                drug_indexes_by_words.setdefault(tuple(words), drug_index)
+        return cls(drugs, drug_indexes_by_words)
+
+    def match(self, titles: pd.Series) -> pd.DataFrame:
+        # Positions of the titles and indexes of the drugs they mention, once each
+        words = _split_words(titles.reset_index(drop=True)).explode().dropna()
+        title_positions = words.index.to_numpy()
+        word_codes, distinct_words = pd.factorize(words.to_numpy(dtype=object))
+        codes_by_word = pd.Index(distinct_words)
+
+        matches: List[pd.DataFrame] = []
+        drug_indexes_by_codes: Dict[Tuple[int, ...], int] = {}
+        for name_words, drug_index in self.drug_indexes_by_words.items():
+            name_codes = tuple(codes_by_word.get_indexer(pd.Index(name_words)).tolist())
+            if -1 not in name_codes:
+                drug_indexes_by_codes[name_codes] = drug_index
+
+        drug_indexes_by_code = np.full(len(distinct_words), -1, dtype="int64")
+        for name_codes, drug_index in drug_indexes_by_codes.items():
+            if len(name_codes) == 1:
+                drug_indexes_by_code[name_codes[0]] = drug_index
+        drug_indexes = drug_indexes_by_code[word_codes]
+        found = drug_indexes >= 0
+        matches.append(
+            pd.DataFrame({"title": title_positions[found], "drug": drug_indexes[found]})
+        )
+
+        run_titles: List[int] = []
+        run_drugs: List[int] = []
+        for word_count in {len(name_codes) for name_codes in drug_indexes_by_codes}:
+            runs_count = len(word_codes) - word_count + 1
+            if word_count == 1 or runs_count <= 0:
+                continue
+            first_codes = [
+                name_codes[0]
+                for name_codes in drug_indexes_by_codes
+                if len(name_codes) == word_count
+            ]
+            # Title positions are sorted: the words of a run belong to the same
+            # title when its first and last words do
+            run_starts = np.flatnonzero(
+                np.isin(word_codes[:runs_count], first_codes)
+                & (title_positions[:runs_count] == title_positions[word_count - 1 :])
+            )
+            for run_start in run_starts.tolist():
+                run_codes = tuple(word_codes[run_start : run_start + word_count])
+                if run_codes in drug_indexes_by_codes:
+                    run_titles.append(title_positions[run_start])
+                    run_drugs.append(drug_indexes_by_codes[run_codes])
+        matches.append(pd.DataFrame({"title": run_titles, "drug": run_drugs}))
+        return pd.concat(matches, ignore_index=True).astype("int64").drop_duplicates()
+
+
+# How far the ingested data files were indexed, by path under the ingested data
+# directory. Incremental runs append rows to csv data files (as new gzip members
+# or zstd frames when compressed) and add new part files to datasets, which are
+# never changed once written: only the bytes after these sizes are scanned by the
+# next update.
+@dataclass
+class DrugMentionsState:
+    drugs_data_size: int = 0
+    mentions_file_size: int = 0
+    indexed_sizes: Dict[str, int] = field(default_factory=dict)
+    # Changed whenever the mentions are indexed again from scratch
+    generation: str = ""
+
+
+def update_drug_mentions() -> int:
+    # Appends the mentions of drugs in the titles ingested since the last update,
+    # and returns their number. Every title is scanned again when drugs changed,
+    # or when the datalake was rebuilt since.
+    DRUG_MENTIONS_PATH.mkdir(exist_ok=True)
+    pipelines = {pipeline.name: pipeline for pipeline in PIPELINES}
+    drugs_data_file_paths = _ingested_data_file_paths(pipelines[DRUGS_PIPELINE_NAME])
+    if not drugs_data_file_paths:
+        logging.warning("No ingested drugs. Not indexing drug mentions...")
+        return 0
+
+    state = load_drug_mentions_state()
+    drugs_data_size = sum(path.stat().st_size for path in drugs_data_file_paths)
+    if drugs_data_size != state.drugs_data_size or any(
+        _data_file_size(INGESTED_DATA_PATH / data_file_name) < indexed_size
+        for data_file_name, indexed_size in state.indexed_sizes.items()
+    ):
+        logging.info("Indexing the mentions of drugs in every title.")
+        state = DrugMentionsState(
+            drugs_data_size=drugs_data_size, generation=uuid4().hex
+        )
+
+    # Mentions appended by an update interrupted before saving its state
+    if DRUG_MENTIONS_FILE_PATH.exists():
+        os.truncate(DRUG_MENTIONS_FILE_PATH, state.mentions_file_size)
+
+    matcher = DrugMatcher.from_drugs(
+        pd.concat(
+            [_read_ingested_rows(path)[0] for path in drugs_data_file_paths],
+            ignore_index=True,
+        )
+    )
+    writer = CsvDataWriter(DRUG_MENTIONS_FILE_PATH)
+    mentions_count = 0
+    for pipeline in PIPELINES:
+        if pipeline.title_column is None:
+            continue
+        new_articles = []
+        for data_file_path in _ingested_data_file_paths(pipeline):
+            data_file_name = str(data_file_path.relative_to(INGESTED_DATA_PATH))
+            articles, state.indexed_sizes[data_file_name] = _read_ingested_rows(
+                data_file_path, state.indexed_sizes.get(data_file_name, 0)
+            )
+            if not articles.empty:
+                new_articles.append(articles)
+        if not new_articles:
+            continue
+        mentions = _find_mentions(
+            matcher, pipeline, pd.concat(new_articles, ignore_index=True)
+        )
+        writer.write(mentions)
+        mentions_count += len(mentions)
+    writer.commit()
+
+    if DRUG_MENTIONS_FILE_PATH.exists():
+        state.mentions_file_size = DRUG_MENTIONS_FILE_PATH.stat().st_size
+    write_file_atomically(DRUG_MENTIONS_STATE_PATH, json.dumps(asdict(state)))
+    return mentions_count
+
+
+def load_drug_mentions() -> pd.DataFrame:
+    if (
+        not DRUG_MENTIONS_FILE_PATH.exists()
+        or DRUG_MENTIONS_FILE_PATH.stat().st_size == 0
+    ):
+        return pd.DataFrame(columns=DRUG_MENTIONS_COLUMNS)
+    return pd.read_csv(DRUG_MENTIONS_FILE_PATH, dtype=str, keep_default_na=False)
+
+
+def load_new_drug_mentions(
+    state: DrugMentionsState, indexed_size: int = 0
+) -> pd.DataFrame:
+    # Mentions committed by the update of `state` after the first `indexed_size`
+    # bytes of the mentions file, without those appended by an interrupted update
+    byte_ranges = (
+        split_csv_into_byte_ranges(DRUG_MENTIONS_FILE_PATH, 1)
+        if indexed_size < state.mentions_file_size
+        else []
+    )
+    if not byte_ranges:
+        return pd.DataFrame(columns=DRUG_MENTIONS_COLUMNS, dtype=str)
+    return load_cvs_byte_range(
+        DRUG_MENTIONS_FILE_PATH,
+        (max(indexed_size, byte_ranges[0][0]), state.mentions_file_size),
+        DRUG_MENTIONS_COLUMNS,
+        dtypes={column: str for column in DRUG_MENTIONS_COLUMNS},
+    )
+
+
+def _find_mentions(
+    matcher: DrugMatcher, pipeline: Pipeline, articles: pd.DataFrame
+) -> pd.DataFrame:
+    matches = matcher.match(articles[pipeline.title_column]).sort_values(
+        ["drug", "title"]
+    )
+    drugs = matcher.drugs.iloc[matches["drug"]].reset_index(drop=True)
+    articles = articles.iloc[matches["title"]].reset_index(drop=True)
+    return pd.DataFrame(
+        {
+            "drug": drugs["drug"],
+            "atccode": drugs["atccode"],
+            "pipeline": pipeline.name,
+            "id": articles["id"],
+            "journal": articles["journal"],
+            "date": articles["date"],
+        },
+        columns=DRUG_MENTIONS_COLUMNS,
+    )
+
+
+def _ingested_data_file_paths(pipeline: Pipeline) -> List[Path]:
+    # The files of a dataset (parquet, or partitioned by date), or a csv data file,
+    # compressed or not
+    dataset_path = INGESTED_DATA_PATH / pipeline.name
+    if dataset_path.is_dir():
+        return list_dataset_files(dataset_path)
+    for suffix in ("", *OUTPUT_SUFFIXES.values()):
+        data_file_path = (
+            INGESTED_DATA_PATH / f"{pipeline.target_data_file_name}{suffix}"
+        )
+        if data_file_path.exists():
+            return [data_file_path]
+    return []
+
+
+def _data_file_size(data_file_path: Path) -> int:
+    # -1 for a data file removed since, e.g. by a full run
+    return data_file_path.stat().st_size if data_file_path.is_file() else -1
+
+
+def _read_ingested_rows(
+    data_file_path: Path, indexed_size: int = 0
+) -> Tuple[pd.DataFrame, int]:
+    # Rows of a data file after its first `indexed_size` bytes, read as strings,
+    # and the size of the file they were read up to
+    data_size = data_file_path.stat().st_size
+    if data_size == indexed_size:
+        return pd.DataFrame(), data_size
+
+    if data_file_path.suffix == ".parquet":
+        return load_parquet_dataset(data_file_path).astype(str), data_size
+
+    if data_file_path.suffix == ".csv":
+        columns = read_csv_header(data_file_path)
+        byte_ranges = (
+            split_csv_into_byte_ranges(data_file_path, 1)
+            if indexed_size == 0
+            else [(indexed_size, data_size)]
+        )
+        if not byte_ranges or byte_ranges[0][0] == byte_ranges[0][1]:
+            return pd.DataFrame(columns=columns, dtype=str), data_size
+        return (
+            load_cvs_byte_range(
+                data_file_path,
+                byte_ranges[0],
+                columns,
+                dtypes={column: str for column in columns},
+            ),
+            byte_ranges[0][1],
+        )
+
+    # Compressed csv data file: the rows appended since are in gzip members or zstd
+    # frames of their own, decompressed from where they start
+    _, compression = split_compression_suffix(data_file_path.name)
+    columns = list(pd.read_csv(data_file_path, nrows=0).columns)
+    with data_file_path.open("rb") as data_file:
+        data_file.seek(indexed_size)
+        rows = pd.read_csv(
+            data_file,
+            compression=compression,  # type: ignore[arg-type]
+            header=0 if indexed_size == 0 else None,
+            names=columns,
+            dtype=str,
+        )
+    return rows, data_size
+
+
+def load_drug_mentions_state() -> DrugMentionsState:
+    if not DRUG_MENTIONS_STATE_PATH.exists():
+        return DrugMentionsState()
+    try:
+        return DrugMentionsState(**json.loads(DRUG_MENTIONS_STATE_PATH.read_text()))
+    except TypeError:
+        # State saved by a previous version: every title is indexed again
+        return DrugMentionsState()
+
+
+def _split_words(values: pd.Series) -> pd.Series:
+    return values.fillna("").astype(str).str.casefold().str.findall(WORD_PATTERN)
@@ -0,0 +1,379 @@
+# Cleaning and loading of the data of one incoming file, or of one row partition
+# of it. Imported by `cleaner_loader` only once there is a file to process, so that
+# runs with nothing to ingest do not import pandas.
+import logging
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+import pandas as pd
+
+from cleaning_loading_app.compression import (
+    OUTPUT_SUFFIXES,
+    OutputCompression,
+    split_compression_suffix,
+)
+from cleaning_loading_app.const import (
+    INGESTED_DATA_PATH,
+    KEY_INDEXES_PATH,
+    REJECTED_DATA_PATH,
+)
+from cleaning_loading_app.csv_io import (
+    iter_cvs_byte_range_chunks,
+    iter_cvs_chunks_with_date_parsing,
+    iter_json_chunks_without_date_parsing,
+    load_cvs_byte_range,
+    load_cvs_with_date_parsing,
+    load_json_without_date_parsing,
+    read_csv_header,
+    split_csv_into_byte_ranges,
+)
+from cleaning_loading_app.deduplication import KeyIndex
+from cleaning_loading_app.loading import FileIngestionResult, LoadingOptions
+from cleaning_loading_app.metrics import MetricsRecorder
+from cleaning_loading_app.pipelines import Pipeline
+from cleaning_loading_app.transformations import (
+    convert_string_to_date,
+    encode_low_cardinality_columns,
+    ensure_column_is_int,
+    format_dates,
+    split_clean_and_rejected_rows,
+)
+from cleaning_loading_app.writers import (
+    CsvDataWriter,
+    DataWriter,
+    DatePartitionedDataWriter,
+    ParquetDataWriter,
+)
+
+
+def split_incoming_files(
+    incoming_files: List[Tuple[Path, Pipeline]],
+    partitions: int,
+) -> List[Tuple[int, Path, Pipeline, Tuple[int, int] | None]]:
+    units: List[Tuple[int, Path, Pipeline, Tuple[int, int] | None]] = []
+    for file_index, (path, pipeline) in enumerate(incoming_files):
+        byte_ranges: List[Tuple[int, int] | None] = []
+        if partitions > 1 and path.suffix == ".csv":
+            byte_ranges.extend(split_csv_into_byte_ranges(path, partitions))
+        for byte_range in byte_ranges or [None]:
+            units.append((file_index, path, pipeline, byte_range))
+    return units
+
+
+def build_key_index(
+    pipeline: Pipeline, loading_options: LoadingOptions
+) -> KeyIndex | None:
+    if not loading_options.deduplicate or not pipeline.key_columns:
+        return None
+    return KeyIndex(pipeline.key_columns, KEY_INDEXES_PATH / f"{pipeline.name}.keys")
+
+
+def build_unit_key_indexes(
+    units: List[Tuple[int, Path, Pipeline, Tuple[int, int] | None]],
+    loading_options: LoadingOptions,
+) -> List[KeyIndex | None]:
+    # Units of a pipeline are deduplicated in order: a unit looks up its keys once
+    # the previous units of the pipeline have saved the keys they kept. Units are
+    # started in order, so a unit only ever waits for running or finished ones.
+    key_indexes: List[KeyIndex | None] = []
+    previous_part_file_paths: Dict[str, Tuple[Path, ...]] = {}
+    for unit_index, (_, _, pipeline, _) in enumerate(units):
+        key_index = build_key_index(pipeline, loading_options)
+        if key_index is not None:
+            key_index.part_file_path = (
+                KEY_INDEXES_PATH / f"{pipeline.name}.keys.part-{unit_index}"
+            )
+            key_index.previous_part_file_paths = previous_part_file_paths.get(
+                pipeline.name, ()
+            )
+            previous_part_file_paths[pipeline.name] = (
+                *key_index.previous_part_file_paths,
+                key_index.part_file_path,
+            )
+        key_indexes.append(key_index)
+    return key_indexes
+
+
+def build_data_writers(
+    pipeline: Pipeline,
+    output_format: str,
+    output_compression: OutputCompression | None,
+    run_id: str,
+    file_index: int,
+    write_csv_parts: bool = False,
+    partition_by_date: bool = False,
+) -> Tuple[DataWriter, DataWriter]:
+    ingested_data_writer, rejected_data_writer = _build_data_file_writers(
+        pipeline, output_format, output_compression, run_id, file_index, write_csv_parts
+    )
+    if partition_by_date and pipeline.date_columns:
+        # Ingested rows go to the partitions of the months of their dates. Rejected
+        # rows, whose dates may be invalid, go to the usual data files.
+        ingested_data_writer = DatePartitionedDataWriter(
+            INGESTED_DATA_PATH / pipeline.name,
+            pipeline.date_columns[0],
+            _part_name_prefix(run_id, file_index),
+            output_format,
+            output_compression,
+        )
+    return ingested_data_writer, rejected_data_writer
+
+
+def _build_data_file_writers(
+    pipeline: Pipeline,
+    output_format: str,
+    output_compression: OutputCompression | None,
+    run_id: str,
+    file_index: int,
+    write_csv_parts: bool,
+) -> Tuple[DataWriter, DataWriter]:
+    if output_format == "parquet":
+        part_name_prefix = _part_name_prefix(run_id, file_index)
+        return (
+            ParquetDataWriter(INGESTED_DATA_PATH / pipeline.name, part_name_prefix),
+            ParquetDataWriter(REJECTED_DATA_PATH / pipeline.name, part_name_prefix),
+        )
+
+    if write_csv_parts:
+        # Parts are compressed when committed to their target data file
+        target_data_file_name = build_target_data_file_name(pipeline, file_index)
+        return (
+            CsvDataWriter(INGESTED_DATA_PATH / target_data_file_name),
+            CsvDataWriter(REJECTED_DATA_PATH / target_data_file_name),
+        )
+
+    target_data_file_name = build_target_data_file_name(
+        pipeline, compression=output_compression
+    )
+    return (
+        CsvDataWriter(INGESTED_DATA_PATH / target_data_file_name, output_compression),
+        CsvDataWriter(REJECTED_DATA_PATH / target_data_file_name, output_compression),
+    )
+
+
+def _part_name_prefix(run_id: str, file_index: int) -> str:
+    # A new part file per run and incoming file, named so that sorting them gives
+    # the order in which they were ingested.
+    return f"part-{run_id}-{file_index:05d}"
+
+
+def clean_and_load_data_file_unit(
+    incoming_file_path: Path,
+    pipeline: Pipeline,
+    ingested_data_writer: DataWriter,
+    rejected_data_writer: DataWriter,
+    loading_options: LoadingOptions,
+    byte_range: Tuple[int, int] | None,
+    key_index: KeyIndex | None,
+) -> FileIngestionResult:
+    try:
+        return clean_and_load_data_file(
+            incoming_file_path,
+            pipeline,
+            ingested_data_writer,
+            rejected_data_writer,
+            loading_options,
+            byte_range,
+            key_index,
+        )
+    finally:
+        if key_index is not None:
+            key_index.release()
+
+
+def clean_and_load_data_file(
+    incoming_file_path: Path,
+    pipeline: Pipeline,
+    ingested_data_writer: DataWriter,
+    rejected_data_writer: DataWriter,
+    loading_options: LoadingOptions,
+    byte_range: Tuple[int, int] | None = None,
+    key_index: KeyIndex | None = None,
+) -> FileIngestionResult:
+    if not incoming_file_path.exists():
+        logging.warning(
+            f"No file to import: '{incoming_file_path}' not found. Doing nothing..."
+        )
+        return FileIngestionResult(0, 0, [])
+
+    logging.info(
+        f"Cleaning and loading file '{incoming_file_path}' "
+        f"with pipeline {pipeline.name!r}."
+    )
+    metrics = MetricsRecorder(
+        incoming_file_path.name, pipeline.name, loading_options.collect_metrics
+    )
+    chunks = metrics.measure_chunks(
+        "load",
+        load_data_file(incoming_file_path, pipeline, loading_options, byte_range),
+    )
+
+    read_with_schema = reads_with_schema(incoming_file_path, pipeline)
+    ingested_rows = rejected_rows = 0
+    for df in chunks:
+        df, all_dirty_elements = clean_data(df, pipeline, metrics, read_with_schema)
+
+        if key_index is not None:
+            with metrics.measure("deduplicate") as rows:
+                rows.rows_in = len(df)
+                df, duplicated_rows = key_index.drop_duplicated_rows(df)
+                rows.rows_out, rows.rows_rejected = len(df), len(duplicated_rows)
+            if not duplicated_rows.empty:
+                # Written like the dates of the other rejected rows
+                for date_column in pipeline.date_columns:
+                    duplicated_rows[date_column] = format_dates(
+                        duplicated_rows[date_column]
+                    )
+                all_dirty_elements = pd.concat([all_dirty_elements, duplicated_rows])
+
+        with metrics.measure("save") as rows:
+            ingested_data_writer.write(df)
+            rejected_data_writer.write(all_dirty_elements)
+            rows.rows_in = len(df) + len(all_dirty_elements)
+            rows.rows_out = len(df)
+            rows.rows_rejected = len(all_dirty_elements)
+
+        ingested_rows += len(df)
+        rejected_rows += len(all_dirty_elements)
+
+    with metrics.measure("commit") as rows:
+        ingested_data_writer.commit()
+        rejected_data_writer.commit()
+        if key_index is not None:
+            key_index.commit()
+        rows.rows_in = ingested_rows + rejected_rows
+        rows.rows_out, rows.rows_rejected = ingested_rows, rejected_rows
+
+    return FileIngestionResult(
+        ingested_rows, rejected_rows, list(metrics.stages.values())
+    )
+
+
+def load_data_file(
+    incoming_file_path: Path,
+    pipeline: Pipeline,
+    loading_options: LoadingOptions,
+    byte_range: Tuple[int, int] | None = None,
+) -> Iterable[pd.DataFrame]:
+    chunk_size = loading_options.chunk_size
+    suffix = data_file_suffix(incoming_file_path)
+    # Compressed files are decompressed while being read, and cannot be mapped
+    memory_map = loading_options.memory_map and suffix == incoming_file_path.suffix
+
+    if suffix == ".csv":
+        dtypes = csv_dtypes(pipeline)
+        if byte_range is not None:
+            columns = read_csv_header(incoming_file_path)
+            if chunk_size is None:
+                return [
+                    load_cvs_byte_range(
+                        incoming_file_path, byte_range, columns, dtypes=dtypes
+                    )
+                ]
+            return iter_cvs_byte_range_chunks(
+                incoming_file_path, byte_range, columns, chunk_size, dtypes=dtypes
+            )
+        if chunk_size is None:
+            return [
+                load_cvs_with_date_parsing(
+                    incoming_file_path,
+                    dtypes=dtypes,
+                    engine=loading_options.csv_engine,
+                    memory_map=memory_map,
+                )
+            ]
+        return iter_cvs_chunks_with_date_parsing(
+            incoming_file_path, chunk_size, dtypes=dtypes, memory_map=memory_map
+        )
+
+    if suffix in (".json", ".ndjson"):
+        if chunk_size is None:
+            return [
+                load_json_without_date_parsing(
+                    incoming_file_path, lines=suffix != ".json"
+                )
+            ]
+        return iter_json_chunks_without_date_parsing(incoming_file_path, chunk_size)
+
+    raise ValueError(f"Unsupported file suffix {suffix!r}: '{incoming_file_path}'")
+
+
+def csv_dtypes(pipeline: Pipeline) -> Dict[Hashable, Any] | None:
+    # Dates are read as text, as from json files: invalid ones are rejected with
+    # their value as read, and only the dates of the clean rows are parsed
+    if not pipeline.csv_dtypes:
+        return None
+    return {
+        **pipeline.csv_dtypes,
+        **{date_column: str for date_column in pipeline.date_columns},
+    }
+
+
+def reads_with_schema(incoming_file_path: Path, pipeline: Pipeline) -> bool:
+    return data_file_suffix(incoming_file_path) == ".csv" and bool(pipeline.csv_dtypes)
+
+
+def clean_data(
+    df: pd.DataFrame,
+    pipeline: Pipeline,
+    metrics: MetricsRecorder,
+    read_with_schema: bool = False,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Files read with a schema already have their categorical columns
+    if not read_with_schema:
+        with metrics.measure("encode_low_cardinality_columns") as rows:
+            df = encode_low_cardinality_columns(
+                df, (*pipeline.date_columns, *pipeline.int_columns)
+            )
+            rows.rows_in = rows.rows_out = len(df)
+
+    rules = pipeline.rules()
+    if not rules:
+        return df, pd.DataFrame()
+
+    with metrics.measure("split_clean_and_rejected_rows") as rows:
+        rows.rows_in = len(df)
+        df, all_dirty_elements = split_clean_and_rejected_rows(
+            df, metrics.measure_rules(rules)
+        )
+        rows.rows_out, rows.rows_rejected = len(df), len(all_dirty_elements)
+
+    for date_column in pipeline.date_columns:
+        with metrics.measure(f"convert_string_to_date:{date_column}") as rows:
+            rows.rows_in, rejected_rows = len(df), len(all_dirty_elements)
+            df, all_dirty_elements = convert_string_to_date(
+                df,
+                date_column,
+                all_dirty_elements,
+                pipeline.date_formats,
+            )
+            rows.rows_out = len(df)
+            rows.rows_rejected = len(all_dirty_elements) - rejected_rows
+
+    for int_column in pipeline.int_columns:
+        with metrics.measure(f"ensure_column_is_int:{int_column}") as rows:
+            rows.rows_in, rejected_rows = len(df), len(all_dirty_elements)
+            df, all_dirty_elements = ensure_column_is_int(
+                df, int_column, all_dirty_elements
+            )
+            rows.rows_out = len(df)
+            rows.rows_rejected = len(all_dirty_elements) - rejected_rows
+
+    return df, all_dirty_elements
+
+
+def build_target_data_file_name(
+    pipeline: Pipeline,
+    part: int | None = None,
+    compression: OutputCompression | None = None,
+) -> str:
+    if part is not None:
+        return f"{pipeline.target_data_file_name}.part-{part}"
+    if compression is not None:
+        return f"{pipeline.target_data_file_name}{OUTPUT_SUFFIXES[compression]}"
+    return pipeline.target_data_file_name
+
+
+def data_file_suffix(file_path: Path) -> str:
+    # Suffix of the data once decompressed, e.g. ".csv" for pubmed.csv.gz
+    return Path(split_compression_suffix(file_path.name)[0]).suffix
@@ -1,21 +1,48 @@
+import fcntl
 import logging
+import os
 import shutil
+from contextlib import contextmanager
 from pathlib import Path
+from typing import BinaryIO, Iterator, List
 
+from cleaning_loading_app.compression import OutputCompression, compressed_writer
 from cleaning_loading_app.const import (
+    AGGREGATES_PATH,
+    DRUG_MENTIONS_PATH,
     INCOMING_FILES_PATH,
     INGESTED_DATA_PATH,
+    KEY_INDEXES_PATH,
+    MANIFEST_PATH,
     PROCESSED_FILES_PATH,
     REJECTED_DATA_PATH,
 )
 
+COPY_BLOCK_SIZE = 4 * 1024 * 1024
+PART_FILES_LOCK_FILE_NAME = ".part_files.lock"
 
-def preliminary_checks_and_cleaning() -> None:
+
+def preliminary_checks_and_cleaning(incremental: bool = False) -> None:
     _check_expected_path_exists(INCOMING_FILES_PATH)
 
-    _recreate_directory(PROCESSED_FILES_PATH)
-    _recreate_directory(INGESTED_DATA_PATH)
-    _recreate_directory(REJECTED_DATA_PATH)
+    if incremental:
+        _create_directory_if_missing(PROCESSED_FILES_PATH)
+        _create_directory_if_missing(INGESTED_DATA_PATH)
+        _create_directory_if_missing(REJECTED_DATA_PATH)
+        _create_directory_if_missing(KEY_INDEXES_PATH)
+        _recover_interrupted_commits(INGESTED_DATA_PATH)
+        _recover_interrupted_commits(REJECTED_DATA_PATH)
+        _recover_interrupted_commits(KEY_INDEXES_PATH)
+    else:
+        _recreate_directory(PROCESSED_FILES_PATH)
+        _recreate_directory(INGESTED_DATA_PATH)
+        _recreate_directory(REJECTED_DATA_PATH)
+        _recreate_directory(KEY_INDEXES_PATH)
+        # Built from the ingested data that was just wiped
+        shutil.rmtree(DRUG_MENTIONS_PATH, ignore_errors=True)
+        shutil.rmtree(AGGREGATES_PATH, ignore_errors=True)
+        # The manifest describes the content of the datalake that was just wiped
+        MANIFEST_PATH.unlink(missing_ok=True)
 
 
 def _check_expected_path_exists(path: Path) -> None:
@@ -35,8 +62,181 @@ def _recreate_directory(path: Path) -> None:
     path.mkdir()
 
 
+def _create_directory_if_missing(path: Path) -> None:
+    if not path.exists():
+        logging.info(f"Creating directory '{path.absolute()}'.")
+        path.mkdir()
+
+
+def list_files(path: Path) -> List[Path]:
+    # Hidden files (e.g. .gitkeep) are not data files
+    with os.scandir(path) as entries:
+        return sorted(
+            path / entry.name
+            for entry in entries
+            if entry.is_file() and not entry.name.startswith(".")
+        )
+
+
 def move_processed_file(filepath: Path) -> None:
     logging.info(
         f"Moving processed file from '{filepath.parent}' to '{PROCESSED_FILES_PATH}'."
     )
     filepath.rename(PROCESSED_FILES_PATH / filepath.name)
+
+
+def commit_part_file(
+    part_file_path: Path,
+    target_file_path: Path,
+    compression: OutputCompression | None = None,
+    has_header: bool = True,
+) -> None:
+    # Appends a csv part file to its target data file, as a whole or not at all,
+    # compressed as a new gzip member or zstd frame if `compression` is given.
+    # Part files without a header (e.g. key index parts) are appended whole.
+    # The target size is saved in a journal before appending, so that a commit
+    # interrupted by a crash is rolled back by the next one. Commits to the data
+    # files of a directory are serialized by a lock on the directory.
+    if not part_file_path.exists():
+        return
+
+    with _locked_directory(target_file_path.parent) as directory_fd:
+        _rollback_interrupted_commit(target_file_path)
+
+        target_size = (
+            target_file_path.stat().st_size if target_file_path.exists() else 0
+        )
+        if target_size == 0 and compression is None:
+            os.replace(part_file_path, target_file_path)
+            os.fsync(directory_fd)
+            return
+
+        journal_path = _journal_path(target_file_path)
+        write_file_atomically(journal_path, str(target_size))
+        with part_file_path.open("rb") as part_file:
+            if target_size > 0 and has_header:
+                # Header already written with the first part
+                part_file.readline()
+            with target_file_path.open("ab") as target_file:
+                if compression is None:
+                    shutil.copyfileobj(part_file, target_file, COPY_BLOCK_SIZE)
+                else:
+                    with compressed_writer(target_file, compression) as writer:
+                        shutil.copyfileobj(part_file, writer, COPY_BLOCK_SIZE)
+                target_file.flush()
+                os.fsync(target_file.fileno())
+        journal_path.unlink()
+        os.fsync(directory_fd)
+
+    part_file_path.unlink()
+
+
+def lock_part_files(path: Path) -> BinaryIO:
+    # Shared lock held by the writers of part files in the directory `path` until
+    # they are committed (released when the returned file is closed). Part files
+    # are only removed as leftovers of stopped runs when no writer holds it.
+    lock_file = (path / PART_FILES_LOCK_FILE_NAME).open("ab")
+    fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+    return lock_file
+
+
+def replace_file_atomically(source_file_path: Path, target_file_path: Path) -> None:
+    with source_file_path.open("rb") as source_file:
+        os.fsync(source_file.fileno())
+    os.replace(source_file_path, target_file_path)
+    _fsync_directory(target_file_path.parent)
+
+
+def write_file_atomically(file_path: Path, content: str) -> None:
+    temporary_file_path = file_path.with_name(f".{file_path.name}.tmp")
+    temporary_file_path.write_text(content)
+    replace_file_atomically(temporary_file_path, file_path)
+
+
+def rollback_data_file(target_file_path: Path, size: int) -> None:
+    # Drops what was appended to a data file after it had `size` bytes (e.g. by a
+    # worker that died after committing rows it did not checkpoint), with the part
+    # files and the journal it left behind
+    with _locked_directory(target_file_path.parent) as directory_fd:
+        for part_file_path in target_file_path.parent.glob(
+            f".{target_file_path.name}.*.part"
+        ):
+            part_file_path.unlink()
+        if target_file_path.exists() and target_file_path.stat().st_size > size:
+            logging.warning(f"Rolling back '{target_file_path}' to {size} bytes.")
+            os.truncate(target_file_path, size)
+            with target_file_path.open("rb") as target_file:
+                os.fsync(target_file.fileno())
+        _journal_path(target_file_path).unlink(missing_ok=True)
+        os.fsync(directory_fd)
+
+
+def _recover_interrupted_commits(path: Path) -> None:
+    # Data files partitioned by date are committed in subdirectories
+    for subdirectory_path in sorted(path.glob("*/")):
+        _recover_interrupted_commits(subdirectory_path)
+
+    # Part files left by a previous run that stopped before committing them. Those
+    # of a directory where another run (e.g. a watcher or an ingestion task) is
+    # writing part files are left to a later recovery.
+    if _list_part_files(path):
+        with (path / PART_FILES_LOCK_FILE_NAME).open("ab") as lock_file:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logging.info(f"Part files being written to '{path}'. Leaving them...")
+            else:
+                for part_file_path in _list_part_files(path):
+                    logging.warning(
+                        f"Removing uncommitted part file '{part_file_path}'."
+                    )
+                    part_file_path.unlink(missing_ok=True)
+
+    for journal_path in path.glob(".*.journal"):
+        with _locked_directory(path):
+            _rollback_interrupted_commit(
+                journal_path.with_name(journal_path.name[1 : -len(".journal")])
+            )
+
+
+def _list_part_files(path: Path) -> List[Path]:
+    return [*path.glob(".*.part"), *path.glob("*.part-*")]
+
+
+def _rollback_interrupted_commit(target_file_path: Path) -> None:
+    journal_path = _journal_path(target_file_path)
+    if not journal_path.exists():
+        return
+
+    logging.warning(f"Rolling back interrupted commit to '{target_file_path}'.")
+    if not target_file_path.exists():
+        # Interrupted before the target was created (e.g. first compressed part)
+        journal_path.unlink()
+        return
+    os.truncate(target_file_path, int(journal_path.read_text()))
+    with target_file_path.open("rb") as target_file:
+        os.fsync(target_file.fileno())
+    journal_path.unlink()
+
+
+def _journal_path(target_file_path: Path) -> Path:
+    return target_file_path.with_name(f".{target_file_path.name}.journal")
+
+
+@contextmanager
+def _locked_directory(path: Path) -> Iterator[int]:
+    directory_fd = os.open(path, os.O_RDONLY)
+    try:
+        fcntl.flock(directory_fd, fcntl.LOCK_EX)
+        yield directory_fd
+    finally:
+        # Closing the file descriptor releases the lock
+        os.close(directory_fd)
+
+
+def _fsync_directory(path: Path) -> None:
+    directory_fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
@@ -0,0 +1,228 @@
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import List
+
+from cleaning_loading_app.compression import split_compression_suffix
+from cleaning_loading_app.const import DATALAKE_PATH
+from cleaning_loading_app.file_loader import (
+    clean_data,
+    load_data_file,
+    reads_with_schema,
+)
+from cleaning_loading_app.filesystem import rollback_data_file, write_file_atomically
+from cleaning_loading_app.loading import LoadingOptions
+from cleaning_loading_app.manifest import ManifestEntry, fingerprint_file
+from cleaning_loading_app.metrics import MetricsRecorder, StageMetrics
+from cleaning_loading_app.pipelines import Pipeline, find_pipeline
+from cleaning_loading_app.writers import CsvDataWriter
+
+
+# Where a task writes: its ingested and rejected rows go to data files of its own,
+# `<root>/<pipeline name>/<incoming file name>.csv`, so that tasks of the same
+# pipeline can run concurrently and be retried without touching each other's data
+@dataclass(frozen=True)
+class OutputRoots:
+    ingested_path: Path
+    rejected_path: Path
+    checkpoints_path: Path
+
+    @classmethod
+    def under(cls, root_path: Path) -> "OutputRoots":
+        return cls(
+            root_path / "ingested", root_path / "rejected", root_path / "checkpoints"
+        )
+
+
+@dataclass(frozen=True)
+class TaskResult:
+    input_path: Path
+    pipeline: str
+    ingested_rows: int
+    rejected_rows: int
+    ingested_data_file_path: Path
+    rejected_data_file_path: Path
+    wall_seconds: float
+    # Chunks committed by this run and by the previous runs of the task it resumed
+    committed_chunks: int
+    resumed_chunks: int
+    # Stages of this run, measured when `LoadingOptions.collect_metrics` is set
+    stages: List[StageMetrics] = field(default_factory=list)
+
+
+# What a task has committed so far, saved after each chunk. The data files are
+# rolled back to these sizes before resuming, which drops the rows of a chunk
+# committed by a worker that died before saving its checkpoint.
+@dataclass
+class TaskCheckpoint:
+    input_fingerprint: ManifestEntry
+    committed_chunks: int = 0
+    ingested_rows: int = 0
+    rejected_rows: int = 0
+    ingested_data_file_size: int = 0
+    rejected_data_file_size: int = 0
+    done: bool = False
+
+
+def run_ingestion_task(
+    input_path: Path,
+    output_roots: OutputRoots | None = None,
+    loading_options: LoadingOptions | None = None,
+) -> TaskResult:
+    # Cleans and loads a single incoming file, resuming from its last committed
+    # chunk of `LoadingOptions.chunk_size` rows (the whole file if not set) when a
+    # previous run of the task stopped halfway. A task already done returns its
+    # result again without writing anything. The incoming file is left in place.
+    start = time.perf_counter()
+    output_roots = output_roots or OutputRoots.under(DATALAKE_PATH)
+    loading_options = loading_options or LoadingOptions()
+    if loading_options.deduplicate or loading_options.partitions > 1:
+        raise ValueError("Tasks neither deduplicate keys nor split files")
+    pipeline = find_pipeline(input_path.name)
+    if pipeline is None:
+        raise ValueError(f"No pipeline matches file '{input_path}'")
+
+    data_file_name = _task_data_file_name(input_path)
+    ingested_data_file_path = (
+        output_roots.ingested_path / pipeline.name / data_file_name
+    )
+    rejected_data_file_path = (
+        output_roots.rejected_path / pipeline.name / data_file_name
+    )
+    checkpoint_path = (
+        output_roots.checkpoints_path / pipeline.name / f"{data_file_name}.json"
+    )
+    for path in (ingested_data_file_path, rejected_data_file_path, checkpoint_path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    checkpoint = _load_checkpoint(
+        checkpoint_path,
+        input_path,
+        ingested_data_file_path,
+        rejected_data_file_path,
+    )
+    resumed_chunks = checkpoint.committed_chunks
+    metrics = MetricsRecorder(
+        input_path.name, pipeline.name, loading_options.collect_metrics
+    )
+    if not checkpoint.done:
+        if resumed_chunks:
+            logging.info(
+                f"Resuming file '{input_path}' after {resumed_chunks} committed chunks."
+            )
+        rollback_data_file(ingested_data_file_path, checkpoint.ingested_data_file_size)
+        rollback_data_file(rejected_data_file_path, checkpoint.rejected_data_file_size)
+        _clean_and_load_chunks(
+            input_path,
+            pipeline,
+            loading_options,
+            metrics,
+            checkpoint,
+            checkpoint_path,
+            ingested_data_file_path,
+            rejected_data_file_path,
+        )
+
+    return TaskResult(
+        input_path=input_path,
+        pipeline=pipeline.name,
+        ingested_rows=checkpoint.ingested_rows,
+        rejected_rows=checkpoint.rejected_rows,
+        ingested_data_file_path=ingested_data_file_path,
+        rejected_data_file_path=rejected_data_file_path,
+        wall_seconds=time.perf_counter() - start,
+        committed_chunks=checkpoint.committed_chunks,
+        resumed_chunks=resumed_chunks,
+        stages=list(metrics.stages.values()),
+    )
+
+
+def _clean_and_load_chunks(
+    input_path: Path,
+    pipeline: Pipeline,
+    loading_options: LoadingOptions,
+    metrics: MetricsRecorder,
+    checkpoint: TaskCheckpoint,
+    checkpoint_path: Path,
+    ingested_data_file_path: Path,
+    rejected_data_file_path: Path,
+) -> None:
+    # Committed chunks are read again, but neither cleaned nor written
+    chunks = metrics.measure_chunks(
+        "load",
+        islice(
+            load_data_file(input_path, pipeline, loading_options),
+            checkpoint.committed_chunks,
+            None,
+        ),
+    )
+    read_with_schema = reads_with_schema(input_path, pipeline)
+    for df in chunks:
+        df, all_dirty_elements = clean_data(df, pipeline, metrics, read_with_schema)
+
+        with metrics.measure("commit") as rows:
+            for data, data_file_path in (
+                (df, ingested_data_file_path),
+                (all_dirty_elements, rejected_data_file_path),
+            ):
+                writer = CsvDataWriter(data_file_path)
+                writer.write(data)
+                writer.commit()
+            rows.rows_in = len(df) + len(all_dirty_elements)
+            rows.rows_out, rows.rows_rejected = len(df), len(all_dirty_elements)
+
+        with metrics.measure("checkpoint"):
+            checkpoint.committed_chunks += 1
+            checkpoint.ingested_rows += len(df)
+            checkpoint.rejected_rows += len(all_dirty_elements)
+            checkpoint.ingested_data_file_size = _file_size(ingested_data_file_path)
+            checkpoint.rejected_data_file_size = _file_size(rejected_data_file_path)
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+    checkpoint.done = True
+    _save_checkpoint(checkpoint_path, checkpoint)
+
+
+def _task_data_file_name(input_path: Path) -> str:
+    # pubmed_0001.csv.gz gives pubmed_0001.csv, pubmed_0001.json pubmed_0001.json.csv
+    data_file_name, _ = split_compression_suffix(input_path.name)
+    if Path(data_file_name).suffix == ".csv":
+        return data_file_name
+    return f"{data_file_name}.csv"
+
+
+def _load_checkpoint(
+    checkpoint_path: Path,
+    input_path: Path,
+    ingested_data_file_path: Path,
+    rejected_data_file_path: Path,
+) -> TaskCheckpoint:
+    # A task starts over when its incoming file changed, or when its data files lost
+    # rows it had committed
+    checkpoint = None
+    if checkpoint_path.exists():
+        checkpoint = TaskCheckpoint(**json.loads(checkpoint_path.read_text()))
+
+    fingerprint = fingerprint_file(
+        input_path, checkpoint.input_fingerprint if checkpoint else None
+    )
+    if (
+        checkpoint is None
+        or checkpoint.input_fingerprint["sha256"] != fingerprint.sha256
+        or _file_size(ingested_data_file_path) < checkpoint.ingested_data_file_size
+        or _file_size(rejected_data_file_path) < checkpoint.rejected_data_file_size
+    ):
+        return TaskCheckpoint(input_fingerprint=asdict(fingerprint))
+    checkpoint.input_fingerprint = asdict(fingerprint)
+    return checkpoint
+
+
+def _save_checkpoint(checkpoint_path: Path, checkpoint: TaskCheckpoint) -> None:
+    write_file_atomically(checkpoint_path, json.dumps(asdict(checkpoint)))
+
+
+def _file_size(file_path: Path) -> int:
+    return file_path.stat().st_size if file_path.exists() else 0
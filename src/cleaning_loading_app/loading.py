@@ -0,0 +1,26 @@
+# How files are cleaned and loaded, and what came of it: shared by `cleaner_loader`,
+# which orchestrates runs, and `file_loader`, which processes each file
+from dataclasses import dataclass
+from typing import List
+
+from cleaning_loading_app.const import CsvEngine
+from cleaning_loading_app.metrics import StageMetrics
+
+
+@dataclass(frozen=True)
+class LoadingOptions:
+    chunk_size: int | None = None
+    csv_engine: CsvEngine = "c"
+    memory_map: bool = False
+    # Csv files are split in this number of row partitions, cleaned in parallel
+    partitions: int = 1
+    # Rows whose key was already ingested are rejected (see `Pipeline.key_columns`)
+    deduplicate: bool = False
+    collect_metrics: bool = False
+
+
+@dataclass(frozen=True)
+class FileIngestionResult:
+    ingested_rows: int
+    rejected_rows: int
+    stages: List[StageMetrics]
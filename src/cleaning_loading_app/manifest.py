@@ -0,0 +1,96 @@
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+ManifestEntry = Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class FileFingerprint:
+    file_name: str
+    size: int
+    mtime_ns: int
+    # Not computed for files ingested by a full run (see `fingerprint_file`)
+    sha256: str | None
+
+
+def load_manifest(manifest_path: Path) -> Dict[str, ManifestEntry]:
+    # The manifest is append only (one json line per ingested file), so the last
+    # entry of a file name is the one that counts.
+    manifest: Dict[str, ManifestEntry] = {}
+    if manifest_path.exists():
+        with manifest_path.open() as manifest_file:
+            for line in manifest_file:
+                if line.strip():
+                    entry = json.loads(line)
+                    manifest[entry["file_name"]] = entry
+    return manifest
+
+
+def fingerprint_file(
+    file_path: Path,
+    known_entry: ManifestEntry | None = None,
+    hash_content: bool = True,
+) -> FileFingerprint:
+    # Full runs, which wipe the manifest, do not hash their files: an incremental
+    # run then only recognizes them by their size and modification time, and
+    # ingests them again if these changed, their content being unknown.
+    stat = file_path.stat()
+
+    # Same size and modification time as when ingested: the content is not read
+    # again to be hashed.
+    if (
+        known_entry is not None
+        and known_entry["size"] == stat.st_size
+        and known_entry["mtime_ns"] == stat.st_mtime_ns
+    ):
+        sha256 = known_entry["sha256"]
+    elif hash_content:
+        sha256 = _hash_file(file_path)
+    else:
+        sha256 = None
+
+    return FileFingerprint(
+        file_name=file_path.name,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        sha256=sha256,
+    )
+
+
+def _hash_file(file_path: Path) -> str:
+    file_hash = hashlib.sha256()
+    with file_path.open("rb") as file:
+        while block := file.read(HASH_BLOCK_SIZE):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def is_already_ingested(
+    manifest: Dict[str, ManifestEntry],
+    fingerprint: FileFingerprint,
+) -> bool:
+    entry = manifest.get(fingerprint.file_name)
+    return entry is not None and entry["sha256"] == fingerprint.sha256
+
+
+def record_ingested_file(
+    manifest_path: Path,
+    fingerprint: FileFingerprint,
+    ingested_rows: int,
+    rejected_rows: int,
+) -> ManifestEntry:
+    entry = {
+        **asdict(fingerprint),
+        "ingested_rows": ingested_rows,
+        "rejected_rows": rejected_rows,
+        "ingested_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with manifest_path.open("a") as manifest_file:
+        manifest_file.write(json.dumps(entry) + "\n")
+    return entry
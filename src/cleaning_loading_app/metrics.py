@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from cleaning_loading_app.transformations import Rule
+
+
+@dataclass
+class StageRows:
+    rows_in: int = 0
+    rows_out: int = 0
+    rows_rejected: int = 0
+
+
+# Totals of every call of a stage (e.g. every chunk loaded) for one incoming file
+@dataclass
+class StageMetrics:
+    file_name: str
+    pipeline: str
+    stage: str
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    rows_rejected: int = 0
+    memory_delta_bytes: int = 0
+
+
+# Records the stages of the cleaning and loading of one incoming file. When
+# disabled, stages are run without any measure being taken.
+@dataclass
+class MetricsRecorder:
+    file_name: str
+    pipeline: str
+    enabled: bool = True
+    stages: Dict[str, StageMetrics] = field(default_factory=dict)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[StageRows]:
+        rows = StageRows()
+        if not self.enabled:
+            yield rows
+            return
+
+        memory_before = _current_rss_bytes()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        yield rows
+        cpu_seconds = time.process_time() - cpu_start
+        wall_seconds = time.perf_counter() - wall_start
+
+        metrics = self.stages.get(stage)
+        if metrics is None:
+            metrics = self.stages[stage] = StageMetrics(
+                self.file_name, self.pipeline, stage
+            )
+        metrics.calls += 1
+        metrics.wall_seconds += wall_seconds
+        metrics.cpu_seconds += cpu_seconds
+        metrics.rows_in += rows.rows_in
+        metrics.rows_out += rows.rows_out
+        metrics.rows_rejected += rows.rows_rejected
+        metrics.memory_delta_bytes += _current_rss_bytes() - memory_before
+
+    def measure_chunks(
+        self, stage: str, chunks: Iterable[pd.DataFrame]
+    ) -> Iterator[pd.DataFrame]:
+        # Whole files are read when the iterable is built, chunks when iterated
+        with self.measure(stage):
+            chunks_iterator = iter(chunks)
+        while True:
+            with self.measure(stage) as rows:
+                df = next(chunks_iterator, None)
+                rows.rows_in = rows.rows_out = 0 if df is None else len(df)
+            if df is None:
+                return
+            yield df
+
+    def measure_rules(self, rules: List[Rule]) -> List[Rule]:
+        if not self.enabled:
+            return rules
+        return [self._measure_rule(rule) for rule in rules]
+
+    def _measure_rule(self, rule: Rule) -> Rule:
+        reason, rows_condition = rule
+
+        def measured_rows_condition(df: pd.DataFrame) -> pd.Series:
+            with self.measure(f"rule:{reason}") as rows:
+                mask = rows_condition(df)
+                rows.rows_in = len(df)
+                rows.rows_rejected = int(mask.sum())
+                rows.rows_out = rows.rows_in - rows.rows_rejected
+            return mask
+
+        return reason, measured_rows_condition
+
+
+def merge_stage_metrics(stages: Iterable[StageMetrics]) -> List[StageMetrics]:
+    # Sums the metrics of a stage measured by several recorders (e.g. one per
+    # row partition of a file), keeping the stages in order of appearance
+    merged: Dict[Tuple[str, str], StageMetrics] = {}
+    for metrics in stages:
+        key = (metrics.file_name, metrics.stage)
+        if key not in merged:
+            merged[key] = replace(metrics)
+            continue
+        total = merged[key]
+        total.calls += metrics.calls
+        total.wall_seconds += metrics.wall_seconds
+        total.cpu_seconds += metrics.cpu_seconds
+        total.rows_in += metrics.rows_in
+        total.rows_out += metrics.rows_out
+        total.rows_rejected += metrics.rows_rejected
+        total.memory_delta_bytes += metrics.memory_delta_bytes
+    return list(merged.values())
+
+
+def save_metrics(
+    metrics_file_path: Path, run_id: str, stages: Iterable[StageMetrics]
+) -> None:
+    metrics_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with metrics_file_path.open("a", encoding="utf-8") as metrics_file:
+        for metrics in stages:
+            metrics_file.write(json.dumps({"run_id": run_id, **asdict(metrics)}) + "\n")
+
+
+def _current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # No procfs (e.g. macOS): the peak resident size is the closest cheap measure
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
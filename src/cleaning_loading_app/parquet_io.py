@@ -0,0 +1,25 @@
+from pathlib import Path
+from typing import Any, List
+
+import pandas as pd
+
+
+def save_parquet_part(file_path: Path, df: pd.DataFrame) -> None:
+    # Object columns may mix types (e.g. the raw values of rejected rows), which
+    # parquet does not support: they are written as string columns. So are
+    # categorical columns, whose encoding depends on the chunk, so that all the
+    # parts of a dataset have the same schema (parquet encodes them anyway).
+    object_columns = df.select_dtypes(include=["object", "category"]).columns
+    df.astype({column: "string" for column in object_columns}).to_parquet(
+        file_path,
+        index=False,
+        compression="zstd",
+    )
+
+
+def load_parquet_dataset(
+    dataset_path: Path,
+    columns: List[str] | None = None,
+    filters: List[Any] | None = None,
+) -> pd.DataFrame:
+    return pd.read_parquet(dataset_path, columns=columns, filters=filters)
@@ -0,0 +1,98 @@
+from datetime import date
+from pathlib import Path
+from typing import Any, Hashable, List, Mapping
+
+import pandas as pd
+
+from cleaning_loading_app.dates import parse_dates
+from cleaning_loading_app.filesystem import list_files
+from cleaning_loading_app.parquet_io import load_parquet_dataset
+
+DATE_PARTITION_PREFIX = "date="
+# Format of the dates written to csv data files
+CSV_DATE_FORMAT = "%Y-%m-%d"
+# Partition of the rows without a date, only read when no date range is given
+UNKNOWN_DATE_PARTITION = "unknown"
+
+
+def date_partition_name(month: str) -> str:
+    return f"{DATE_PARTITION_PREFIX}{month}"
+
+
+def list_dataset_files(
+    dataset_path: Path,
+    start: date | None = None,
+    end: date | None = None,
+) -> List[Path]:
+    # Data files of a dataset, whether partitioned by month (`date=YYYY-MM`
+    # directories) or not, in the order they were written: their names start with
+    # the id of the run. Partitions of months outside [start, end] are not listed.
+    if not dataset_path.is_dir():
+        return []
+
+    partition_paths = [dataset_path]
+    for partition_path in sorted(dataset_path.glob(f"{DATE_PARTITION_PREFIX}*")):
+        month = partition_path.name[len(DATE_PARTITION_PREFIX) :]
+        if _month_overlaps(month, start, end):
+            partition_paths.append(partition_path)
+    return sorted(
+        (
+            file_path
+            for partition_path in partition_paths
+            for file_path in list_files(partition_path)
+        ),
+        key=lambda file_path: (file_path.name, file_path.parent.name),
+    )
+
+
+def load_dataset(
+    dataset_path: Path,
+    start: date | None = None,
+    end: date | None = None,
+    date_column: str = "date",
+    dtypes: Mapping[Hashable, Any] | None = None,
+) -> pd.DataFrame:
+    # Rows of a dataset dated from `start` to `end` (both included, either one
+    # optional). Only the files of the partitions of these months are read.
+    frames = [
+        _load_data_file(file_path, date_column, dtypes)
+        for file_path in list_dataset_files(dataset_path, start, end)
+    ]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    if start is None and end is None:
+        return df
+
+    dates = pd.to_datetime(df[date_column]).dt.normalize()
+    in_range = dates.notna()
+    if start is not None:
+        in_range &= dates >= pd.Timestamp(start)
+    if end is not None:
+        in_range &= dates <= pd.Timestamp(end)
+    return df[in_range.to_numpy()].reset_index(drop=True)
+
+
+def _load_data_file(
+    file_path: Path,
+    date_column: str,
+    dtypes: Mapping[Hashable, Any] | None,
+) -> pd.DataFrame:
+    if file_path.suffix == ".parquet":
+        return load_parquet_dataset(file_path)
+
+    # Dates are parsed back to the datetimes parquet parts store, so that the
+    # files of both formats give the same dtypes
+    df = pd.read_csv(file_path, dtype=dtypes)
+    if date_column in df.columns:
+        df[date_column] = parse_dates(df[date_column], (CSV_DATE_FORMAT,))
+    return df
+
+
+def _month_overlaps(month: str, start: date | None, end: date | None) -> bool:
+    if month == UNKNOWN_DATE_PARTITION:
+        return start is None and end is None
+    # Months (YYYY-MM) compare as strings
+    return (start is None or month >= f"{start:%Y-%m}") and (
+        end is None or month <= f"{end:%Y-%m}"
+    )
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from typing import TYPE_CHECKING, Any, Hashable, List, Mapping, Tuple
+
+from cleaning_loading_app.compression import split_compression_suffix
+from cleaning_loading_app.const import KNOWN_DATE_FORMATS
+
+if TYPE_CHECKING:
+    from cleaning_loading_app.transformations import Rule
+
+
+@dataclass(frozen=True)
+class Pipeline:
+    name: str
+    file_patterns: Tuple[str, ...]
+    date_columns: Tuple[str, ...] = ()
+    int_columns: Tuple[str, ...] = ()
+    reject_empty_fields: bool = True
+    # Schema of the files: declared dtypes skip type inference of csv files, and
+    # dates are parsed with the known formats first (see `dates.parse_dates`).
+    # Columns of few distinct values (e.g. journals) are declared as "category",
+    # built by the csv parser instead of being encoded once loaded as strings.
+    csv_dtypes: Mapping[Hashable, Any] = field(default_factory=dict)
+    date_formats: Tuple[str, ...] = KNOWN_DATE_FORMATS
+    # Columns identifying a record, on which duplicated records are rejected
+    key_columns: Tuple[str, ...] = ()
+    # Column of the titles in which drugs are searched (see `drug_mentions`)
+    title_column: str | None = None
+
+    @property
+    def target_data_file_name(self) -> str:
+        return f"{self.name}.csv"
+
+    def matches(self, file_name: str) -> bool:
+        # Compressed files (e.g. pubmed.csv.gz) are matched on their data file name
+        data_file_name, _ = split_compression_suffix(file_name)
+        return any(fnmatch(data_file_name, pattern) for pattern in self.file_patterns)
+
+    def rules(self) -> List[Rule]:
+        # Pipelines are matched to files without importing pandas, only needed by
+        # the rules once a file is processed
+        from cleaning_loading_app.transformations import (
+            has_empty_or_spaces_only_string_field,
+            has_invalid_date,
+            has_invalid_int,
+            has_nan_field,
+        )
+
+        rules: List[Rule] = []
+        if self.reject_empty_fields:
+            rules.append(
+                (
+                    "empty_or_spaces_only_string_field",
+                    has_empty_or_spaces_only_string_field,
+                )
+            )
+            rules.append(("nan_field", has_nan_field))
+        for date_column in self.date_columns:
+            rules.append(
+                ("invalid_date", has_invalid_date(date_column, self.date_formats))
+            )
+        for int_column in self.int_columns:
+            rules.append(("invalid_int", has_invalid_int(int_column)))
+        return rules
+
+
+# Incoming files are matched against the patterns in this order, so more specific
+# patterns must come first. Sharded drops (e.g. pubmed_0001.json) are loaded in
+# the same target data file as the unsharded ones.
+PIPELINES = [
+    Pipeline(
+        name="clinical_trials",
+        file_patterns=("clinical_trials.csv", "clinical_trials_*.csv"),
+        date_columns=("date",),
+        csv_dtypes={"id": str, "scientific_title": str, "journal": "category"},
+        date_formats=("%d %B %Y", "%d/%m/%Y", "%Y-%m-%d"),
+        key_columns=("id",),
+        title_column="scientific_title",
+    ),
+    Pipeline(
+        name="pubmed",
+        file_patterns=(
+            "pubmed.csv",
+            "pubmed_*.csv",
+            "pubmed.json",
+            "pubmed_*.json",
+            "pubmed.ndjson",
+            "pubmed_*.ndjson",
+        ),
+        date_columns=("date",),
+        int_columns=("id",),
+        # Ids are validated and converted by the cleaning rules
+        csv_dtypes={"id": str, "title": str, "journal": "category"},
+        date_formats=("%d/%m/%Y", "%Y-%m-%d"),
+        key_columns=("id",),
+        title_column="title",
+    ),
+    Pipeline(
+        name="drugs",
+        file_patterns=("drugs.csv", "drugs_*.csv"),
+        reject_empty_fields=False,
+        csv_dtypes={"atccode": "category", "drug": str},
+        key_columns=("atccode",),
+    ),
+]
+
+
+def find_pipeline(file_name: str) -> Pipeline | None:
+    for pipeline in PIPELINES:
+        if pipeline.matches(file_name):
+            return pipeline
+    return None
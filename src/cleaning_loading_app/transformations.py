@@ -1,51 +1,219 @@
-from typing import Tuple
+from dataclasses import dataclass, field
+from typing import Callable, List, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
+from cleaning_loading_app.const import KNOWN_DATE_FORMATS
+from cleaning_loading_app.dates import parse_dates
+
+REJECTION_REASON_COLUMN = "rejection_reason"
+# String columns with at most this ratio of distinct values, estimated on their
+# first rows, are encoded as categories
+CATEGORY_MAX_DISTINCT_RATIO = 0.5
+CATEGORY_SAMPLE_ROWS = 10_000
+
+RowsCondition = Callable[[pd.DataFrame], pd.Series]
+Rule = Tuple[str, RowsCondition]
+
+
+# Tracks the rows of a frame broken by cleaning rules, as a selection over the
+# frame rather than as filtered copies of it. Frames are only materialized when
+# asked for, and the clean rows are the frame itself when no row is rejected.
+@dataclass
+class RowSelection:
+    df: pd.DataFrame
+    rejection_reasons: np.ndarray = field(init=False)
+    rejected: np.ndarray = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.rejection_reasons = np.full(len(self.df), None, dtype=object)
+        self.rejected = np.zeros(len(self.df), dtype=bool)
+
+    def reject_rows(self, rules: List[Rule]) -> None:
+        # A rejected row keeps the reason of the first rule it breaks
+        for reason, rows_condition in rules:
+            newly_rejected = rows_condition(self.df).to_numpy(dtype=bool)
+            newly_rejected &= ~self.rejected
+            self.rejection_reasons[newly_rejected] = reason
+            self.rejected |= newly_rejected
+
+    def clean_rows(self) -> pd.DataFrame:
+        if not self.rejected.any():
+            return self.df
+        return self.df.take(np.flatnonzero(~self.rejected))
+
+    def rejected_rows(self) -> pd.DataFrame:
+        return self.df.take(np.flatnonzero(self.rejected)).assign(
+            **{REJECTION_REASON_COLUMN: self.rejection_reasons[self.rejected]}
+        )
+
+
+def split_clean_and_rejected_rows(
+    df: pd.DataFrame,
+    rules: List[Rule],
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Every rule is evaluated as a boolean mask over the same frame, and the frame
+    # is split only once. A rejected row gets the reason of the first rule it
+    # breaks, in the order the rules are given.
+    selection = RowSelection(df)
+    selection.reject_rows(rules)
+
+    return selection.clean_rows(), selection.rejected_rows()
+
+
+def has_nan_field(df: pd.DataFrame) -> pd.Series:
+    return df.isna().any(axis=1)
+
+
+def encode_low_cardinality_columns(
+    df: pd.DataFrame,
+    excluded_columns: Sequence[str] = (),
+    max_distinct_ratio: float = CATEGORY_MAX_DISTINCT_RATIO,
+    sample_rows: int = CATEGORY_SAMPLE_ROWS,
+) -> pd.DataFrame:
+    # Values repeated across rows (e.g. journals) are stored once per column, and
+    # rows only hold a code: the frame is smaller and checks run once per value.
+    for column in df.select_dtypes(include="object").columns:
+        if column in excluded_columns:
+            continue
+        sample = df[column].iloc[:sample_rows]
+        if sample.nunique(dropna=False) <= max_distinct_ratio * len(sample):
+            df[column] = df[column].astype("category")
+    return df
+
+
+def has_empty_or_spaces_only_string_field(df: pd.DataFrame) -> pd.Series:
+    # Checked column by column with vectorized string methods: only object, string
+    # and categorical columns may hold strings, and non string values are never
+    # blank. Categorical columns are checked once per category.
+    condition = np.zeros(len(df), dtype=bool)
+
+    for column in df.select_dtypes(include=["object", "string", "category"]).columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            blank_categories = _is_blank(pd.Series(values.cat.categories))
+            # Missing values have the code -1, which picks the last, False, item
+            condition |= np.append(blank_categories, False)[values.cat.codes]
+        else:
+            condition |= _is_blank(values)
+
+    return pd.Series(condition, index=df.index)
+
+
+def _is_blank(values: pd.Series) -> np.ndarray:
+    try:
+        stripped_values = values.str.strip()
+    except AttributeError:
+        # Column without any string value
+        return np.zeros(len(values), dtype=bool)
+    return stripped_values.eq("").fillna(False).to_numpy(dtype=bool)
+
+
+def has_invalid_date(
+    date_column: str, date_formats: Sequence[str] = KNOWN_DATE_FORMATS
+) -> RowsCondition:
+    def rows_condition(df: pd.DataFrame) -> pd.Series:
+        values = df[date_column]
+        return parse_dates(values, date_formats).isna() & values.notna()
+
+    return rows_condition
+
+
+def has_invalid_int(column: str) -> RowsCondition:
+    def rows_condition(df: pd.DataFrame) -> pd.Series:
+        values = df[column]
+        numbers = pd.to_numeric(values, errors="coerce")
+        return values.notna() & (numbers.isna() | numbers.mod(1).ne(0))
+
+    return rows_condition
+
 
 def remove_rows_with_nan_fields(
     df: pd.DataFrame,
     all_dirty_elements: pd.DataFrame,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    df_without_na = df.dropna()
-    df_with_na_only = pd.DataFrame(df[df.isna().any(axis=1)])
+    selection = RowSelection(df)
+    selection.reject_rows([("nan_field", has_nan_field)])
 
-    all_dirty_elements = pd.concat([all_dirty_elements, df_with_na_only])
+    all_dirty_elements = pd.concat(
+        [all_dirty_elements, selection.df.take(np.flatnonzero(selection.rejected))]
+    )
 
-    return df_without_na, all_dirty_elements
+    return selection.clean_rows(), all_dirty_elements
 
 
 def remove_rows_with_empty_or_spaces_only_string_fields(
     df: pd.DataFrame,
     all_dirty_elements: pd.DataFrame,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    condition = df.apply(lambda x: x.astype(str).str.contains(r"^\s*$").any(), axis=1)
+    selection = RowSelection(df)
+    selection.reject_rows(
+        [("empty_or_spaces_only_string_field", has_empty_or_spaces_only_string_field)]
+    )
 
-    df_without_spaces = df[~condition]
-    df_with_spaces = df[condition]
+    all_dirty_elements = pd.concat(
+        [all_dirty_elements, selection.df.take(np.flatnonzero(selection.rejected))]
+    )
 
-    all_dirty_elements = pd.concat([all_dirty_elements, df_with_spaces])
-
-    return df_without_spaces, all_dirty_elements
+    return selection.clean_rows(), all_dirty_elements
 
 
 def convert_string_to_date(
     df: pd.DataFrame,
     date_column: str,
     all_dirty_elements: pd.DataFrame,
+    date_formats: Sequence[str] = KNOWN_DATE_FORMATS,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    # As the sample json data is correct, we will not go further in checks than do
-    # a simple conversion.
-    df[date_column] = pd.to_datetime(df[date_column], dayfirst=True)
+    # Invalid dates are usually already rejected (see `has_invalid_date`), the
+    # remaining ones are rejected here rather than failing the whole file.
+    dates = parse_dates(df[date_column], date_formats)
+    invalid_dates = (dates.isna() & df[date_column].notna()).to_numpy(dtype=bool)
+    if invalid_dates.any():
+        invalid_rows = df.take(np.flatnonzero(invalid_dates)).assign(
+            **{REJECTION_REASON_COLUMN: "invalid_date"}
+        )
+        all_dirty_elements = pd.concat([all_dirty_elements, invalid_rows])
+        df = df.take(np.flatnonzero(~invalid_dates))
+        dates = dates[~invalid_dates]
+    df[date_column] = dates
+
+    # Valid dates of rejected rows are written in the same format as the ingested
+    # ones, and invalid dates as they were read, so that the reason of the
+    # rejection can be seen in the rejected data file.
+    if date_column in all_dirty_elements:
+        raw_dates = all_dirty_elements[date_column]
+        all_dirty_elements[date_column] = format_dates(
+            parse_dates(raw_dates, date_formats)
+        ).where(lambda formatted_dates: formatted_dates.notna(), raw_dates)
 
     return df, all_dirty_elements
 
 
+def format_dates(dates: pd.Series) -> pd.Series:
+    # Dates as text, as a datetime column is written to csv (no time when all the
+    # dates are at midnight). Missing dates stay missing.
+    return dates.astype(str).where(dates.notna())
+
+
 def ensure_column_is_int(
     df: pd.DataFrame,
     column: str,
     all_dirty_elements: pd.DataFrame,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    df[column] = df[column].astype("int64")
+    df[column] = pd.to_numeric(df[column]).astype("int64")
+
+    # Valid integers of rejected rows are written as numbers, as the ingested ones
+    # (and as read from json files), and invalid ones as they were read
+    if column in all_dirty_elements:
+        all_dirty_elements[column] = format_ints(all_dirty_elements[column])
 
     return df, all_dirty_elements
+
+
+def format_ints(values: pd.Series) -> pd.Series:
+    numbers = pd.to_numeric(values, errors="coerce")
+    is_int = (numbers.notna() & numbers.mod(1).eq(0)).to_numpy(dtype=bool)
+    formatted_values = values.astype(object)
+    formatted_values[is_int] = numbers[is_int].astype("int64").tolist()
+    return formatted_values
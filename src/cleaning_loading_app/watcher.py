@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import signal
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext, suppress
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import AsyncContextManager, Dict, List, Set, Tuple
+
+from cleaning_loading_app.cleaner_loader import ingest_incoming_file, new_run_id
+from cleaning_loading_app.compression import OutputCompression
+from cleaning_loading_app.const import INCOMING_FILES_PATH, MANIFEST_PATH
+from cleaning_loading_app.filesystem import list_files, preliminary_checks_and_cleaning
+from cleaning_loading_app.loading import LoadingOptions
+from cleaning_loading_app.manifest import (
+    ManifestEntry,
+    load_manifest,
+    record_ingested_file,
+)
+from cleaning_loading_app.metrics import save_metrics
+from cleaning_loading_app.pipelines import Pipeline, find_pipeline
+
+# An empty `<file name>.ready` file marks a file as complete, without waiting for
+# its size to settle
+READY_MARKER_SUFFIX = ".ready"
+
+
+@dataclass(frozen=True)
+class WatchOptions:
+    poll_seconds: float = 1.0
+    # A file without a ready marker is complete once its size and modification
+    # time have not changed for this long
+    settle_seconds: float = 2.0
+    workers: int = 1
+    # Complete files waiting for a worker. The landing zone is not scanned while
+    # the queue is full, so files are picked up as workers free up.
+    max_pending_files: int = 16
+
+
+@dataclass(frozen=True)
+class OutputOptions:
+    output_format: str = "csv"
+    output_compression: OutputCompression | None = None
+    metrics_file: Path | None = None
+    partition_by_date: bool = False
+
+
+# Files of the landing zone seen by the previous scans
+@dataclass
+class _LandingZone:
+    # Size and modification time of a file, and when it was first seen with them
+    observed_files: Dict[Path, Tuple[int, int, float]] = field(default_factory=dict)
+    scheduled_files: Set[Path] = field(default_factory=set)
+    ignored_files: Set[Path] = field(default_factory=set)
+
+    def scan_complete_files(self, settle_seconds: float) -> List[Tuple[Path, Pipeline]]:
+        now = time.monotonic()
+        incoming_file_paths = list_files(INCOMING_FILES_PATH)
+        file_names = {path.name for path in incoming_file_paths}
+
+        complete_files = []
+        for incoming_file_path in incoming_file_paths:
+            if (
+                incoming_file_path.name.endswith(READY_MARKER_SUFFIX)
+                or incoming_file_path in self.scheduled_files
+                or incoming_file_path in self.ignored_files
+            ):
+                continue
+
+            pipeline = find_pipeline(incoming_file_path.name)
+            if pipeline is None:
+                logging.warning(
+                    f"No pipeline matches file '{incoming_file_path}'. Leaving it..."
+                )
+                self.ignored_files.add(incoming_file_path)
+                continue
+
+            if f"{incoming_file_path.name}{READY_MARKER_SUFFIX}" in file_names or (
+                self._has_settled(incoming_file_path, now, settle_seconds)
+            ):
+                self.observed_files.pop(incoming_file_path, None)
+                self.scheduled_files.add(incoming_file_path)
+                complete_files.append((incoming_file_path, pipeline))
+
+        # Files removed from the landing zone before being complete
+        for observed_file_path in set(self.observed_files) - set(incoming_file_paths):
+            del self.observed_files[observed_file_path]
+        return complete_files
+
+    def _has_settled(self, file_path: Path, now: float, settle_seconds: float) -> bool:
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            return False
+
+        size, mtime_ns, seen_at = self.observed_files.get(file_path, (-1, -1, now))
+        if (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            self.observed_files[file_path] = (stat.st_size, stat.st_mtime_ns, now)
+            return False
+        return now - seen_at >= settle_seconds
+
+
+# Ingests the complete files of the landing zone on a pool of worker processes
+@dataclass
+class _Ingestion:
+    executor: Executor
+    loading_options: LoadingOptions
+    output_options: OutputOptions
+    landing_zone: _LandingZone
+    run_id: str = field(default_factory=new_run_id)
+    manifest: Dict[str, ManifestEntry] = field(
+        default_factory=lambda: load_manifest(MANIFEST_PATH)
+    )
+    started_files: int = 0
+    pipeline_locks: Dict[str, asyncio.Lock] = field(default_factory=dict)
+
+    async def ingest_queued_files(
+        self, queue: "asyncio.Queue[Tuple[Path, Pipeline]]"
+    ) -> None:
+        while True:
+            incoming_file_path, pipeline = await queue.get()
+            try:
+                await self.ingest_file(incoming_file_path, pipeline)
+            except Exception:
+                # The file is left in the landing zone, and not retried by this run
+                logging.exception(
+                    f"Failed to ingest file '{incoming_file_path}'. Leaving it..."
+                )
+            else:
+                self.landing_zone.scheduled_files.discard(incoming_file_path)
+            finally:
+                queue.task_done()
+
+    async def ingest_file(self, incoming_file_path: Path, pipeline: Pipeline) -> None:
+        file_index = self.started_files
+        self.started_files += 1
+
+        # Files of a pipeline are deduplicated one at a time, each one against the
+        # keys committed by the previous ones
+        pipeline_lock: AsyncContextManager[object] = nullcontext()
+        if self.loading_options.deduplicate:
+            pipeline_lock = self.pipeline_locks.setdefault(
+                pipeline.name, asyncio.Lock()
+            )
+
+        async with pipeline_lock:
+            fingerprint, result = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                partial(
+                    ingest_incoming_file,
+                    incoming_file_path,
+                    pipeline,
+                    self.manifest.get(incoming_file_path.name),
+                    self.loading_options,
+                    self.output_options.output_format,
+                    self.output_options.output_compression,
+                    self.run_id,
+                    file_index,
+                    self.output_options.partition_by_date,
+                ),
+            )
+        incoming_file_path.with_name(
+            f"{incoming_file_path.name}{READY_MARKER_SUFFIX}"
+        ).unlink(missing_ok=True)
+        if result is None:
+            return
+
+        self.manifest[fingerprint.file_name] = record_ingested_file(
+            MANIFEST_PATH, fingerprint, result.ingested_rows, result.rejected_rows
+        )
+        if self.output_options.metrics_file is not None:
+            save_metrics(self.output_options.metrics_file, self.run_id, result.stages)
+
+
+async def watch_incoming_files(
+    loading_options: LoadingOptions,
+    watch_options: WatchOptions,
+    output_options: OutputOptions,
+    stop: asyncio.Event | None = None,
+) -> None:
+    # Ingests files incrementally as soon as they land, until `stop` is set (or
+    # until SIGINT or SIGTERM when no event is given). Files queued or being
+    # ingested when stopping are ingested first.
+    preliminary_checks_and_cleaning(incremental=True)
+    if stop is None:
+        stop = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(signal_number, stop.set)
+
+    landing_zone = _LandingZone()
+    queue: asyncio.Queue[Tuple[Path, Pipeline]] = asyncio.Queue(
+        watch_options.max_pending_files
+    )
+    logging.info(f"Watching '{INCOMING_FILES_PATH}' for new files.")
+
+    with ProcessPoolExecutor(max_workers=watch_options.workers) as executor:
+        ingestion = _Ingestion(executor, loading_options, output_options, landing_zone)
+        workers = [
+            asyncio.create_task(ingestion.ingest_queued_files(queue))
+            for _ in range(watch_options.workers)
+        ]
+
+        while not stop.is_set():
+            for incoming_file in landing_zone.scan_complete_files(
+                watch_options.settle_seconds
+            ):
+                # Waits for a free slot when the queue is full
+                await queue.put(incoming_file)
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), watch_options.poll_seconds)
+
+        await queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,136 @@
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, Protocol, TextIO
+from uuid import uuid4
+
+import pandas as pd
+
+from cleaning_loading_app.compression import OUTPUT_SUFFIXES, OutputCompression
+from cleaning_loading_app.csv_io import write_cvs_in_proper_format
+from cleaning_loading_app.filesystem import (
+    commit_part_file,
+    lock_part_files,
+    replace_file_atomically,
+)
+from cleaning_loading_app.parquet_io import save_parquet_part
+from cleaning_loading_app.partitions import UNKNOWN_DATE_PARTITION, date_partition_name
+
+CSV_WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+class DataWriter(Protocol):
+    def write(self, df: pd.DataFrame) -> None: ...
+
+    def commit(self) -> None: ...
+
+
+# Appends all the data to a single csv data file. The data written is buffered in
+# a hidden part file, next to the data file, which is appended to the data file as
+# a whole when committed. Nothing reaches the data file if the run stops before.
+@dataclass
+class CsvDataWriter:
+    file_path: Path
+    compression: OutputCompression | None = None
+    part_id: str = field(default_factory=lambda: uuid4().hex, init=False)
+    part_file: TextIO | None = field(default=None, init=False, repr=False)
+    part_files_lock: BinaryIO | None = field(default=None, init=False, repr=False)
+
+    @property
+    def part_file_path(self) -> Path:
+        return self.file_path.with_name(f".{self.file_path.name}.{self.part_id}.part")
+
+    def write(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+
+        write_header = self.part_file is None
+        if self.part_file is None:
+            self.part_files_lock = lock_part_files(self.file_path.parent)
+            self.part_file = self.part_file_path.open(
+                "w", buffering=CSV_WRITE_BUFFER_SIZE, encoding="utf-8", newline=""
+            )
+        write_cvs_in_proper_format(self.part_file, df, write_header)
+
+    def commit(self) -> None:
+        if self.part_file is None:
+            return
+
+        self.part_file.flush()
+        os.fsync(self.part_file.fileno())
+        self.part_file.close()
+        self.part_file = None
+        commit_part_file(self.part_file_path, self.file_path, self.compression)
+        if self.part_files_lock is not None:
+            self.part_files_lock.close()
+            self.part_files_lock = None
+
+
+# Writes each chunk of data as a new part file of a parquet dataset
+@dataclass
+class ParquetDataWriter:
+    dataset_path: Path
+    part_name_prefix: str
+    written_parts: int = 0
+
+    def write(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+
+        self.dataset_path.mkdir(exist_ok=True)
+        part_file_name = f"{self.part_name_prefix}-{self.written_parts:05d}.parquet"
+        # Readers of the dataset never see a partially written part file
+        temporary_file_path = self.dataset_path / f".{part_file_name}.tmp"
+        save_parquet_part(temporary_file_path, df)
+        replace_file_atomically(temporary_file_path, self.dataset_path / part_file_name)
+        self.written_parts += 1
+
+    def commit(self) -> None:
+        # Every part file is complete as soon as it is written
+        pass
+
+
+# Writes each row to the partition of the month of its date, e.g.
+# `pubmed/date=2020-01/part-<run id>-<file index>.csv`, so that readers of a range
+# of dates only read the files of its months (see `partitions.load_dataset`).
+# Partitions are written as csv data files or as parquet parts.
+@dataclass
+class DatePartitionedDataWriter:
+    dataset_path: Path
+    date_column: str
+    part_name_prefix: str
+    output_format: str = "csv"
+    compression: OutputCompression | None = None
+    partition_writers: Dict[str, DataWriter] = field(default_factory=dict, init=False)
+
+    def write(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+
+        months = (
+            df[self.date_column].dt.strftime("%Y-%m").fillna(UNKNOWN_DATE_PARTITION)
+        )
+        for month, partition in df.groupby(months.to_numpy(), sort=True):
+            self._partition_writer(str(month)).write(partition)
+
+    def commit(self) -> None:
+        for partition_writer in self.partition_writers.values():
+            partition_writer.commit()
+
+    def _partition_writer(self, month: str) -> DataWriter:
+        partition_writer = self.partition_writers.get(month)
+        if partition_writer is None:
+            partition_path = self.dataset_path / date_partition_name(month)
+            partition_path.mkdir(parents=True, exist_ok=True)
+            if self.output_format == "parquet":
+                partition_writer = ParquetDataWriter(
+                    partition_path, self.part_name_prefix
+                )
+            else:
+                suffix = OUTPUT_SUFFIXES[self.compression] if self.compression else ""
+                partition_writer = CsvDataWriter(
+                    partition_path / f"{self.part_name_prefix}.csv{suffix}",
+                    self.compression,
+                )
+            self.partition_writers[month] = partition_writer
+        return partition_writer
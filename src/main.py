@@ -1,8 +1,165 @@
-from cleaning_loading_app import cleaner_loader
+import argparse
+from pathlib import Path
+
+from cleaning_loading_app import cleaner_loader, loading
+from cleaning_loading_app.compression import OUTPUT_COMPRESSIONS
+from cleaning_loading_app.const import CSV_ENGINES, OUTPUT_FORMATS
 
 if __name__ == "__main__":
     import logging
 
     logging.getLogger().setLevel(logging.INFO)
 
-    cleaner_loader.ingest_files()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Stream incoming files by chunks of this number of rows.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help=(
+            "Clean and load incoming files in parallel with this number of processes"
+            " (default: 1, or one per row partition up to the number of CPUs)."
+        ),
+    )
+    parser.add_argument(
+        "--partitions",
+        type=int,
+        default=1,
+        help="Split csv files in this number of row partitions, cleaned in parallel.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep the datalake and only ingest files not already ingested.",
+    )
+    parser.add_argument(
+        "--deduplicate",
+        action="store_true",
+        help="Reject rows whose key was already ingested, by this run or a former one.",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="csv",
+        help="Format of the ingested and rejected data in the datalake.",
+    )
+    parser.add_argument(
+        "--output-compression",
+        choices=OUTPUT_COMPRESSIONS,
+        default=None,
+        help="Compress the csv data files of the datalake (zstd requires zstandard).",
+    )
+    parser.add_argument(
+        "--partition-by-date",
+        action="store_true",
+        help="Write ingested rows to a partition per month of their date.",
+    )
+    parser.add_argument(
+        "--csv-engine",
+        choices=CSV_ENGINES,
+        default="c",
+        help="Parser used to load whole csv files (pyarrow requires pyarrow).",
+    )
+    parser.add_argument(
+        "--memory-map",
+        action="store_true",
+        help="Parse csv files straight from their memory mapping.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        default=None,
+        help="Append timings, rows and memory of each stage to this json lines file.",
+    )
+    parser.add_argument(
+        "--index-drug-mentions",
+        action="store_true",
+        help="Then index the mentions of drugs in the titles ingested since last time.",
+    )
+    parser.add_argument(
+        "--aggregate",
+        action="store_true",
+        help="Then index drug mentions and add them to the journal and date tables.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and ingest files incrementally as soon as they land.",
+    )
+    parser.add_argument(
+        "--poll-seconds",
+        type=float,
+        default=1.0,
+        help="Interval between two scans of the landing zone in watch mode.",
+    )
+    parser.add_argument(
+        "--settle-seconds",
+        type=float,
+        default=2.0,
+        help="Time without change after which a file without marker is complete.",
+    )
+    parser.add_argument(
+        "--max-pending-files",
+        type=int,
+        default=16,
+        help="Complete files waiting for a worker before scans are paused.",
+    )
+    args = parser.parse_args()
+
+    # Modules that are slow to import (e.g. importing pandas) are only imported when
+    # needed, so that a run with nothing to ingest starts fast
+    if args.watch:
+        import asyncio
+
+        from cleaning_loading_app import watcher
+
+        asyncio.run(
+            watcher.watch_incoming_files(
+                loading.LoadingOptions(
+                    chunk_size=args.chunk_size,
+                    csv_engine=args.csv_engine,
+                    memory_map=args.memory_map,
+                    deduplicate=args.deduplicate,
+                    collect_metrics=args.metrics_file is not None,
+                ),
+                watcher.WatchOptions(
+                    poll_seconds=args.poll_seconds,
+                    settle_seconds=args.settle_seconds,
+                    workers=args.workers or 1,
+                    max_pending_files=args.max_pending_files,
+                ),
+                watcher.OutputOptions(
+                    output_format=args.output_format,
+                    output_compression=args.output_compression,
+                    metrics_file=args.metrics_file,
+                    partition_by_date=args.partition_by_date,
+                ),
+            )
+        )
+    else:
+        cleaner_loader.ingest_files(
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            incremental=args.incremental,
+            output_format=args.output_format,
+            csv_engine=args.csv_engine,
+            metrics_file=args.metrics_file,
+            memory_map=args.memory_map,
+            partitions=args.partitions,
+            output_compression=args.output_compression,
+            deduplicate=args.deduplicate,
+            partition_by_date=args.partition_by_date,
+        )
+        if args.index_drug_mentions or args.aggregate:
+            from cleaning_loading_app import drug_mentions
+
+            drug_mentions.update_drug_mentions()
+        if args.aggregate:
+            from cleaning_loading_app import aggregates
+
+            aggregates.update_aggregates()
@@ -4,6 +4,7 @@ from invoke import Collection, task
 # running the pipeline
 #################################################################
 
+
 @task
 def copy_sample_files(context):
     """
@@ -11,12 +12,138 @@ def copy_sample_files(context):
     """
     context.run("cp data/samples/* data/data_files/incoming/")
 
+
 @task
-def run_ingestion(context):
+def run_ingestion(
+    context,
+    chunk_size=None,
+    workers=None,
+    incremental=False,
+    output_format="csv",
+    csv_engine="c",
+    metrics_file=None,
+    memory_map=False,
+    partitions=1,
+    output_compression=None,
+    deduplicate=False,
+    watch=False,
+    index_drug_mentions=False,
+    aggregate=False,
+    partition_by_date=False,
+):
     """
     Run the pipeline
     """
-    context.run("poetry run python src/main.py")
+    options = (
+        f" --partitions {partitions}"
+        f" --output-format {output_format}"
+        f" --csv-engine {csv_engine}"
+    )
+    if workers:
+        options += f" --workers {workers}"
+    if chunk_size:
+        options += f" --chunk-size {chunk_size}"
+    if incremental:
+        options += " --incremental"
+    if metrics_file:
+        options += f" --metrics-file {metrics_file}"
+    if memory_map:
+        options += " --memory-map"
+    if output_compression:
+        options += f" --output-compression {output_compression}"
+    if deduplicate:
+        options += " --deduplicate"
+    if watch:
+        options += " --watch"
+    if index_drug_mentions:
+        options += " --index-drug-mentions"
+    if aggregate:
+        options += " --aggregate"
+    if partition_by_date:
+        options += " --partition-by-date"
+    context.run(f"poetry run python src/main.py{options}")
+
+
+#################################################################
+# benchmarks
+#################################################################
+
+
+@task
+def benchmark_ingestion(
+    context,
+    rows=1_000_000,
+    blank_ratio=0.01,
+    nan_ratio=0.01,
+    bad_date_ratio=0.01,
+    chunk_size=None,
+    json=False,
+    results_file=None,
+):
+    """
+    Benchmark each stage of the pipeline on synthetic files
+    """
+    options = (
+        f" --rows {rows} --blank-ratio {blank_ratio} --nan-ratio {nan_ratio}"
+        f" --bad-date-ratio {bad_date_ratio}"
+    )
+    if chunk_size:
+        options += f" --chunk-size {chunk_size}"
+    if json:
+        options += " --json"
+    if results_file:
+        options += f" --results-file {results_file}"
+    context.run(
+        f"poetry run python benchmarks/ingestion.py{options}",
+        env={"PYTHONPATH": "src"},
+    )
+
+
+@task
+def benchmark_blank_string_fields(context, rows=1_000_000, skip_legacy=False):
+    """
+    Benchmark the blank string fields rejection step
+    """
+    options = " --skip-legacy" if skip_legacy else ""
+    context.run(
+        f"poetry run python benchmarks/blank_string_fields.py --rows {rows}{options}",
+        env={"PYTHONPATH": "src"},
+    )
+
+
+@task
+def benchmark_csv_loading(context, rows=2_000_000):
+    """
+    Benchmark csv loading with and without the pipelines schemas
+    """
+    context.run(
+        f"poetry run python benchmarks/csv_loading.py --rows {rows}",
+        env={"PYTHONPATH": "src"},
+    )
+
+
+@task
+def benchmark_date_conversion(context, rows=2_000_000, bad_date_ratio=0.01):
+    """
+    Benchmark the conversion of date strings with known formats
+    """
+    context.run(
+        f"poetry run python benchmarks/date_conversion.py --rows {rows}"
+        f" --bad-date-ratio {bad_date_ratio}",
+        env={"PYTHONPATH": "src"},
+    )
+
+
+@task
+def benchmark_startup(context, runs=20, file_name="pubmed.csv"):
+    """
+    Benchmark the cold start of main.py with no file and with a single file
+    """
+    context.run(
+        f"poetry run python benchmarks/startup.py --runs {runs} --file-name {file_name}",
+        env={"PYTHONPATH": "src"},
+    )
+
 
 #################################################################
 # cleaning
@@ -288,7 +415,12 @@ def all_locals(context):
 
 namespace = Collection()
 namespace.add_task(run_ingestion)
+namespace.add_task(benchmark_ingestion)
 namespace.add_task(copy_sample_files)
+namespace.add_task(benchmark_blank_string_fields)
+namespace.add_task(benchmark_csv_loading)
+namespace.add_task(benchmark_date_conversion)
+namespace.add_task(benchmark_startup)
 
 namespace_tox = Collection("tox_")
 namespace_tox.add_task(tox_test, name="test")
@@ -0,0 +1,107 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from hamcrest import assert_that, equal_to
+
+from cleaning_loading_app import cleaner_loader
+from cleaning_loading_app.aggregates import (
+    Aggregates,
+    load_aggregates,
+    update_aggregates,
+)
+from cleaning_loading_app.drug_mentions import update_drug_mentions
+
+SAMPLES_PATH = Path(__file__).parents[1] / "data" / "samples"
+
+
+def _mentions(rows: list[tuple[str, str, str]]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["drug", "journal", "date"])
+
+
+def test_aggregates_added_in_two_batches_equal_aggregates_added_at_once() -> None:
+    # Given
+    first_mentions = _mentions(
+        [
+            ("ATROPINE", "Journal A", "2020-01-01"),
+            ("BETAMETHASONE", "Journal A", "2020-01-01"),
+            ("ATROPINE", "Journal B", "2020-01-02"),
+        ]
+    )
+    new_mentions = _mentions(
+        [
+            ("ATROPINE", "Journal A", "2020-01-02"),
+            ("EPINEPHRINE", "Journal A", "2020-01-02"),
+            ("EPINEPHRINE", "Journal B", "2020-01-02"),
+            ("BETAMETHASONE", "Journal B", "2020-01-02"),
+        ]
+    )
+
+    # When
+    aggregates = Aggregates.empty().add(first_mentions).add(new_mentions)
+
+    # Then
+    at_once = Aggregates.empty().add(pd.concat([first_mentions, new_mentions]))
+    for table, expected_table in (
+        (aggregates.journal_drug_counts, at_once.journal_drug_counts),
+        (aggregates.date_mention_counts, at_once.date_mention_counts),
+        (aggregates.drug_cooccurrences, at_once.drug_cooccurrences),
+    ):
+        assert_that(table.values.tolist(), equal_to(expected_table.values.tolist()))
+    assert_that(
+        aggregates.drug_cooccurrences.values.tolist(),
+        equal_to(
+            [
+                ["ATROPINE", "BETAMETHASONE", 2],
+                ["ATROPINE", "EPINEPHRINE", 2],
+                ["BETAMETHASONE", "EPINEPHRINE", 2],
+            ]
+        ),
+    )
+    assert_that(
+        aggregates.journals_by_distinct_drugs().values.tolist(),
+        equal_to([["Journal A", 3], ["Journal B", 3]]),
+    )
+    assert_that(
+        aggregates.drugs_sharing_journals("EPINEPHRINE").values.tolist(),
+        equal_to([["ATROPINE", 2], ["BETAMETHASONE", 2]]),
+    )
+
+
+def test_update_aggregates_only_adds_new_mentions(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    incoming_path = tmp_path / "data" / "data_files" / "incoming"
+    shutil.copytree(SAMPLES_PATH, incoming_path)
+    (tmp_path / "data" / "datalake").mkdir()
+    cleaner_loader.ingest_files()
+    update_drug_mentions()
+    update_aggregates()
+    first_aggregates = load_aggregates()
+
+    # When
+    shutil.copy(SAMPLES_PATH / "pubmed.csv", incoming_path / "pubmed_0001.csv")
+    cleaner_loader.ingest_files(incremental=True)
+    new_mentions_count = update_drug_mentions()
+    aggregated_mentions_count = update_aggregates()
+
+    # Then
+    aggregates = load_aggregates()
+    assert_that(aggregated_mentions_count, equal_to(new_mentions_count))
+    assert_that(update_aggregates(), equal_to(0))
+    assert_that(
+        int(aggregates.journal_drug_counts["mentions"].sum()),
+        equal_to(int(first_aggregates.journal_drug_counts["mentions"].sum()) + 9),
+    )
+    # The same journals mention the same drugs again
+    assert_that(
+        aggregates.drug_cooccurrences.values.tolist(),
+        equal_to(first_aggregates.drug_cooccurrences.values.tolist()),
+    )
+    assert_that(
+        aggregates.date_mention_counts["mentions"].sum(),
+        equal_to(first_aggregates.date_mention_counts["mentions"].sum() + 9),
+    )
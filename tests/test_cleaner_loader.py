@@ -0,0 +1,663 @@
+import bz2
+import concurrent.futures
+import gzip
+import io
+import json
+import lzma
+import os
+import shutil
+import subprocess
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from hamcrest import assert_that, equal_to
+
+from cleaning_loading_app import cleaner_loader, file_loader, manifest
+from cleaning_loading_app.compression import COMPRESSIONS_BY_SUFFIX, OutputCompression
+from cleaning_loading_app.const import CsvEngine
+from cleaning_loading_app.deduplication import KEY_SIZE, KeyIndex
+from cleaning_loading_app.filesystem import preliminary_checks_and_cleaning
+from cleaning_loading_app.loading import FileIngestionResult, LoadingOptions
+from cleaning_loading_app.partitions import load_dataset
+from cleaning_loading_app.pipelines import find_pipeline
+
+SAMPLES_PATH = Path(__file__).parents[1] / "data" / "samples"
+
+
+def _run_ingestion_on_samples(
+    run_path: Path,
+    chunk_size: int | None = None,
+    workers: int | None = 1,
+    partitions: int = 1,
+    output_compression: OutputCompression | None = None,
+    deduplicate: bool = False,
+    incremental: bool = False,
+) -> None:
+    shutil.copytree(SAMPLES_PATH, run_path / "data" / "data_files" / "incoming")
+    (run_path / "data" / "datalake").mkdir()
+
+    cleaner_loader.ingest_files(
+        chunk_size=chunk_size,
+        workers=workers,
+        partitions=partitions,
+        output_compression=output_compression,
+        deduplicate=deduplicate,
+        incremental=incremental,
+    )
+
+
+def _read_datalake(run_path: Path) -> dict[str, bytes]:
+    datalake_path = run_path / "data" / "datalake"
+    return {
+        str(path.relative_to(datalake_path)): path.read_bytes()
+        for path in sorted(datalake_path.glob("*/*"))
+        if not path.name.startswith(".")
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3])
+def test_ingest_files_by_chunks_gives_same_output_as_whole_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, chunk_size: int
+) -> None:
+    # Given
+    whole_file_run_path = tmp_path / "whole"
+    chunked_run_path = tmp_path / "chunked"
+    whole_file_run_path.mkdir()
+    chunked_run_path.mkdir()
+
+    monkeypatch.chdir(whole_file_run_path)
+    _run_ingestion_on_samples(whole_file_run_path)
+
+    # When
+    monkeypatch.chdir(chunked_run_path)
+    _run_ingestion_on_samples(chunked_run_path, chunk_size)
+
+    # Then
+    expected = _read_datalake(whole_file_run_path)
+    assert_that(len(expected), equal_to(5))
+    assert_that(_read_datalake(chunked_run_path), equal_to(expected))
+
+
+def test_ingest_files_in_parallel_gives_same_output_as_sequentially(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    sequential_run_path = tmp_path / "sequential"
+    parallel_run_path = tmp_path / "parallel"
+    sequential_run_path.mkdir()
+    parallel_run_path.mkdir()
+
+    monkeypatch.chdir(sequential_run_path)
+    _run_ingestion_on_samples(sequential_run_path)
+
+    # When
+    monkeypatch.chdir(parallel_run_path)
+    _run_ingestion_on_samples(parallel_run_path, workers=4)
+
+    # Then
+    expected = _read_datalake(sequential_run_path)
+    assert_that(len(expected), equal_to(5))
+    assert_that(_read_datalake(parallel_run_path), equal_to(expected))
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(1, None), (3, None), (2, 1)])
+def test_ingest_files_by_row_partitions_gives_same_output_as_whole_files(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    workers: int,
+    chunk_size: int | None,
+) -> None:
+    # Given
+    whole_file_run_path = tmp_path / "whole"
+    partitioned_run_path = tmp_path / "partitioned"
+    whole_file_run_path.mkdir()
+    partitioned_run_path.mkdir()
+
+    monkeypatch.chdir(whole_file_run_path)
+    _run_ingestion_on_samples(whole_file_run_path)
+
+    # When
+    monkeypatch.chdir(partitioned_run_path)
+    _run_ingestion_on_samples(
+        partitioned_run_path, chunk_size, workers=workers, partitions=4
+    )
+
+    # Then
+    expected = _read_datalake(whole_file_run_path)
+    assert_that(len(expected), equal_to(5))
+    assert_that(_read_datalake(partitioned_run_path), equal_to(expected))
+    assert_that(
+        list((partitioned_run_path / "data" / "data_files" / "incoming").iterdir()),
+        equal_to([]),
+    )
+
+
+def test_ingest_files_by_row_partitions_defaults_to_a_worker_per_partition(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(os, "cpu_count", lambda: 3)
+    pool_sizes = []
+
+    class RecordingProcessPoolExecutor(ProcessPoolExecutor):
+        def __init__(self, max_workers: int | None = None) -> None:
+            pool_sizes.append(max_workers)
+            super().__init__(max_workers)
+
+    monkeypatch.setattr(
+        concurrent.futures, "ProcessPoolExecutor", RecordingProcessPoolExecutor
+    )
+
+    # When
+    _run_ingestion_on_samples(tmp_path, workers=None, partitions=4)
+
+    # Then
+    assert_that(pool_sizes, equal_to([3]))
+
+
+@pytest.mark.parametrize("chunk_size, workers", [(None, 1), (2, 1), (None, 2)])
+def test_ingest_files_decompresses_compressed_files(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    chunk_size: int | None,
+    workers: int,
+) -> None:
+    # Given
+    plain_run_path = tmp_path / "plain"
+    compressed_run_path = tmp_path / "compressed"
+    plain_run_path.mkdir()
+    compressed_run_path.mkdir()
+
+    monkeypatch.chdir(plain_run_path)
+    _run_ingestion_on_samples(plain_run_path)
+
+    monkeypatch.chdir(compressed_run_path)
+    incoming_path = compressed_run_path / "data" / "data_files" / "incoming"
+    incoming_path.mkdir(parents=True)
+    (compressed_run_path / "data" / "datalake").mkdir()
+    for sample_path in SAMPLES_PATH.iterdir():
+        with gzip.open(incoming_path / f"{sample_path.name}.gz", "wb") as gzip_file:
+            gzip_file.write(sample_path.read_bytes())
+
+    # When
+    cleaner_loader.ingest_files(chunk_size=chunk_size, workers=workers)
+
+    # Then
+    assert_that(
+        _read_datalake(compressed_run_path),
+        equal_to(_read_datalake(plain_run_path)),
+    )
+    assert_that(list(incoming_path.iterdir()), equal_to([]))
+
+
+def _compress(content: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+        return bytes(zstandard.ZstdCompressor().compress(content))
+    return bytes({"gzip": gzip, "bz2": bz2, "xz": lzma}[compression].compress(content))
+
+
+@pytest.mark.parametrize("csv_engine", ["c", "pyarrow"])
+@pytest.mark.parametrize("suffix, compression", COMPRESSIONS_BY_SUFFIX.items())
+def test_ingest_files_decompresses_every_compression_with_both_csv_engines(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    suffix: str,
+    compression: str,
+    csv_engine: CsvEngine,
+) -> None:
+    # Given
+    if csv_engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    plain_run_path = tmp_path / "plain"
+    compressed_run_path = tmp_path / "compressed"
+    plain_run_path.mkdir()
+    compressed_run_path.mkdir()
+
+    monkeypatch.chdir(plain_run_path)
+    _run_ingestion_on_samples(plain_run_path)
+
+    monkeypatch.chdir(compressed_run_path)
+    incoming_path = compressed_run_path / "data" / "data_files" / "incoming"
+    incoming_path.mkdir(parents=True)
+    (compressed_run_path / "data" / "datalake").mkdir()
+    for sample_path in SAMPLES_PATH.iterdir():
+        (incoming_path / f"{sample_path.name}{suffix}").write_bytes(
+            _compress(sample_path.read_bytes(), compression)
+        )
+
+    # When
+    cleaner_loader.ingest_files(csv_engine=csv_engine)
+
+    # Then
+    assert_that(
+        _read_datalake(compressed_run_path),
+        equal_to(_read_datalake(plain_run_path)),
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_ingest_files_compresses_csv_data_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, workers: int
+) -> None:
+    # Given
+    plain_run_path = tmp_path / "plain"
+    compressed_run_path = tmp_path / "compressed"
+    plain_run_path.mkdir()
+    compressed_run_path.mkdir()
+
+    monkeypatch.chdir(plain_run_path)
+    _run_ingestion_on_samples(plain_run_path)
+
+    # When
+    monkeypatch.chdir(compressed_run_path)
+    _run_ingestion_on_samples(
+        compressed_run_path, workers=workers, output_compression="gzip"
+    )
+
+    # Then
+    expected = _read_datalake(plain_run_path)
+    result = _read_datalake(compressed_run_path)
+    assert_that(sorted(result), equal_to(sorted(f"{name}.gz" for name in expected)))
+    assert_that(
+        {name[: -len(".gz")]: gzip.decompress(data) for name, data in result.items()},
+        equal_to(expected),
+    )
+
+
+def test_ingest_files_loads_sharded_files_and_leaves_unknown_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    incoming_path = tmp_path / "data" / "data_files" / "incoming"
+    incoming_path.mkdir(parents=True)
+    (tmp_path / "data" / "datalake").mkdir()
+
+    shutil.copy(SAMPLES_PATH / "drugs.csv", incoming_path / "drugs_0002.csv")
+    shutil.copy(SAMPLES_PATH / "drugs.csv", incoming_path / "drugs_0001.csv")
+    (incoming_path / "notes.txt").write_text("not a data file")
+
+    # When
+    cleaner_loader.ingest_files()
+
+    # Then
+    drugs_lines = SAMPLES_PATH.joinpath("drugs.csv").read_text().splitlines()
+    ingested_lines = (
+        (tmp_path / "data" / "datalake" / "ingested" / "drugs.csv")
+        .read_text()
+        .splitlines()
+    )
+    assert_that(len(ingested_lines), equal_to(2 * len(drugs_lines) - 1))
+    assert_that(
+        sorted(path.name for path in incoming_path.iterdir()),
+        equal_to(["notes.txt"]),
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1])
+def test_ingest_files_rejects_invalid_dates_with_their_value(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, chunk_size: int | None
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    incoming_path = tmp_path / "data" / "data_files" / "incoming"
+    incoming_path.mkdir(parents=True)
+    (tmp_path / "data" / "datalake").mkdir()
+
+    (incoming_path / "pubmed.csv").write_text(
+        "id,title,date,journal\n"
+        "1,A title,01/01/2019,J1\n"
+        "2,B title,32/13/2019,J2\n"
+        "3,C title,,J3\n"
+    )
+    (incoming_path / "pubmed.json").write_text(
+        '[{"id": 4, "title": "D title", "date": "2019-13-45", "journal": "J4"},'
+        ' {"id": 5, "title": "", "date": "02/01/2019", "journal": "J5"}]'
+    )
+
+    # When
+    cleaner_loader.ingest_files(chunk_size=chunk_size)
+
+    # Then
+    datalake_path = tmp_path / "data" / "datalake"
+    assert_that(
+        (datalake_path / "ingested" / "pubmed.csv").read_text().splitlines(),
+        equal_to(['"id","title","date","journal"', '1,"A title","2019-01-01","J1"']),
+    )
+    assert_that(
+        (datalake_path / "rejected" / "pubmed.csv").read_text().splitlines(),
+        equal_to(
+            [
+                '"id","title","date","journal","rejection_reason"',
+                '2,"B title","32/13/2019","J2","invalid_date"',
+                '3,"C title","","J3","nan_field"',
+                '4,"D title","2019-13-45","J4","invalid_date"',
+                '5,"","2019-01-02","J5","empty_or_spaces_only_string_field"',
+            ]
+        ),
+    )
+
+
+def test_ingest_files_incrementally_only_ingests_new_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    # Files ingested by a full run are not hashed
+    _run_ingestion_on_samples(tmp_path, incremental=True)
+    first_run_datalake = _read_datalake(tmp_path)
+
+    incoming_path = tmp_path / "data" / "data_files" / "incoming"
+    shutil.copy(SAMPLES_PATH / "drugs.csv", incoming_path / "drugs.csv")
+    shutil.copy(SAMPLES_PATH / "pubmed.csv", incoming_path / "pubmed_0001.csv")
+
+    # When
+    cleaner_loader.ingest_files(incremental=True)
+
+    # Then
+    result = _read_datalake(tmp_path)
+    assert_that(
+        result["ingested/drugs.csv"], equal_to(first_run_datalake["ingested/drugs.csv"])
+    )
+
+    # The 8 rows of the pubmed.csv sample are all clean
+    assert_that(
+        len(result["ingested/pubmed.csv"].splitlines()),
+        equal_to(len(first_run_datalake["ingested/pubmed.csv"].splitlines()) + 8),
+    )
+    assert_that(list(incoming_path.iterdir()), equal_to([]))
+
+
+def test_ingest_files_only_hashes_files_in_incremental_runs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    hashed_file_names = []
+    hash_file = manifest._hash_file
+
+    def record_hashed_file(file_path: Path) -> str:
+        hashed_file_names.append(file_path.name)
+        return hash_file(file_path)
+
+    monkeypatch.setattr(manifest, "_hash_file", record_hashed_file)
+    _run_ingestion_on_samples(tmp_path)
+    full_run_hashed_file_names = list(hashed_file_names)
+
+    incoming_path = tmp_path / "data" / "data_files" / "incoming"
+    processed_path = tmp_path / "data" / "data_files" / "processed"
+    # Landing again as it was, and as a new copy
+    shutil.move(processed_path / "drugs.csv", incoming_path / "drugs.csv")
+    shutil.copy(processed_path / "pubmed.csv", incoming_path / "pubmed.csv")
+
+    # When
+    cleaner_loader.ingest_files(incremental=True)
+
+    # Then
+    assert_that(full_run_hashed_file_names, equal_to([]))
+    assert_that(hashed_file_names, equal_to(["pubmed.csv"]))
+    entries = {
+        entry["file_name"]: entry
+        for entry in map(
+            json.loads,
+            (tmp_path / "data" / "datalake" / "manifest.jsonl")
+            .read_text()
+            .splitlines(),
+        )
+    }
+    assert_that(entries["drugs.csv"]["sha256"], equal_to(None))
+    assert_that(entries["pubmed.csv"]["sha256"] is not None, equal_to(True))
+
+
+@pytest.mark.parametrize("workers, partitions", [(1, 1), (2, 1), (2, 3)])
+def test_ingest_files_rejects_keys_already_ingested(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, workers: int, partitions: int
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    _run_ingestion_on_samples(tmp_path, deduplicate=True)
+    first_run_datalake = _read_datalake(tmp_path)
+
+    incoming_path = tmp_path / "data" / "data_files" / "incoming"
+    shutil.copy(SAMPLES_PATH / "pubmed.csv", incoming_path / "pubmed_0001.csv")
+    shutil.copy(SAMPLES_PATH / "pubmed.csv", incoming_path / "pubmed_0002.csv")
+
+    # When
+    cleaner_loader.ingest_files(
+        workers=workers, partitions=partitions, incremental=True, deduplicate=True
+    )
+
+    # Then
+    result = _read_datalake(tmp_path)
+    assert_that(
+        result["ingested/pubmed.csv"],
+        equal_to(first_run_datalake["ingested/pubmed.csv"]),
+    )
+    # The 8 rows of both copies of the pubmed.csv sample are rejected
+    new_rejected_lines = result["rejected/pubmed.csv"][
+        len(first_run_datalake["rejected/pubmed.csv"]) :
+    ].splitlines()
+    assert_that(len(new_rejected_lines), equal_to(16))
+    assert_that(
+        all(line.endswith(b',"duplicate_key"') for line in new_rejected_lines),
+        equal_to(True),
+    )
+
+
+def test_ingest_incoming_file_only_reads_keys_committed_since_previous_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cleaner_loader, "_loaded_key_indexes", {})
+    incoming_path = tmp_path / "data" / "data_files" / "incoming"
+    incoming_path.mkdir(parents=True)
+    (tmp_path / "data" / "datalake").mkdir()
+    preliminary_checks_and_cleaning(incremental=True)
+    for file_name, ids in (("pubmed_1.csv", [1, 2]), ("pubmed_2.csv", [2, 3, 4])):
+        (incoming_path / file_name).write_text(
+            "id,title,date,journal\n"
+            + "".join(f"{id},Title {id},01/01/2019,J{id}\n" for id in ids)
+        )
+    pipeline = find_pipeline("pubmed.csv")
+    assert pipeline is not None
+    loading_options = LoadingOptions(deduplicate=True)
+    index_file_path = Path("data/datalake/keys/pubmed.keys")
+
+    def ingest(file_name: str, file_index: int) -> FileIngestionResult | None:
+        _, result = cleaner_loader.ingest_incoming_file(
+            incoming_path / file_name,
+            pipeline,
+            None,
+            loading_options,
+            "csv",
+            None,
+            "run",
+            file_index,
+        )
+        return result
+
+    # When
+    first_result = ingest("pubmed_1.csv", 0)
+    # Keys committed by another process, e.g. another worker of the watcher
+    other_key_index = KeyIndex(("id",), index_file_path)
+    other_key_index.drop_duplicated_rows(pd.DataFrame({"id": [3]}))
+    other_key_index.commit()
+    second_result = ingest("pubmed_2.csv", 1)
+
+    # Then
+    assert first_result is not None and second_result is not None
+    assert_that(first_result.ingested_rows, equal_to(2))
+    assert_that(
+        (second_result.ingested_rows, second_result.rejected_rows), equal_to((1, 2))
+    )
+    # Read up to the key committed by the other process, before the second file
+    key_index = cleaner_loader._loaded_key_indexes[index_file_path.absolute()]
+    assert_that(key_index.loaded_size, equal_to(3 * KEY_SIZE))
+
+
+@pytest.mark.parametrize("csv_engine", ["c", "pyarrow"])
+@pytest.mark.parametrize(
+    "file_name, categorical_column",
+    [
+        ("clinical_trials.csv", "journal"),
+        ("pubmed.csv", "journal"),
+        ("drugs.csv", "atccode"),
+    ],
+)
+def test_load_data_file_reads_declared_categorical_columns(
+    file_name: str, categorical_column: str, csv_engine: CsvEngine
+) -> None:
+    # Given
+    if csv_engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    pipeline = find_pipeline(file_name)
+    assert pipeline is not None
+    sample_file_path = SAMPLES_PATH / file_name
+
+    # When
+    (df,) = file_loader.load_data_file(
+        sample_file_path, pipeline, LoadingOptions(csv_engine=csv_engine)
+    )
+
+    # Then
+    assert_that(str(df[categorical_column].dtype), equal_to("category"))
+    assert_that(
+        df[categorical_column].tolist(),
+        equal_to(pd.read_csv(sample_file_path, dtype=str)[categorical_column].tolist()),
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_ingest_files_saves_stage_metrics_of_every_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, workers: int
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    shutil.copytree(SAMPLES_PATH, tmp_path / "data" / "data_files" / "incoming")
+    (tmp_path / "data" / "datalake").mkdir()
+    metrics_file_path = tmp_path / "metrics.jsonl"
+
+    # When
+    cleaner_loader.ingest_files(workers=workers, metrics_file=metrics_file_path)
+
+    # Then
+    lines = [json.loads(line) for line in metrics_file_path.read_text().splitlines()]
+    stages = {(line["file_name"], line["stage"]): line for line in lines}
+    assert_that(
+        sorted(stage for file_name, stage in stages if file_name == "pubmed.json"),
+        equal_to(
+            [
+                "commit",
+                "convert_string_to_date:date",
+                "encode_low_cardinality_columns",
+                "ensure_column_is_int:id",
+                "load",
+                "move",
+                "rule:empty_or_spaces_only_string_field",
+                "rule:invalid_date",
+                "rule:invalid_int",
+                "rule:nan_field",
+                "save",
+                "split_clean_and_rejected_rows",
+            ]
+        ),
+    )
+    # Csv files are read with a schema, which declares their categorical columns
+    assert_that(
+        (("pubmed.csv", "encode_low_cardinality_columns") in stages),
+        equal_to(False),
+    )
+    manifest = [
+        json.loads(line)
+        for line in (tmp_path / "data" / "datalake" / "manifest.jsonl")
+        .read_text()
+        .splitlines()
+    ]
+    for entry in manifest:
+        save_metrics = stages[(entry["file_name"], "save")]
+        assert_that(
+            (save_metrics["rows_out"], save_metrics["rows_rejected"]),
+            equal_to((entry["ingested_rows"], entry["rejected_rows"])),
+        )
+
+
+def test_ingest_files_without_file_to_ingest_does_not_import_pandas(
+    tmp_path: Path,
+) -> None:
+    # Given
+    (tmp_path / "data" / "data_files" / "incoming").mkdir(parents=True)
+    (tmp_path / "data" / "datalake").mkdir()
+    script = (
+        "import sys\n"
+        "from cleaning_loading_app import cleaner_loader\n"
+        "cleaner_loader.ingest_files(incremental=True)\n"
+        "print('pandas' in sys.modules)\n"
+    )
+
+    # When
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=tmp_path,
+        env={"PYTHONPATH": str(Path(__file__).parents[1] / "src")},
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    # Then
+    assert_that(completed.stdout.strip(), equal_to("False"))
+
+
+def test_ingest_files_partitioned_by_date_keeps_the_same_rows(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    flat_run_path = tmp_path / "flat"
+    partitioned_run_path = tmp_path / "partitioned"
+    flat_run_path.mkdir()
+    partitioned_run_path.mkdir()
+    monkeypatch.chdir(flat_run_path)
+    _run_ingestion_on_samples(flat_run_path)
+
+    # When
+    monkeypatch.chdir(partitioned_run_path)
+    shutil.copytree(
+        SAMPLES_PATH, partitioned_run_path / "data" / "data_files" / "incoming"
+    )
+    (partitioned_run_path / "data" / "datalake").mkdir()
+    cleaner_loader.ingest_files(partition_by_date=True)
+
+    # Then
+    ingested_path = partitioned_run_path / "data" / "datalake" / "ingested"
+    assert_that(
+        sorted(path.name for path in (ingested_path / "pubmed").glob("[!.]*")),
+        equal_to(["date=2019-01", "date=2020-01", "date=2020-02", "date=2020-03"]),
+    )
+    flat_datalake = _read_datalake(flat_run_path)
+    for pipeline in ("clinical_trials", "pubmed"):
+        expected = pd.read_csv(
+            io.BytesIO(flat_datalake[f"ingested/{pipeline}.csv"]), dtype=str
+        )
+        expected["date"] = pd.to_datetime(expected["date"])
+        result = load_dataset(ingested_path / pipeline, dtypes=defaultdict(lambda: str))
+        assert_that(
+            sorted(result.itertuples(index=False)),
+            equal_to(sorted(expected.itertuples(index=False))),
+        )
+        assert_that(
+            len(load_dataset(ingested_path / pipeline, start=date(2020, 1, 1))),
+            equal_to((expected["date"] >= pd.Timestamp(2020, 1, 1)).sum()),
+        )
+    rejected_path = partitioned_run_path / "data" / "datalake" / "rejected"
+    assert_that(
+        (rejected_path / "pubmed.csv").read_bytes(),
+        equal_to(flat_datalake["rejected/pubmed.csv"]),
+    )
@@ -0,0 +1,62 @@
+import gzip
+from pathlib import Path
+
+import pytest
+from hamcrest import assert_that, equal_to
+
+from cleaning_loading_app.compression import (
+    compressed_writer,
+    open_text,
+    split_compression_suffix,
+)
+
+
+@pytest.mark.parametrize(
+    "file_name, expected",
+    [
+        ("pubmed.csv.gz", ("pubmed.csv", "gzip")),
+        ("pubmed.json.zst", ("pubmed.json", "zstd")),
+        ("drugs.csv.xz", ("drugs.csv", "xz")),
+        ("drugs.csv", ("drugs.csv", None)),
+    ],
+)
+def test_split_compression_suffix(file_name: str, expected: tuple) -> None:
+    # When
+    result = split_compression_suffix(file_name)
+
+    # Then
+    assert_that(result, equal_to(expected))
+
+
+def test_open_text_reads_appended_gzip_members(tmp_path: Path) -> None:
+    # Given
+    file_path = tmp_path / "drugs.csv.gz"
+    with file_path.open("ab") as binary_file:
+        for content in (b'"atccode","drug"\n', b'"A04AD","DIPHENHYDRAMINE"\n'):
+            with compressed_writer(binary_file, "gzip") as writer:
+                writer.write(content)
+
+    # When
+    with open_text(file_path) as text_file:
+        result = text_file.read()
+
+    # Then
+    assert_that(result, equal_to('"atccode","drug"\n"A04AD","DIPHENHYDRAMINE"\n'))
+    assert_that(gzip.decompress(file_path.read_bytes()).decode(), equal_to(result))
+
+
+def test_open_text_reads_appended_zstd_frames(tmp_path: Path) -> None:
+    # Given
+    pytest.importorskip("zstandard")
+    file_path = tmp_path / "drugs.csv.zst"
+    with file_path.open("ab") as binary_file:
+        for content in (b'"atccode","drug"\n', b'"A04AD","DIPHENHYDRAMINE"\n'):
+            with compressed_writer(binary_file, "zstd") as writer:
+                writer.write(content)
+
+    # When
+    with open_text(file_path) as text_file:
+        result = text_file.read()
+
+    # Then
+    assert_that(result, equal_to('"atccode","drug"\n"A04AD","DIPHENHYDRAMINE"\n'))
@@ -1,14 +1,24 @@
 from io import StringIO
 from pathlib import Path
+from typing import Any, Dict, Hashable
 
 import pandas as pd
+import pytest
 from hamcrest import assert_that, equal_to
+from numpy import nan
 from pandas import testing
 
 from cleaning_loading_app.csv_io import (
+    iter_cvs_byte_range_chunks,
+    iter_cvs_chunks_with_date_parsing,
+    iter_json_chunks_without_date_parsing,
+    iter_json_records,
+    load_cvs_byte_range,
     load_cvs_with_date_parsing,
     load_json_without_date_parsing,
+    read_csv_header,
     save_cvs_in_proper_format,
+    split_csv_into_byte_ranges,
 )
 
 
@@ -40,6 +50,74 @@ def test_load_cvs_with_date_parsing_parses_dates_in_mixed_format() -> None:
     testing.assert_frame_equal(result, expected)
 
 
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+def test_load_cvs_with_date_parsing_with_schema(tmp_path: Path, engine: str) -> None:
+    # Given
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    csv_file_path = tmp_path / "pubmed.csv"
+    csv_file_path.write_text(
+        "id,title,date\n"
+        '1,"title1",01/01/2020\n'
+        '"",title2,2020-01-02\n'
+        "3,,1 january 2020\n"
+        "\t"
+    )
+
+    # When
+    result = load_cvs_with_date_parsing(
+        csv_file_path,
+        ["date"],
+        {"id": str, "title": str},
+        ["%d/%m/%Y", "%Y-%m-%d"],
+        engine,  # type: ignore[arg-type]
+    )
+
+    # Then
+    expected = pd.DataFrame(
+        [
+            ["1", "title1", "2020-01-01"],
+            [nan, "title2", "2020-01-02"],
+            ["3", nan, "2020-01-01"],
+        ],
+        columns=["id", "title", "date"],
+    )
+    expected["date"] = pd.to_datetime(expected["date"])
+
+    testing.assert_frame_equal(result.fillna(nan), expected)
+
+
+def test_iter_cvs_chunks_with_date_parsing_keeps_whole_file_dtypes() -> None:
+    # Given
+    csv_content_stream = StringIO(
+        "id,code,date\n"
+        "1,123,01/01/2020\n"
+        "2,456,2020-01-02\n"
+        ",A04AD,03/01/2020\n"
+        "4,789,1 january 2021\n"
+    )
+
+    # When
+    result = list(iter_cvs_chunks_with_date_parsing(csv_content_stream, 2, ["date"]))
+
+    # Then
+    assert_that(len(result), equal_to(2))
+    assert_that(len(result[1]), equal_to(2))
+
+    expected = pd.DataFrame(
+        [
+            [1.0, "123", "2020-01-01"],
+            [2.0, "456", "2020-01-02"],
+            [nan, "A04AD", "2020-01-03"],
+            [4.0, "789", "2021-01-01"],
+        ],
+        columns=["id", "code", "date"],
+    )
+    expected["date"] = pd.to_datetime(expected["date"])
+
+    testing.assert_frame_equal(pd.concat(result), expected)
+
+
 def test_load_json_without_date_parsing() -> None:
     # Given
     json_content = """[
@@ -69,6 +147,140 @@ def test_load_json_without_date_parsing() -> None:
     testing.assert_frame_equal(result, expected)
 
 
+@pytest.mark.parametrize("parts", [1, 2, 3, 10])
+def test_split_csv_into_byte_ranges_starts_ranges_at_rows(
+    tmp_path: Path, parts: int
+) -> None:
+    # Given
+    csv_file_path = tmp_path / "pubmed.csv"
+    csv_file_path.write_text(
+        "id,title,date\n"
+        '1,"title\non two lines",01/01/2020\n'
+        '2,"title ""quoted""",02/01/2020\n'
+        "3,title3,2020-01-03\n"
+        '4,"a, b\n\nc",04/01/2020\n'
+    )
+
+    # When
+    byte_ranges = split_csv_into_byte_ranges(csv_file_path, parts)
+
+    # Then
+    assert_that(len(byte_ranges) <= parts, equal_to(True))
+    dtypes: Dict[Hashable, Any] = {"id": str, "title": str}
+    result = pd.concat(
+        [
+            load_cvs_byte_range(
+                csv_file_path,
+                byte_range,
+                read_csv_header(csv_file_path),
+                ["date"],
+                dtypes,
+                ["%d/%m/%Y", "%Y-%m-%d"],
+            )
+            for byte_range in byte_ranges
+        ],
+        ignore_index=True,
+    )
+    expected = load_cvs_with_date_parsing(
+        csv_file_path, ["date"], dtypes, ["%d/%m/%Y", "%Y-%m-%d"], memory_map=True
+    )
+    testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("with_dtypes", [True, False])
+def test_iter_cvs_byte_range_chunks_streams_the_rows_of_the_range(
+    tmp_path: Path, with_dtypes: bool
+) -> None:
+    # Given
+    csv_file_path = tmp_path / "pubmed.csv"
+    csv_file_path.write_text(
+        "id,title,date\n"
+        '1,"title\non two lines",01/01/2020\n'
+        "2,title2,02/01/2020\n"
+        "3,title3,2020-01-03\n"
+        "4,title4,\n"
+        "5,title5,05/01/2020\n"
+    )
+    byte_ranges = split_csv_into_byte_ranges(csv_file_path, 2)
+    columns = read_csv_header(csv_file_path)
+    dtypes: Dict[Hashable, Any] | None = (
+        {"id": str, "title": str} if with_dtypes else None
+    )
+
+    # When
+    chunks = [
+        list(
+            iter_cvs_byte_range_chunks(
+                csv_file_path, byte_range, columns, 1, ["date"], dtypes, ["%d/%m/%Y"]
+            )
+        )
+        for byte_range in byte_ranges
+    ]
+
+    # Then
+    assert_that(len(byte_ranges), equal_to(2))
+    assert_that(
+        [len(chunk) for range_chunks in chunks for chunk in range_chunks],
+        equal_to([1, 1, 1, 1, 1]),
+    )
+    for byte_range, range_chunks in zip(byte_ranges, chunks, strict=True):
+        testing.assert_frame_equal(
+            pd.concat(range_chunks),
+            load_cvs_byte_range(
+                csv_file_path, byte_range, columns, ["date"], dtypes, ["%d/%m/%Y"]
+            ),
+        )
+
+
+@pytest.mark.parametrize(
+    "json_content",
+    [
+        '[\n  {"id": 9, "title": "a, [b]"},\n  {"id": 10, "title": "c"}\n]\n',
+        '{"id": 9, "title": "a, [b]"}\n\n{"id": 10, "title": "c"}\n',
+    ],
+)
+def test_iter_json_records_reads_arrays_and_ndjson_across_blocks(
+    json_content: str,
+) -> None:
+    # When
+    result = list(iter_json_records(StringIO(json_content), block_size=4))
+
+    # Then
+    assert_that(
+        result, equal_to([{"id": 9, "title": "a, [b]"}, {"id": 10, "title": "c"}])
+    )
+
+
+def test_iter_json_records_fails_on_unterminated_array() -> None:
+    # Given
+    json_content_stream = StringIO('[{"id": 9}, {"id": 10}')
+
+    # When / Then
+    with pytest.raises(ValueError):
+        list(iter_json_records(json_content_stream, block_size=4))
+
+
+def test_iter_json_chunks_without_date_parsing_matches_whole_file_load(
+    tmp_path: Path,
+) -> None:
+    # Given
+    json_file_path = tmp_path / "pubmed.json"
+    json_file_path.write_text(
+        '[{"id": 9, "date": "01/01/2020"}, {"id": 10, "date": "01/12/2020"},'
+        ' {"id": 11, "date": "02/12/2020"}]',
+        encoding="utf-8",
+    )
+
+    # When
+    chunks = list(iter_json_chunks_without_date_parsing(json_file_path, 2))
+
+    # Then
+    assert_that([len(chunk) for chunk in chunks], equal_to([2, 1]))
+    testing.assert_frame_equal(
+        pd.concat(chunks), load_json_without_date_parsing(json_file_path)
+    )
+
+
 def test_save_cvs_in_proper_format_passes(tmp_path: Path) -> None:
     # Given
     df = pd.DataFrame(
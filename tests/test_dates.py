@@ -0,0 +1,48 @@
+import pandas as pd
+from numpy import nan
+from pandas import testing
+
+from cleaning_loading_app.dates import parse_dates
+
+
+def test_parse_dates_tries_known_formats_then_mixed_format() -> None:
+    # Given
+    values = pd.Series(
+        ["1 January 2020", "02/01/2020", "2020-01-03", "4 Jan 2020", nan, "no date"],
+        name="date",
+    )
+
+    # When
+    result = parse_dates(values, ["%d %B %Y", "%d/%m/%Y", "%Y-%m-%d"])
+
+    # Then
+    expected = pd.Series(
+        pd.to_datetime(
+            ["2020-01-01", "2020-01-02", "2020-01-03", "2020-01-04", "NaT", "NaT"]
+        ),
+        name="date",
+    )
+    testing.assert_series_equal(result, expected)
+
+
+def test_parse_dates_keeps_already_parsed_dates() -> None:
+    # Given
+    values = pd.Series(pd.to_datetime(["2020-01-01", "NaT"]), name="date")
+
+    # When
+    result = parse_dates(values, ["%d/%m/%Y"])
+
+    # Then
+    testing.assert_series_equal(result, values)
+
+
+def test_parse_dates_of_missing_values_only() -> None:
+    # Given
+    values = pd.Series([nan, nan], name="date", dtype=object)
+
+    # When
+    result = parse_dates(values, ["%d/%m/%Y"])
+
+    # Then
+    expected = pd.Series(pd.to_datetime(["NaT", "NaT"]), name="date")
+    testing.assert_series_equal(result, expected)
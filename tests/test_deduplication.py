@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import pandas as pd
+from hamcrest import assert_that, equal_to
+
+from cleaning_loading_app.deduplication import KeyIndex, hash_keys
+from cleaning_loading_app.transformations import REJECTION_REASON_COLUMN
+
+
+def test_key_index_keeps_the_first_row_of_a_key_across_commits(
+    tmp_path: Path,
+) -> None:
+    # Given
+    index_file_path = tmp_path / "pubmed.keys"
+    key_index = KeyIndex(("id",), index_file_path)
+    key_index.drop_duplicated_rows(pd.DataFrame({"id": [1, 2], "title": ["a", "b"]}))
+    key_index.commit()
+    df = pd.DataFrame({"id": [3, 2, 3, 4], "title": ["c", "b", "d", "e"]})
+
+    # When
+    kept_rows, duplicated_rows = KeyIndex(
+        ("id",), index_file_path
+    ).drop_duplicated_rows(df)
+
+    # Then
+    assert_that(kept_rows["title"].tolist(), equal_to(["c", "e"]))
+    assert_that(duplicated_rows["title"].tolist(), equal_to(["b", "d"]))
+    assert_that(
+        duplicated_rows[REJECTION_REASON_COLUMN].unique().tolist(),
+        equal_to(["duplicate_key"]),
+    )
+
+
+def test_key_index_of_a_unit_reads_keys_of_previous_units(tmp_path: Path) -> None:
+    # Given
+    index_file_path = tmp_path / "pubmed.keys"
+    first_unit = KeyIndex(
+        ("id",), index_file_path, part_file_path=tmp_path / "pubmed.keys.part-0"
+    )
+    first_unit.drop_duplicated_rows(pd.DataFrame({"id": [1, 2]}))
+    first_unit.commit()
+    second_unit = KeyIndex(
+        ("id",),
+        index_file_path,
+        part_file_path=tmp_path / "pubmed.keys.part-1",
+        previous_part_file_paths=(tmp_path / "pubmed.keys.part-0",),
+    )
+
+    # When
+    kept_rows, duplicated_rows = second_unit.drop_duplicated_rows(
+        pd.DataFrame({"id": [2, 3]})
+    )
+    second_unit.commit()
+
+    # Then
+    assert_that(kept_rows["id"].tolist(), equal_to([3]))
+    assert_that(duplicated_rows["id"].tolist(), equal_to([2]))
+    assert_that(index_file_path.exists(), equal_to(False))
+    assert_that(
+        sorted(path.name for path in tmp_path.glob("[!.]*")),
+        equal_to(["pubmed.keys.part-0", "pubmed.keys.part-1"]),
+    )
+
+
+def test_key_index_kept_in_memory_reads_keys_appended_since(tmp_path: Path) -> None:
+    # Given
+    index_file_path = tmp_path / "pubmed.keys"
+    key_index = KeyIndex(("id",), index_file_path)
+    key_index.drop_duplicated_rows(pd.DataFrame({"id": [1]}))
+    key_index.commit()
+    other_key_index = KeyIndex(("id",), index_file_path)
+    other_key_index.drop_duplicated_rows(pd.DataFrame({"id": [2]}))
+    other_key_index.commit()
+
+    # When
+    key_index.read_appended_keys()
+    kept_rows, duplicated_rows = key_index.drop_duplicated_rows(
+        pd.DataFrame({"id": [1, 2, 3]})
+    )
+
+    # Then
+    assert_that(kept_rows["id"].tolist(), equal_to([3]))
+    assert_that(duplicated_rows["id"].tolist(), equal_to([1, 2]))
+    assert_that(key_index.loaded_size, equal_to(index_file_path.stat().st_size))
+
+
+def test_hash_keys_gives_the_same_hash_to_the_same_keys() -> None:
+    # Given
+    df = pd.DataFrame({"id": ["NCT01", "NCT02", "NCT01"], "title": ["a", "b", "c"]})
+
+    # When
+    result = hash_keys(df, ("id",))
+
+    # Then
+    assert_that(result[0], equal_to(result[2]))
+    assert_that(result[0] != result[1], equal_to(True))
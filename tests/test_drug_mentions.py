@@ -0,0 +1,152 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from hamcrest import assert_that, equal_to
+
+from cleaning_loading_app import cleaner_loader, drug_mentions
+from cleaning_loading_app.compression import OutputCompression
+from cleaning_loading_app.const import INGESTED_DATA_PATH
+from cleaning_loading_app.drug_mentions import (
+    DrugMatcher,
+    load_drug_mentions,
+    update_drug_mentions,
+)
+
+SAMPLES_PATH = Path(__file__).parents[1] / "data" / "samples"
+
+
+def test_drug_matcher_finds_whole_drug_names_once_per_title() -> None:
+    # Given
+    matcher = DrugMatcher.from_drugs(
+        pd.DataFrame(
+            {
+                "atccode": ["A04AD", "N02BA", "S03AA"],
+                "drug": ["DIPHENHYDRAMINE", "ACETYLSALICYLIC ACID", "TETRACYCLINE"],
+            }
+        )
+    )
+    titles = pd.Series(
+        [
+            "Diphenhydramine and diphenhydramine, again",
+            "Acetylsalicylic acid vs tetracycline",
+            "Acetylsalicylic, then acid",
+            "Tetracyclines",
+            None,
+        ],
+        index=[10, 11, 12, 13, 14],
+    )
+
+    # When
+    result = matcher.match(titles)
+
+    # Then
+    assert_that(
+        sorted(map(tuple, result[["title", "drug"]].to_numpy().tolist())),
+        equal_to([(0, 0), (1, 1), (1, 2)]),
+    )
+
+
+def test_update_drug_mentions_only_scans_new_titles(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    incoming_path = tmp_path / "data" / "data_files" / "incoming"
+    shutil.copytree(SAMPLES_PATH, incoming_path)
+    (tmp_path / "data" / "datalake").mkdir()
+    cleaner_loader.ingest_files()
+    first_mentions_count = update_drug_mentions()
+
+    # When
+    shutil.copy(SAMPLES_PATH / "pubmed.csv", incoming_path / "pubmed_0001.csv")
+    cleaner_loader.ingest_files(incremental=True)
+    new_mentions_count = update_drug_mentions()
+
+    # Then
+    mentions = load_drug_mentions()
+    assert_that(len(mentions), equal_to(first_mentions_count + new_mentions_count))
+    # The titles of pubmed.csv mention 9 drugs, which are now mentioned twice
+    assert_that(new_mentions_count, equal_to(9))
+    pubmed_mentions = mentions[mentions["pipeline"] == "pubmed"]
+    pubmed_csv_mentions = pubmed_mentions[pubmed_mentions["id"].astype(int).le(8)]
+    assert_that(len(pubmed_csv_mentions), equal_to(18))
+    assert_that(
+        pubmed_csv_mentions.drop_duplicates()[["drug", "id"]].values.tolist()[:3],
+        equal_to(
+            [
+                ["DIPHENHYDRAMINE", "1"],
+                ["DIPHENHYDRAMINE", "2"],
+                ["DIPHENHYDRAMINE", "3"],
+            ]
+        ),
+    )
+    assert_that(update_drug_mentions(), equal_to(0))
+
+
+@pytest.mark.parametrize(
+    "output_format, partition_by_date, output_compression",
+    [
+        ("parquet", False, None),
+        ("csv", True, None),
+        ("csv", False, "gzip"),
+        ("csv", False, "zstd"),
+    ],
+)
+def test_update_drug_mentions_only_reads_data_ingested_since(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    output_format: str,
+    partition_by_date: bool,
+    output_compression: OutputCompression | None,
+) -> None:
+    # Given
+    if output_format == "parquet":
+        pytest.importorskip("pyarrow")
+    if output_compression == "zstd":
+        pytest.importorskip("zstandard")
+    monkeypatch.chdir(tmp_path)
+    incoming_path = tmp_path / "data" / "data_files" / "incoming"
+    shutil.copytree(SAMPLES_PATH, incoming_path)
+    (tmp_path / "data" / "datalake").mkdir()
+    output_options = {
+        "output_format": output_format,
+        "partition_by_date": partition_by_date,
+        "output_compression": output_compression,
+    }
+    cleaner_loader.ingest_files(**output_options)  # type: ignore[arg-type]
+    first_mentions_count = update_drug_mentions()
+
+    read_article_rows = []
+    read_ingested_rows = drug_mentions._read_ingested_rows
+
+    def spy_read_ingested_rows(
+        data_file_path: Path, indexed_size: int = 0
+    ) -> tuple[pd.DataFrame, int]:
+        rows, data_size = read_ingested_rows(data_file_path, indexed_size)
+        # Drugs are read again by every update, to match their names
+        if (
+            not data_file_path.relative_to(INGESTED_DATA_PATH)
+            .parts[0]
+            .startswith("drugs")
+        ):
+            read_article_rows.append(len(rows))
+        return rows, data_size
+
+    monkeypatch.setattr(drug_mentions, "_read_ingested_rows", spy_read_ingested_rows)
+
+    # When
+    shutil.copy(SAMPLES_PATH / "pubmed.csv", incoming_path / "pubmed_0001.csv")
+    cleaner_loader.ingest_files(
+        incremental=True, **output_options  # type: ignore[arg-type]
+    )
+    new_mentions_count = update_drug_mentions()
+
+    # Then
+    # Only the 8 rows of pubmed_0001.csv are read, whose titles mention 9 drugs
+    assert_that(sum(read_article_rows), equal_to(8))
+    assert_that(new_mentions_count, equal_to(9))
+    assert_that(
+        len(load_drug_mentions()), equal_to(first_mentions_count + new_mentions_count)
+    )
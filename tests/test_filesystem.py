@@ -0,0 +1,144 @@
+import gzip
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from hamcrest import assert_that, equal_to
+
+from cleaning_loading_app.const import INCOMING_FILES_PATH, INGESTED_DATA_PATH
+from cleaning_loading_app.filesystem import (
+    commit_part_file,
+    preliminary_checks_and_cleaning,
+)
+from cleaning_loading_app.writers import CsvDataWriter
+
+
+def test_commit_part_file_creates_target_then_appends_without_header(
+    tmp_path: Path,
+) -> None:
+    # Given
+    target_file_path = tmp_path / "drugs.csv"
+    first_part_file_path = tmp_path / "drugs.csv.part-0"
+    second_part_file_path = tmp_path / "drugs.csv.part-1"
+    first_part_file_path.write_text('"atccode","drug"\n"A04AD","DIPHENHYDRAMINE"\n')
+    second_part_file_path.write_text('"atccode","drug"\n"S03AA","TETRACYCLINE"\n')
+
+    # When
+    commit_part_file(first_part_file_path, target_file_path)
+    commit_part_file(second_part_file_path, target_file_path)
+    commit_part_file(tmp_path / "drugs.csv.part-2", target_file_path)
+
+    # Then
+    assert_that(
+        target_file_path.read_text(),
+        equal_to(
+            '"atccode","drug"\n"A04AD","DIPHENHYDRAMINE"\n"S03AA","TETRACYCLINE"\n'
+        ),
+    )
+    assert_that(
+        sorted(path.name for path in tmp_path.iterdir()), equal_to(["drugs.csv"])
+    )
+
+
+def test_commit_part_file_rolls_back_an_interrupted_commit(tmp_path: Path) -> None:
+    # Given
+    committed_content = '"atccode","drug"\n"A04AD","DIPHENHYDRAMINE"\n'
+    target_file_path = tmp_path / "drugs.csv"
+    # Commit interrupted halfway through the append of a part
+    target_file_path.write_text(committed_content + '"V03AB","ETH')
+    (tmp_path / ".drugs.csv.journal").write_text(str(len(committed_content)))
+
+    part_file_path = tmp_path / "drugs.csv.part-1"
+    part_file_path.write_text('"atccode","drug"\n"S03AA","TETRACYCLINE"\n')
+
+    # When
+    commit_part_file(part_file_path, target_file_path)
+
+    # Then
+    assert_that(
+        target_file_path.read_text(),
+        equal_to(committed_content + '"S03AA","TETRACYCLINE"\n'),
+    )
+    assert_that(
+        sorted(path.name for path in tmp_path.iterdir()), equal_to(["drugs.csv"])
+    )
+
+
+def test_commit_part_file_rolls_back_a_commit_interrupted_before_creating_target(
+    tmp_path: Path,
+) -> None:
+    # Given
+    target_file_path = tmp_path / "drugs.csv.gz"
+    # Journal of the first compressed part written, target not created yet
+    (tmp_path / ".drugs.csv.gz.journal").write_text("0")
+
+    part_file_path = tmp_path / "drugs.csv.part-0"
+    part_file_path.write_text('"atccode","drug"\n"A04AD","DIPHENHYDRAMINE"\n')
+
+    # When
+    commit_part_file(part_file_path, target_file_path, "gzip")
+
+    # Then
+    assert_that(
+        gzip.decompress(target_file_path.read_bytes()).decode(),
+        equal_to('"atccode","drug"\n"A04AD","DIPHENHYDRAMINE"\n'),
+    )
+    assert_that(
+        sorted(path.name for path in tmp_path.iterdir()), equal_to(["drugs.csv.gz"])
+    )
+
+
+def test_commit_part_file_appends_compressed_parts_with_a_single_header(
+    tmp_path: Path,
+) -> None:
+    # Given
+    target_file_path = tmp_path / "drugs.csv.gz"
+    first_part_file_path = tmp_path / "drugs.csv.part-0"
+    second_part_file_path = tmp_path / "drugs.csv.part-1"
+    first_part_file_path.write_text('"atccode","drug"\n"A04AD","DIPHENHYDRAMINE"\n')
+    second_part_file_path.write_text('"atccode","drug"\n"S03AA","TETRACYCLINE"\n')
+
+    # When
+    commit_part_file(first_part_file_path, target_file_path, "gzip")
+    commit_part_file(second_part_file_path, target_file_path, "gzip")
+
+    # Then
+    assert_that(
+        gzip.decompress(target_file_path.read_bytes()).decode(),
+        equal_to(
+            '"atccode","drug"\n"A04AD","DIPHENHYDRAMINE"\n"S03AA","TETRACYCLINE"\n'
+        ),
+    )
+    assert_that(
+        sorted(path.name for path in tmp_path.iterdir()), equal_to(["drugs.csv.gz"])
+    )
+
+
+def test_recovery_leaves_part_files_while_another_run_writes_parts(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    INCOMING_FILES_PATH.mkdir(parents=True)
+    INGESTED_DATA_PATH.mkdir(parents=True)
+    leftover_part_file_path = INGESTED_DATA_PATH / "pubmed.csv.part-0"
+    leftover_part_file_path.write_text('"id","title"\n"1","Stopped run"\n')
+    data_writer = CsvDataWriter(INGESTED_DATA_PATH / "drugs.csv")
+    data_writer.write(pd.DataFrame({"atccode": ["A04AD"], "drug": ["ETHANOL"]}))
+
+    # When
+    preliminary_checks_and_cleaning(incremental=True)
+
+    # Then
+    assert_that(leftover_part_file_path.exists(), equal_to(True))
+    assert_that(data_writer.part_file_path.exists(), equal_to(True))
+
+    # When
+    data_writer.commit()
+    preliminary_checks_and_cleaning(incremental=True)
+
+    # Then
+    assert_that(
+        sorted(path.name for path in INGESTED_DATA_PATH.glob("[!.]*")),
+        equal_to(["drugs.csv"]),
+    )
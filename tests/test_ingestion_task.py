@@ -0,0 +1,110 @@
+import shutil
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+import pytest
+from hamcrest import assert_that, equal_to, raises
+
+from cleaning_loading_app import ingestion_task
+from cleaning_loading_app.ingestion_task import OutputRoots, run_ingestion_task
+from cleaning_loading_app.loading import LoadingOptions
+
+SAMPLES_PATH = Path(__file__).parents[1] / "data" / "samples"
+
+
+def _read_data_file(data_file_path: Path) -> bytes | None:
+    # No data file is written without any row
+    return data_file_path.read_bytes() if data_file_path.exists() else None
+
+
+def test_run_ingestion_task_writes_its_own_data_files_once(tmp_path: Path) -> None:
+    # Given
+    input_path = Path(shutil.copy(SAMPLES_PATH / "pubmed.json", tmp_path))
+    output_roots = OutputRoots.under(tmp_path / "datalake")
+
+    # When
+    result = run_ingestion_task(input_path, output_roots, LoadingOptions(chunk_size=3))
+    ingested_data = result.ingested_data_file_path.read_bytes()
+    retried_result = run_ingestion_task(
+        input_path, output_roots, LoadingOptions(chunk_size=3)
+    )
+
+    # Then
+    assert_that(
+        result.ingested_data_file_path,
+        equal_to(tmp_path / "datalake" / "ingested" / "pubmed" / "pubmed.json.csv"),
+    )
+    assert_that(
+        (result.ingested_rows, result.rejected_rows, result.committed_chunks),
+        equal_to((4, 1, 2)),
+    )
+    assert_that(
+        len(pd.read_csv(result.ingested_data_file_path)), equal_to(result.ingested_rows)
+    )
+    assert_that(
+        (retried_result.ingested_rows, retried_result.resumed_chunks),
+        equal_to((4, 2)),
+    )
+    assert_that(result.ingested_data_file_path.read_bytes(), equal_to(ingested_data))
+    assert_that(input_path.exists(), equal_to(True))
+
+
+def test_run_ingestion_task_resumes_from_its_last_committed_chunk(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    input_path = Path(shutil.copy(SAMPLES_PATH / "pubmed.csv", tmp_path))
+    loading_options = LoadingOptions(chunk_size=2)
+    expected_result = run_ingestion_task(
+        input_path, OutputRoots.under(tmp_path / "expected"), loading_options
+    )
+
+    output_roots = OutputRoots.under(tmp_path / "datalake")
+    load_data_file = ingestion_task.load_data_file
+
+    def load_two_chunks_then_die(*args: object) -> Iterator[pd.DataFrame]:
+        chunks = iter(load_data_file(*args))  # type: ignore[arg-type]
+        yield next(chunks)
+        yield next(chunks)
+        raise RuntimeError("Worker died")
+
+    monkeypatch.setattr(ingestion_task, "load_data_file", load_two_chunks_then_die)
+    with pytest.raises(RuntimeError):
+        run_ingestion_task(input_path, output_roots, loading_options)
+    monkeypatch.undo()
+    # Rows of a third chunk committed, but not checkpointed, before dying
+    ingested_data_file_path = output_roots.ingested_path / "pubmed" / "pubmed.csv"
+    with ingested_data_file_path.open("a") as ingested_data_file:
+        ingested_data_file.write("7,Title,2020-01-01,Journal\n")
+
+    # When
+    result = run_ingestion_task(input_path, output_roots, loading_options)
+
+    # Then
+    assert_that(result.resumed_chunks, equal_to(2))
+    assert_that(result.committed_chunks, equal_to(expected_result.committed_chunks))
+    assert_that(
+        (result.ingested_rows, result.rejected_rows),
+        equal_to((expected_result.ingested_rows, expected_result.rejected_rows)),
+    )
+    for data_file_path, expected_data_file_path in (
+        (result.ingested_data_file_path, expected_result.ingested_data_file_path),
+        (result.rejected_data_file_path, expected_result.rejected_data_file_path),
+    ):
+        assert_that(
+            _read_data_file(data_file_path),
+            equal_to(_read_data_file(expected_data_file_path)),
+        )
+
+
+def test_run_ingestion_task_raises_on_unknown_files(tmp_path: Path) -> None:
+    # Given
+    input_path = tmp_path / "unknown.csv"
+    input_path.write_text("a,b\n1,2\n")
+
+    # When / Then
+    assert_that(
+        lambda: run_ingestion_task(input_path, OutputRoots.under(tmp_path)),
+        raises(ValueError),
+    )
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+from hamcrest import assert_that, equal_to
+
+from cleaning_loading_app.manifest import (
+    fingerprint_file,
+    is_already_ingested,
+    load_manifest,
+    record_ingested_file,
+)
+
+
+def test_record_and_load_manifest_keeps_last_entry_per_file(tmp_path: Path) -> None:
+    # Given
+    manifest_path = tmp_path / "manifest.jsonl"
+    data_file_path = tmp_path / "pubmed.csv"
+    data_file_path.write_text("id,title\n1,title1\n")
+    first_fingerprint = fingerprint_file(data_file_path)
+
+    data_file_path.write_text("id,title\n1,title1\n2,title2\n")
+    second_fingerprint = fingerprint_file(data_file_path)
+
+    # When
+    record_ingested_file(manifest_path, first_fingerprint, 1, 0)
+    record_ingested_file(manifest_path, second_fingerprint, 1, 1)
+    result = load_manifest(manifest_path)
+
+    # Then
+    assert_that(list(result), equal_to(["pubmed.csv"]))
+    assert_that(result["pubmed.csv"]["sha256"], equal_to(second_fingerprint.sha256))
+    assert_that(result["pubmed.csv"]["rejected_rows"], equal_to(1))
+    assert_that(is_already_ingested(result, second_fingerprint), equal_to(True))
+    assert_that(is_already_ingested(result, first_fingerprint), equal_to(False))
+
+
+def test_fingerprint_file_reuses_known_hash_of_unchanged_file(tmp_path: Path) -> None:
+    # Given
+    data_file_path = tmp_path / "drugs.csv"
+    data_file_path.write_text("atccode,drug\nA04AD,DIPHENHYDRAMINE\n")
+    fingerprint = fingerprint_file(data_file_path)
+    known_entry = {
+        "size": fingerprint.size,
+        "mtime_ns": fingerprint.mtime_ns,
+        "sha256": "known hash",
+    }
+
+    # When
+    result = fingerprint_file(data_file_path, known_entry)
+
+    # Then
+    assert_that(result.sha256, equal_to("known hash"))
+
+
+def test_file_recorded_without_hash_is_ingested_again_once_changed(
+    tmp_path: Path,
+) -> None:
+    # Given
+    manifest_path = tmp_path / "manifest.jsonl"
+    data_file_path = tmp_path / "drugs.csv"
+    data_file_path.write_text("atccode,drug\nA04AD,DIPHENHYDRAMINE\n")
+    record_ingested_file(
+        manifest_path, fingerprint_file(data_file_path, hash_content=False), 1, 0
+    )
+    manifest = load_manifest(manifest_path)
+
+    # When
+    unchanged_fingerprint = fingerprint_file(data_file_path, manifest["drugs.csv"])
+    data_file_path.write_text("atccode,drug\nS03AA,TETRACYCLINE\n")
+    changed_fingerprint = fingerprint_file(data_file_path, manifest["drugs.csv"])
+
+    # Then
+    assert_that(manifest["drugs.csv"]["sha256"], equal_to(None))
+    assert_that(is_already_ingested(manifest, unchanged_fingerprint), equal_to(True))
+    assert_that(changed_fingerprint.sha256 is not None, equal_to(True))
+    assert_that(is_already_ingested(manifest, changed_fingerprint), equal_to(False))
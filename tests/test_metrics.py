@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+from hamcrest import assert_that, equal_to, greater_than_or_equal_to
+
+from cleaning_loading_app.metrics import (
+    MetricsRecorder,
+    StageMetrics,
+    merge_stage_metrics,
+    save_metrics,
+)
+from cleaning_loading_app.transformations import (
+    Rule,
+    has_nan_field,
+    split_clean_and_rejected_rows,
+)
+
+
+def test_metrics_recorder_sums_the_calls_of_a_stage() -> None:
+    # Given
+    metrics = MetricsRecorder("pubmed.csv", "pubmed")
+    chunks = [pd.DataFrame({"id": [1, 2]}), pd.DataFrame({"id": [3]})]
+
+    # When
+    loaded_chunks = list(metrics.measure_chunks("load", chunks))
+
+    # Then
+    assert_that(len(loaded_chunks), equal_to(2))
+    load_metrics = metrics.stages["load"]
+    # One call to build the iterator, one per chunk and one to reach its end
+    assert_that(load_metrics.calls, equal_to(4))
+    assert_that(load_metrics.rows_out, equal_to(3))
+    assert_that(load_metrics.wall_seconds, greater_than_or_equal_to(0.0))
+
+
+def test_metrics_recorder_measures_each_rule() -> None:
+    # Given
+    metrics = MetricsRecorder("pubmed.csv", "pubmed")
+    df = pd.DataFrame({"id": [1, None, 3], "title": ["a", "b", None]})
+
+    # When
+    split_clean_and_rejected_rows(
+        df, metrics.measure_rules([("nan_field", has_nan_field)])
+    )
+
+    # Then
+    rule_metrics = metrics.stages["rule:nan_field"]
+    assert_that(
+        (rule_metrics.rows_in, rule_metrics.rows_out, rule_metrics.rows_rejected),
+        equal_to((3, 1, 2)),
+    )
+
+
+def test_disabled_metrics_recorder_records_nothing() -> None:
+    # Given
+    metrics = MetricsRecorder("pubmed.csv", "pubmed", enabled=False)
+    rules: list[Rule] = [("nan_field", has_nan_field)]
+
+    # When
+    with metrics.measure("save") as rows:
+        rows.rows_in = 1
+    list(metrics.measure_chunks("load", [pd.DataFrame({"id": [1]})]))
+
+    # Then
+    assert_that(metrics.stages, equal_to({}))
+    assert_that(metrics.measure_rules(rules), equal_to(rules))
+
+
+def test_merge_stage_metrics_sums_metrics_of_a_file_stage() -> None:
+    # Given
+    stages = [
+        StageMetrics("pubmed.csv", "pubmed", "load", 1, 0.5, 0.25, 0, 10, 0, 100),
+        StageMetrics("pubmed.csv", "pubmed", "save", 1, 0.1, 0.1, 10, 9, 1, 0),
+        StageMetrics("pubmed.csv", "pubmed", "load", 2, 0.5, 0.25, 0, 5, 0, -50),
+    ]
+
+    # When
+    result = merge_stage_metrics(stages)
+
+    # Then
+    assert_that(
+        result,
+        equal_to(
+            [
+                StageMetrics("pubmed.csv", "pubmed", "load", 3, 1.0, 0.5, 0, 15, 0, 50),
+                stages[1],
+            ]
+        ),
+    )
+    assert_that(stages[0].calls, equal_to(1))
+
+
+def test_save_metrics_appends_json_lines(tmp_path: Path) -> None:
+    # Given
+    metrics_file_path = tmp_path / "metrics" / "metrics.jsonl"
+    metrics = MetricsRecorder("drugs.csv", "drugs")
+    with metrics.measure("move") as rows:
+        rows.rows_in = rows.rows_out = 7
+
+    # When
+    save_metrics(metrics_file_path, "run-1", metrics.stages.values())
+    save_metrics(metrics_file_path, "run-2", metrics.stages.values())
+
+    # Then
+    lines = [json.loads(line) for line in metrics_file_path.read_text().splitlines()]
+    assert_that([line["run_id"] for line in lines], equal_to(["run-1", "run-2"]))
+    assert_that(
+        {key: lines[0][key] for key in ("file_name", "stage", "rows_out")},
+        equal_to({"file_name": "drugs.csv", "stage": "move", "rows_out": 7}),
+    )
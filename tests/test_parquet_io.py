@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from numpy import nan
+from pandas import testing
+
+from cleaning_loading_app.parquet_io import load_parquet_dataset, save_parquet_part
+
+pytest.importorskip("pyarrow")
+
+
+def test_save_parquet_part_writes_mixed_object_columns_as_strings(
+    tmp_path: Path,
+) -> None:
+    # Given
+    df = pd.DataFrame(
+        [
+            [9, "title9", "2020-01-01"],
+            ["", "title10", "2020-01-02"],
+            [11, nan, "2020-01-03"],
+        ],
+        columns=["id", "title", "date"],
+    )
+    df["date"] = pd.to_datetime(df["date"])
+
+    # When
+    save_parquet_part(tmp_path / "part-0.parquet", df)
+
+    # Then
+    expected = df.astype({"id": "string", "title": "string"})
+    expected["id"] = pd.Series(["9", "", "11"], dtype="string")
+
+    testing.assert_frame_equal(load_parquet_dataset(tmp_path), expected)
+
+
+def test_load_parquet_dataset_prunes_columns_and_rows(tmp_path: Path) -> None:
+    # Given
+    save_parquet_part(
+        tmp_path / "part-0.parquet",
+        pd.DataFrame([[1, "title1"], [2, "title2"]], columns=["id", "title"]),
+    )
+    save_parquet_part(
+        tmp_path / "part-1.parquet",
+        pd.DataFrame([[3, "title3"]], columns=["id", "title"]),
+    )
+
+    # When
+    result = load_parquet_dataset(tmp_path, columns=["id"], filters=[("id", ">", 1)])
+
+    # Then
+    testing.assert_frame_equal(result, pd.DataFrame({"id": [2, 3]}))
@@ -0,0 +1,66 @@
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from hamcrest import assert_that, equal_to
+
+from cleaning_loading_app.partitions import list_dataset_files, load_dataset
+from cleaning_loading_app.writers import DatePartitionedDataWriter
+
+
+def _write_dataset(dataset_path: Path, output_format: str = "csv") -> None:
+    for part_name_prefix, dates in (
+        ("part-1", ["2020-01-31", "2020-02-01", None]),
+        ("part-2", ["2020-03-15", "2020-01-01"]),
+    ):
+        writer = DatePartitionedDataWriter(
+            dataset_path, "date", part_name_prefix, output_format
+        )
+        writer.write(
+            pd.DataFrame(
+                {
+                    "id": [f"{part_name_prefix}:{i}" for i in range(len(dates))],
+                    "date": pd.to_datetime(pd.Series(dates)),
+                }
+            )
+        )
+        writer.commit()
+
+
+def test_list_dataset_files_prunes_partitions_outside_dates(tmp_path: Path) -> None:
+    # Given
+    _write_dataset(tmp_path)
+
+    # When
+    file_paths = list_dataset_files(tmp_path, date(2020, 1, 15), date(2020, 2, 28))
+
+    # Then
+    assert_that(
+        [str(file_path.relative_to(tmp_path)) for file_path in file_paths],
+        equal_to(
+            [
+                "date=2020-01/part-1.csv",
+                "date=2020-02/part-1.csv",
+                "date=2020-01/part-2.csv",
+            ]
+        ),
+    )
+    assert_that(len(list_dataset_files(tmp_path)), equal_to(5))
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet"])
+def test_load_dataset_keeps_rows_dated_in_range(
+    tmp_path: Path, output_format: str
+) -> None:
+    # Given
+    _write_dataset(tmp_path, output_format)
+
+    # When
+    df = load_dataset(tmp_path, start=date(2020, 1, 15), end=date(2020, 2, 1))
+
+    # Then
+    assert_that(df["id"].tolist(), equal_to(["part-1:0", "part-1:1"]))
+    assert_that(str(df["date"].dtype), equal_to("datetime64[ns]"))
+    assert_that(len(load_dataset(tmp_path)), equal_to(5))
+    assert_that(len(load_dataset(tmp_path, start=date(2020, 3, 1))), equal_to(1))
@@ -0,0 +1,64 @@
+import pytest
+from hamcrest import assert_that, equal_to, none
+
+from cleaning_loading_app.pipelines import find_pipeline
+
+
+@pytest.mark.parametrize(
+    "file_name, expected_pipeline_name",
+    [
+        ("clinical_trials.csv", "clinical_trials"),
+        ("clinical_trials_0001.csv", "clinical_trials"),
+        ("pubmed.csv", "pubmed"),
+        ("pubmed.json", "pubmed"),
+        ("pubmed_2048.json", "pubmed"),
+        ("pubmed_2048.ndjson", "pubmed"),
+        ("drugs.csv", "drugs"),
+        ("pubmed.csv.gz", "pubmed"),
+        ("pubmed_2048.json.zst", "pubmed"),
+        ("drugs.csv.bz2", "drugs"),
+    ],
+)
+def test_find_pipeline(file_name: str, expected_pipeline_name: str) -> None:
+    # When
+    result = find_pipeline(file_name)
+
+    # Then
+    assert result is not None
+    assert_that(result.name, equal_to(expected_pipeline_name))
+
+
+@pytest.mark.parametrize(
+    "file_name", ["pubmed.txt", "pubmedx.csv", "other.csv", "pubmed.gz"]
+)
+def test_find_pipeline_without_match(file_name: str) -> None:
+    # When
+    result = find_pipeline(file_name)
+
+    # Then
+    assert_that(result, none())
+
+
+def test_pipeline_rules() -> None:
+    # Given
+    pubmed_pipeline = find_pipeline("pubmed.csv")
+    drugs_pipeline = find_pipeline("drugs.csv")
+    assert pubmed_pipeline is not None and drugs_pipeline is not None
+
+    # When
+    pubmed_rule_reasons = [reason for reason, _ in pubmed_pipeline.rules()]
+    drugs_rule_reasons = [reason for reason, _ in drugs_pipeline.rules()]
+
+    # Then
+    assert_that(
+        pubmed_rule_reasons,
+        equal_to(
+            [
+                "empty_or_spaces_only_string_field",
+                "nan_field",
+                "invalid_date",
+                "invalid_int",
+            ]
+        ),
+    )
+    assert_that(drugs_rule_reasons, equal_to([]))
@@ -6,10 +6,17 @@ from numpy import nan
 from pandas._testing import assert_frame_equal
 
 from cleaning_loading_app.transformations import (
+    RowSelection,
     convert_string_to_date,
+    encode_low_cardinality_columns,
     ensure_column_is_int,
+    has_empty_or_spaces_only_string_field,
+    has_invalid_date,
+    has_invalid_int,
+    has_nan_field,
     remove_rows_with_empty_or_spaces_only_string_fields,
     remove_rows_with_nan_fields,
+    split_clean_and_rejected_rows,
 )
 
 
@@ -91,6 +98,30 @@ def test_remove_rows_with_spaces_only_string_fields() -> None:
     assert_frame_equal(rejected, expected_rejected)
 
 
+def test_remove_rows_with_spaces_only_string_fields_in_mixed_type_columns() -> None:
+    # Given
+    columns = ["id", "title", "date"]
+    df = pd.DataFrame(
+        [
+            [9, "title9", pd.Timestamp("2020-01-01")],
+            ["10", "\t\n", pd.Timestamp("2020-01-02")],
+            ["", "title11", pd.Timestamp("2020-01-03")],
+            [12, nan, pd.Timestamp("2020-01-04")],
+        ],
+        columns=columns,
+    )
+    df["title"] = df["title"].astype("string")
+
+    # When
+    result, rejected = remove_rows_with_empty_or_spaces_only_string_fields(
+        df, pd.DataFrame()
+    )
+
+    # Then
+    assert_frame_equal(result, df.loc[[0, 3]])
+    assert_frame_equal(rejected, df.loc[[1, 2]])
+
+
 def test_convert_string_to_date() -> None:
     # Given
     df = pd.DataFrame(
@@ -119,6 +150,40 @@ def test_convert_string_to_date() -> None:
     assert_that(rejected.empty, equal_to(True))
 
 
+def test_convert_string_to_date_rejects_invalid_dates_instead_of_failing() -> None:
+    # Given
+    df = pd.DataFrame(
+        [[1, "01/01/2020"], [2, "32/13/2020"], [3, "2 January 2020"]],
+        columns=["id", "date"],
+    )
+    all_dirty_elements = pd.DataFrame(
+        [[4, "not a date", "nan_field"]], columns=["id", "date", "rejection_reason"]
+    )
+
+    # When
+    result, rejected = convert_string_to_date(df, "date", all_dirty_elements)
+
+    # Then
+    assert_frame_equal(
+        result,
+        pd.DataFrame(
+            {"id": [1, 3], "date": pd.to_datetime(["2020-01-01", "2020-01-02"])},
+            index=[0, 2],
+        ),
+    )
+    assert_frame_equal(
+        rejected,
+        pd.DataFrame(
+            {
+                "id": [4, 2],
+                "date": ["not a date", "32/13/2020"],
+                "rejection_reason": ["nan_field", "invalid_date"],
+            },
+            index=[0, 1],
+        ),
+    )
+
+
 def test_ensure_column_is_int() -> None:
     # Given
     df = pd.DataFrame(
@@ -143,3 +208,144 @@ def test_ensure_column_is_int() -> None:
 
     assert_frame_equal(result, expected)
     assert_that(rejected.empty, equal_to(True))
+
+
+def test_ensure_column_is_int_keeps_invalid_rejected_values_as_read() -> None:
+    # Given
+    df = pd.DataFrame([["1"]], columns=["id"])
+    rejected = pd.DataFrame([["2"], ["2.5"], ["abc"], [None]], columns=["id"])
+
+    # When
+    result, rejected = ensure_column_is_int(df, "id", rejected)
+
+    # Then
+    assert_that(rejected["id"].tolist(), equal_to([2, "2.5", "abc", None]))
+    assert_that(type(rejected["id"].iloc[0]), equal_to(int))
+
+
+def test_split_clean_and_rejected_rows_gives_first_broken_rule_as_reason() -> None:
+    # Given
+    columns = ["id", "title", "date"]
+    df = pd.DataFrame(
+        [
+            ["1", "title1", "01/01/2020"],
+            ["", "title2", "02/01/2020"],
+            ["3", nan, "not a date"],
+            ["4", "title4", "not a date"],
+            ["5.5", "title5", "05/01/2020"],
+            ["6", "title6", "06/01/2020"],
+        ],
+        columns=columns,
+    )
+
+    # When
+    result, rejected = split_clean_and_rejected_rows(
+        df,
+        [
+            ("blank", has_empty_or_spaces_only_string_field),
+            ("nan", has_nan_field),
+            ("date", has_invalid_date("date")),
+            ("int", has_invalid_int("id")),
+        ],
+    )
+
+    # Then
+    assert_frame_equal(result, df.loc[[0, 5]])
+
+    expected_rejected = df.loc[[1, 2, 3, 4]].assign(
+        rejection_reason=["blank", "nan", "date", "int"]
+    )
+    assert_frame_equal(rejected, expected_rejected)
+
+
+def test_split_clean_and_rejected_rows_without_rejection() -> None:
+    # Given
+    df = pd.DataFrame([[1, "title1"]], columns=["id", "title"])
+
+    # When
+    result, rejected = split_clean_and_rejected_rows(df, [("nan", has_nan_field)])
+
+    # Then
+    assert_that(result is df, equal_to(True))
+    assert_that(rejected.empty, equal_to(True))
+    assert_that(list(rejected.columns), equal_to(["id", "title", "rejection_reason"]))
+
+
+def test_row_selection_accumulates_rejections_without_copying_the_frame() -> None:
+    # Given
+    df = pd.DataFrame([[1, "title1"], [2, nan], [nan, "  "]], columns=["id", "title"])
+    selection = RowSelection(df)
+
+    # When
+    selection.reject_rows([("blank", has_empty_or_spaces_only_string_field)])
+    selection.reject_rows([("nan", has_nan_field)])
+
+    # Then
+    assert_that(selection.df is df, equal_to(True))
+    assert_frame_equal(selection.clean_rows(), df.loc[[0]])
+    assert_frame_equal(
+        selection.rejected_rows(),
+        df.loc[[1, 2]].assign(rejection_reason=["nan", "blank"]),
+    )
+
+
+def test_has_invalid_date_ignores_missing_values() -> None:
+    # Given
+    df = pd.DataFrame([["01/01/2020"], ["32/01/2020"], [nan]], columns=["date"])
+
+    # When
+    result = has_invalid_date("date")(df)
+
+    # Then
+    assert_that(list(result), equal_to([False, True, False]))
+
+
+def test_has_invalid_int_ignores_missing_values() -> None:
+    # Given
+    df = pd.DataFrame([[1], ["2"], ["3.5"], ["four"], [nan], [6.0]], columns=["id"])
+
+    # When
+    result = has_invalid_int("id")(df)
+
+    # Then
+    assert_that(list(result), equal_to([False, False, True, True, False, False]))
+
+
+def test_encode_low_cardinality_columns() -> None:
+    # Given
+    df = pd.DataFrame(
+        {
+            "id": ["1", "2", "3", "4"],
+            "journal": ["Journal A", "Journal B", "Journal A", "Journal A"],
+            "date": ["01/01/2019", "01/01/2019", "01/01/2019", "01/01/2019"],
+        }
+    )
+
+    # When
+    result = encode_low_cardinality_columns(df, excluded_columns=("date",))
+
+    # Then
+    assert_that(
+        result.dtypes.astype(str).to_dict(),
+        equal_to({"id": "object", "journal": "category", "date": "object"}),
+    )
+    assert_that(
+        result["journal"].tolist(),
+        equal_to(["Journal A", "Journal B", "Journal A", "Journal A"]),
+    )
+
+
+def test_has_empty_or_spaces_only_string_field_checks_categories() -> None:
+    # Given
+    df = pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4],
+            "journal": pd.Categorical(["Journal A", "  ", None, "Journal A"]),
+        }
+    )
+
+    # When
+    result = has_empty_or_spaces_only_string_field(df)
+
+    # Then
+    assert_that(result.tolist(), equal_to([False, True, False, False]))
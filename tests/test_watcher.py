@@ -0,0 +1,127 @@
+import asyncio
+import json
+import shutil
+import time
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from hamcrest import assert_that, equal_to
+
+from cleaning_loading_app import cleaner_loader
+from cleaning_loading_app.loading import LoadingOptions
+from cleaning_loading_app.watcher import (
+    OutputOptions,
+    WatchOptions,
+    watch_incoming_files,
+)
+
+SAMPLES_PATH = Path(__file__).parents[1] / "data" / "samples"
+INCOMING_PATH = Path("data") / "data_files" / "incoming"
+PROCESSED_PATH = Path("data") / "data_files" / "processed"
+
+
+def _watch(
+    watch_options: WatchOptions,
+    land_files: Callable[[], object],
+    until: Callable[[], bool],
+    timeout_seconds: float = 30.0,
+) -> None:
+    async def watch() -> None:
+        stop = asyncio.Event()
+        watching = asyncio.create_task(
+            watch_incoming_files(
+                LoadingOptions(), watch_options, OutputOptions(), stop=stop
+            )
+        )
+        land_files()
+        deadline = time.monotonic() + timeout_seconds
+        while not until() and not watching.done() and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        stop.set()
+        await watching
+
+    asyncio.run(watch())
+
+
+def _processed_file_names() -> list[str]:
+    if not PROCESSED_PATH.exists():
+        return []
+    return sorted(path.name for path in PROCESSED_PATH.iterdir())
+
+
+def _read_datalake(run_path: Path) -> dict[str, bytes]:
+    datalake_path = run_path / "data" / "datalake"
+    return {
+        str(path.relative_to(datalake_path)): path.read_bytes()
+        for path in sorted(datalake_path.glob("*ed/*"))
+    }
+
+
+def test_watch_ingests_landed_files_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    batch_run_path = tmp_path / "batch"
+    shutil.copytree(SAMPLES_PATH, batch_run_path / INCOMING_PATH)
+    (batch_run_path / "data" / "datalake").mkdir()
+    monkeypatch.chdir(batch_run_path)
+    cleaner_loader.ingest_files()
+
+    watch_run_path = tmp_path / "watch"
+    (watch_run_path / INCOMING_PATH).mkdir(parents=True)
+    (watch_run_path / "data" / "datalake").mkdir()
+    monkeypatch.chdir(watch_run_path)
+    watch_options = WatchOptions(poll_seconds=0.01, settle_seconds=0.05)
+
+    # When
+    _watch(
+        watch_options,
+        lambda: shutil.copytree(SAMPLES_PATH, INCOMING_PATH, dirs_exist_ok=True),
+        lambda: len(_processed_file_names()) == 4,
+    )
+    first_watch_datalake = _read_datalake(watch_run_path)
+    _watch(
+        watch_options,
+        lambda: shutil.copy(SAMPLES_PATH / "pubmed.csv", INCOMING_PATH),
+        lambda: not any(INCOMING_PATH.iterdir()),
+    )
+
+    # Then
+    assert_that(first_watch_datalake, equal_to(_read_datalake(batch_run_path)))
+    assert_that(_read_datalake(watch_run_path), equal_to(first_watch_datalake))
+    manifest = [
+        json.loads(line)
+        for line in Path("data/datalake/manifest.jsonl").read_text().splitlines()
+    ]
+    assert_that(
+        sorted(entry["file_name"] for entry in manifest),
+        equal_to(sorted(path.name for path in SAMPLES_PATH.iterdir())),
+    )
+
+
+def test_watch_ingests_files_with_a_ready_marker_without_waiting(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    monkeypatch.chdir(tmp_path)
+    INCOMING_PATH.mkdir(parents=True)
+    Path("data", "datalake").mkdir()
+
+    def land_files() -> None:
+        shutil.copy(SAMPLES_PATH / "drugs.csv", INCOMING_PATH)
+        shutil.copy(SAMPLES_PATH / "pubmed.csv", INCOMING_PATH)
+        (INCOMING_PATH / "pubmed.csv.ready").touch()
+
+    # When
+    _watch(
+        WatchOptions(poll_seconds=0.01, settle_seconds=60),
+        land_files,
+        lambda: _processed_file_names() == ["pubmed.csv"],
+    )
+
+    # Then
+    assert_that(_processed_file_names(), equal_to(["pubmed.csv"]))
+    assert_that(
+        sorted(path.name for path in INCOMING_PATH.iterdir()), equal_to(["drugs.csv"])
+    )
@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from hamcrest import assert_that, equal_to
+
+from cleaning_loading_app.writers import CsvDataWriter, ParquetDataWriter
+
+
+def test_csv_data_writer_appends_to_single_file(tmp_path: Path) -> None:
+    # Given
+    writer = CsvDataWriter(tmp_path / "drugs.csv")
+
+    # When
+    writer.write(
+        pd.DataFrame([["A04AD", "DIPHENHYDRAMINE"]], columns=["atccode", "drug"])
+    )
+    writer.write(pd.DataFrame(columns=["atccode", "drug"]))
+    writer.write(pd.DataFrame([["S03AA", "TETRACYCLINE"]], columns=["atccode", "drug"]))
+    writer.commit()
+
+    # Then
+    assert_that(
+        (tmp_path / "drugs.csv").read_text(),
+        equal_to(
+            '"atccode","drug"\n'
+            '"A04AD","DIPHENHYDRAMINE"\n'
+            '"S03AA","TETRACYCLINE"\n'
+        ),
+    )
+
+
+def test_csv_data_writer_only_writes_committed_data_with_a_single_header(
+    tmp_path: Path,
+) -> None:
+    # Given
+    first_writer = CsvDataWriter(tmp_path / "drugs.csv")
+    second_writer = CsvDataWriter(tmp_path / "drugs.csv")
+    uncommitted_writer = CsvDataWriter(tmp_path / "drugs.csv")
+
+    # When
+    first_writer.write(
+        pd.DataFrame([["A04AD", "DIPHENHYDRAMINE"]], columns=["atccode", "drug"])
+    )
+    second_writer.write(
+        pd.DataFrame([["S03AA", "TETRACYCLINE"]], columns=["atccode", "drug"])
+    )
+    uncommitted_writer.write(
+        pd.DataFrame([["V03AB", "ETHANOL"]], columns=["atccode", "drug"])
+    )
+    second_writer.commit()
+    first_writer.commit()
+
+    # Then
+    assert_that(
+        (tmp_path / "drugs.csv").read_text(),
+        equal_to(
+            '"atccode","drug"\n'
+            '"S03AA","TETRACYCLINE"\n'
+            '"A04AD","DIPHENHYDRAMINE"\n'
+        ),
+    )
+
+
+def test_parquet_data_writer_writes_a_part_file_per_non_empty_chunk(
+    tmp_path: Path,
+) -> None:
+    # Given
+    pytest.importorskip("pyarrow")
+    writer = ParquetDataWriter(tmp_path / "drugs", "part-run1-00003")
+
+    # When
+    writer.write(
+        pd.DataFrame([["A04AD", "DIPHENHYDRAMINE"]], columns=["atccode", "drug"])
+    )
+    writer.write(pd.DataFrame(columns=["atccode", "drug"]))
+    writer.write(pd.DataFrame([["S03AA", "TETRACYCLINE"]], columns=["atccode", "drug"]))
+
+    # Then
+    assert_that(
+        sorted(path.name for path in (tmp_path / "drugs").iterdir()),
+        equal_to(["part-run1-00003-00000.parquet", "part-run1-00003-00001.parquet"]),
+    )